@@ -1,8 +1,18 @@
 import json
 import os
+import sys
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+# Asegurarse de que el directorio raíz esté en el path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+from balanza.protocolos import PROTOCOLOS, PROTOCOLO_POR_DEFECTO
+from balanza.autodeteccion import autodetectar, aplicar_candidato, listar_puertos
+
 class ConfiguradorBalanza:
     def __init__(self, root):
         self.root = root
@@ -73,6 +83,7 @@ class ConfiguradorBalanza:
         
         ttk.Button(frame_botones, text="Nueva Balanza", command=self.nueva_balanza).pack(side='left', padx=5)
         ttk.Button(frame_botones, text="Eliminar Balanza", command=self.eliminar_balanza).pack(side='left', padx=5)
+        ttk.Button(frame_botones, text="Autodetectar", command=self.autodetectar_balanzas).pack(side='left', padx=5)
         ttk.Button(frame_botones, text="Guardar Cambios", command=self.guardar_configuracion).pack(side='right', padx=5)
         
         # Frame para la lista de balanzas y selección de balanza por defecto
@@ -141,6 +152,7 @@ class ConfiguradorBalanza:
         self.var_dtr = tk.BooleanVar(value=True)
         self.var_rts = tk.BooleanVar(value=True)
         self.var_unidad = tk.StringVar(value="kg")
+        self.var_protocolo = tk.StringVar(value=PROTOCOLO_POR_DEFECTO)
         
         # Frame principal
         main_frame = ttk.Frame(self.tab_edicion)
@@ -195,16 +207,20 @@ class ConfiguradorBalanza:
         ttk.Combobox(scrollable_frame, textvariable=self.var_unidad, 
                     values=["kg", "g", "lb", "oz"]).grid(row=8, column=1, sticky='ew', padx=5, pady=5)
         
+        ttk.Label(scrollable_frame, text="Protocolo:").grid(row=9, column=0, sticky='w', padx=5, pady=5)
+        ttk.Combobox(scrollable_frame, textvariable=self.var_protocolo, state="readonly",
+                    values=sorted(PROTOCOLOS)).grid(row=9, column=1, sticky='ew', padx=5, pady=5)
+        
         # Checkboxes
-        ttk.Checkbutton(scrollable_frame, text="XON/XOFF", variable=self.var_xonxoff).grid(row=9, column=0, columnspan=2, sticky='w', padx=5, pady=5)
-        ttk.Checkbutton(scrollable_frame, text="RTS/CTS", variable=self.var_rtscts).grid(row=10, column=0, columnspan=2, sticky='w', padx=5, pady=5)
-        ttk.Checkbutton(scrollable_frame, text="DSR/DTR", variable=self.var_dsrdtr).grid(row=11, column=0, columnspan=2, sticky='w', padx=5, pady=5)
-        ttk.Checkbutton(scrollable_frame, text="DTR", variable=self.var_dtr).grid(row=12, column=0, columnspan=2, sticky='w', padx=5, pady=5)
-        ttk.Checkbutton(scrollable_frame, text="RTS", variable=self.var_rts).grid(row=13, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        ttk.Checkbutton(scrollable_frame, text="XON/XOFF", variable=self.var_xonxoff).grid(row=10, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        ttk.Checkbutton(scrollable_frame, text="RTS/CTS", variable=self.var_rtscts).grid(row=11, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        ttk.Checkbutton(scrollable_frame, text="DSR/DTR", variable=self.var_dsrdtr).grid(row=12, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        ttk.Checkbutton(scrollable_frame, text="DTR", variable=self.var_dtr).grid(row=13, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        ttk.Checkbutton(scrollable_frame, text="RTS", variable=self.var_rts).grid(row=14, column=0, columnspan=2, sticky='w', padx=5, pady=5)
         
         # Botones
         frame_botones = ttk.Frame(scrollable_frame)
-        frame_botones.grid(row=14, column=0, columnspan=2, pady=10)
+        frame_botones.grid(row=15, column=0, columnspan=2, pady=10)
         
         ttk.Button(frame_botones, text="Guardar", command=self.guardar_balanza).pack(side='left', padx=5)
         ttk.Button(frame_botones, text="Cancelar", command=self.cancelar_edicion).pack(side='left', padx=5)
@@ -250,6 +266,7 @@ class ConfiguradorBalanza:
         self.var_dtr.set(True)
         self.var_rts.set(True)
         self.var_unidad.set("kg")
+        self.var_protocolo.set(PROTOCOLO_POR_DEFECTO)
         
         # Cambiar a la pestaña de edición
         self.root.nametowidget('.!notebook').select(1)
@@ -277,6 +294,7 @@ class ConfiguradorBalanza:
             self.var_dtr.set(datos.get('dtr', True))
             self.var_rts.set(datos.get('rts', True))
             self.var_unidad.set(datos.get('unidad', 'kg'))
+            self.var_protocolo.set(datos.get('protocolo', PROTOCOLO_POR_DEFECTO))
             
             # Cambiar a la pestaña de edición
             self.root.nametowidget('.!notebook').select(1)
@@ -287,9 +305,11 @@ class ConfiguradorBalanza:
             messagebox.showerror("Error", "Los campos ID, Nombre y Puerto son obligatorios")
             return
         
-        # Crear diccionario con los datos de la balanza
+        # Crear diccionario con los datos de la balanza (conservando campos
+        # opcionales que no se editan en esta pantalla)
         balanza_id = self.var_id.get()
-        datos = {
+        datos = dict(self.config['balanzas'].get(balanza_id, {}))
+        datos.update({
             'nombre': self.var_nombre.get(),
             'puerto': self.var_puerto.get(),
             'baudrate': self.var_baudrate.get(),
@@ -302,8 +322,9 @@ class ConfiguradorBalanza:
             'dsrdtr': self.var_dsrdtr.get(),
             'dtr': self.var_dtr.get(),
             'rts': self.var_rts.get(),
-            'unidad': self.var_unidad.get()
-        }
+            'unidad': self.var_unidad.get(),
+            'protocolo': self.var_protocolo.get()
+        })
         
         # Guardar en la configuración
         self.config['balanzas'][balanza_id] = datos
@@ -358,6 +379,83 @@ class ConfiguradorBalanza:
         self.config['balanza_por_defecto'] = balanza_id
         messagebox.showinfo("Éxito", f"Balanza '{balanza_id}' establecida como predeterminada")
     
+    def autodetectar_balanzas(self):
+        puertos = listar_puertos()
+        if not puertos:
+            messagebox.showwarning("Advertencia", "No se encontraron puertos serie")
+            return
+        
+        # La balanza seleccionada en la lista recibe el resultado; si no hay, se crea una nueva
+        seleccion = self.tree.selection()
+        destino = self.tree.item(seleccion[0], 'values')[0] if seleccion else None
+        
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Autodetección de balanzas")
+        ventana.geometry("700x300")
+        ventana.transient(self.root)
+        
+        estado = tk.StringVar(value=f"Probando {len(puertos)} puertos: {', '.join(puertos)}...")
+        ttk.Label(ventana, textvariable=estado).pack(anchor='w', padx=10, pady=5)
+        
+        tabla = ttk.Treeview(ventana, columns=('Puerto', 'Baudrate', 'Formato', 'Protocolo', 'Tramas', 'Puntaje', 'Ejemplo'),
+                             show='headings', height=8)
+        for columna, ancho in (('Puerto', 90), ('Baudrate', 70), ('Formato', 60), ('Protocolo', 130),
+                               ('Tramas', 60), ('Puntaje', 60), ('Ejemplo', 200)):
+            tabla.heading(columna, text=columna)
+            tabla.column(columna, width=ancho)
+        tabla.pack(fill='both', expand=True, padx=10, pady=5)
+        
+        frame_botones = ttk.Frame(ventana)
+        frame_botones.pack(fill='x', padx=10, pady=5)
+        texto = f"Usar en '{destino}'" if destino else "Agregar balanza"
+        boton_usar = ttk.Button(frame_botones, text=texto, state='disabled')
+        boton_usar.pack(side='left', padx=5)
+        ttk.Button(frame_botones, text="Cerrar", command=ventana.destroy).pack(side='right', padx=5)
+        
+        resultado = []
+        hilo = threading.Thread(target=lambda: resultado.extend(autodetectar(puertos)), daemon=True)
+        hilo.start()
+        
+        def usar():
+            item = tabla.selection()
+            if not item:
+                messagebox.showwarning("Advertencia", "Seleccione un resultado", parent=ventana)
+                return
+            self.aplicar_autodeteccion(resultado[tabla.index(item[0])], destino)
+            ventana.destroy()
+        
+        def esperar():
+            if not ventana.winfo_exists():
+                return
+            if hilo.is_alive():
+                ventana.after(200, esperar)
+                return
+            if not resultado:
+                estado.set("No se reconoció ninguna balanza. Verifique que esté encendida y conectada.")
+                return
+            estado.set(f"{len(resultado)} configuraciones posibles (la primera es la más probable)")
+            for c in resultado:
+                tabla.insert('', 'end', values=(c.puerto, c.baudrate, f"{c.bytesize}{c.parity[0].upper()}1",
+                                                c.protocolo, f"{c.validas}/{c.tramas}", f"{c.puntaje:.2f}", c.ejemplo))
+            tabla.selection_set(tabla.get_children()[0])
+            boton_usar.config(state='normal', command=usar)
+        
+        esperar()
+    
+    def aplicar_autodeteccion(self, candidato, balanza_id=None):
+        if balanza_id is None:
+            numero = len(self.config['balanzas']) + 1
+            while f"balanza{numero}" in self.config['balanzas']:
+                numero += 1
+            balanza_id = f"balanza{numero}"
+        
+        aplicar_candidato(self.config['balanzas'].setdefault(balanza_id, {}), candidato)
+        if not self.config.get('balanza_por_defecto'):
+            self.config['balanza_por_defecto'] = balanza_id
+        
+        self.actualizar_lista_balanzas()
+        self.guardar_configuracion()
+    
     def cancelar_edicion(self):
         # Volver a la pestaña de lista
         self.root.nametowidget('.!notebook').select(0)
@@ -0,0 +1,110 @@
+"""
+Captura automática de fardos sobre el flujo de lecturas de la balanza.
+
+Cada fardo recorre tres estados: la balanza pasa de vacía a cargada, el peso
+se asienta hasta que el detector de estabilidad lo da por estable (se
+captura una vez) y el fardo se retira. Hasta que el peso no vuelve por
+debajo de ``umbral_vacio`` no se arma la captura siguiente, así que los
+golpes o un fardo que queda apoyado no generan capturas repetidas.
+"""
+
+import logging
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from balanza.estabilidad import PesoEstable
+
+logger = logging.getLogger(__name__)
+
+VACIO = "vacio"
+CARGANDO = "cargando"
+CAPTURADO = "capturado"
+
+
+class Captura(NamedTuple):
+    """Peso estable tomado automáticamente"""
+    peso: float           # Media de la ventana estable
+    tiempo: float         # time.monotonic() de la muestra que completó la ventana
+    fecha: float          # time.time() de la captura
+    asentamiento: float   # Segundos desde que empezó la carga hasta el peso estable
+
+
+class AutoCaptura:
+    """Máquina de estados vacío -> cargando -> capturado -> vacío.
+
+    Se alimenta con cada lectura y su peso estable (como los recibe un
+    suscriptor de BalanzaReader) y devuelve una Captura por ciclo de carga.
+    Un peso estable menor que ``peso_minimo`` no se captura; tampoco uno que
+    llegue antes de ``intervalo_minimo`` segundos de la captura anterior.
+    Como el suscriptor sólo recibe cambios, mientras ``pendiente`` hay que
+    volver a alimentarla con la última publicación aunque el peso no cambie.
+    """
+
+    def __init__(self, peso_minimo: float = 1.0, umbral_vacio: float = 0.5,
+                 intervalo_minimo: float = 2.0):
+        if umbral_vacio >= peso_minimo:
+            raise ValueError("umbral_vacio debe ser menor que peso_minimo")
+        self.peso_minimo = peso_minimo
+        self.umbral_vacio = umbral_vacio
+        self.intervalo_minimo = intervalo_minimo
+        self.capturas = 0
+        self.rechazadas = 0     # Ciclos con peso estable menor que el mínimo
+        self.reiniciar()
+
+    @classmethod
+    def desde_config(cls, config: Dict[str, Any]) -> "AutoCaptura":
+        """Crea la máquina con las claves autocaptura_* y peso_minimo_fardo de CAMPOS_CONFIG"""
+        return cls(
+            peso_minimo=config.get("peso_minimo_fardo", 1.0),
+            umbral_vacio=config.get("autocaptura_umbral_vacio", 0.5),
+            intervalo_minimo=config.get("autocaptura_intervalo_min", 2.0)
+        )
+
+    def reiniciar(self):
+        """Vuelve a esperar una balanza vacía antes de la próxima captura"""
+        # Si había peso al encender el modo, ese fardo se captura igual al estabilizarse
+        self.estado = VACIO
+        self._inicio_carga: Optional[float] = None
+        self._ultima_captura: Optional[float] = None
+        self._rechazo_informado = False
+
+    @property
+    def pendiente(self) -> bool:
+        """Hay un fardo en la balanza que todavía no se capturó"""
+        return self.estado == CARGANDO
+
+    def alimentar(self, peso: float, estable: Optional[PesoEstable],
+                  ahora: Optional[float] = None) -> Optional[Captura]:
+        """Procesa una lectura y devuelve la Captura si este peso estable completa un ciclo"""
+        if ahora is None:
+            ahora = estable.tiempo if estable is not None else time.monotonic()
+
+        if peso < self.umbral_vacio:
+            if self.estado != VACIO:
+                logger.debug("Balanza descargada (%s)", self.estado)
+            self.estado = VACIO
+            self._inicio_carga = None
+            self._rechazo_informado = False
+            return None
+
+        if self.estado == VACIO:
+            self.estado = CARGANDO
+            self._inicio_carga = ahora
+        if self.estado != CARGANDO or estable is None:
+            return None
+
+        if estable.peso < self.peso_minimo:
+            if not self._rechazo_informado:
+                self._rechazo_informado = True
+                self.rechazadas += 1
+                logger.info("Peso estable %.2f menor que el mínimo %.2f: no se captura",
+                            estable.peso, self.peso_minimo)
+            return None
+        if self._ultima_captura is not None and estable.tiempo - self._ultima_captura < self.intervalo_minimo:
+            return None
+
+        self.estado = CAPTURADO
+        self._ultima_captura = estable.tiempo
+        self.capturas += 1
+        return Captura(estable.peso, estable.tiempo, time.time(),
+                       max(estable.tiempo - self._inicio_carga, 0.0))
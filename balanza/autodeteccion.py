@@ -0,0 +1,229 @@
+"""
+Detección automática del puerto, baudrate, formato y protocolo de la balanza.
+
+Prueba todos los puertos a la vez (un hilo por puerto); en cada puerto
+recorre las combinaciones de baudrate y paridad/bits, escucha un rato y
+arma las tramas recibidas con cada protocolo conocido. Una combinación
+equivocada produce basura que no se interpreta o no es ASCII imprimible,
+así que el puntaje es la proporción de tramas válidas. Todo termina dentro
+de un tiempo límite total.
+
+Uso:
+    python -m balanza.autodeteccion
+    python -m balanza.autodeteccion --puertos /tmp/balanza_sim --config configuracion.json --balanza balanza1
+"""
+
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import serial
+from serial.tools import list_ports
+
+from balanza.protocolos import PROTOCOLOS, crear_protocolo
+from balanza.tramas import ArmadorTramas
+
+logger = logging.getLogger(__name__)
+
+# En orden de preferencia: ante un empate gana la combinación más común
+BAUDRATES_COMUNES = (9600, 4800, 19200, 2400, 1200, 38400, 57600, 115200)
+FORMATOS_COMUNES = (("none", 8), ("even", 7), ("odd", 7))  # (paridad, bits de datos)
+
+_PARIDADES = {"none": serial.PARITY_NONE, "even": serial.PARITY_EVEN, "odd": serial.PARITY_ODD}
+
+# Puntaje a partir del cual no se prueban más combinaciones en ese puerto
+PUNTAJE_SEGURO = 0.9
+TRAMAS_SEGURAS = 3
+
+
+class Candidato(NamedTuple):
+    """Configuración posible de una balanza con la evidencia que la respalda"""
+    puerto: str
+    baudrate: int
+    parity: str
+    bytesize: int
+    protocolo: str
+    tramas: int       # Tramas armadas con los terminadores del protocolo
+    validas: int      # Tramas interpretadas correctamente
+    puntaje: float    # 0 a 1
+    ejemplo: str      # Primera trama válida, para mostrar al usuario
+
+
+def listar_puertos() -> List[str]:
+    """Puertos serie disponibles en el sistema"""
+    return [p.device for p in list_ports.comports()]
+
+
+def _imprimible(trama: bytes) -> bool:
+    return all(0x20 <= b < 0x7F for b in trama)
+
+
+def evaluar_muestra(datos: bytes, puerto: str, baudrate: int, parity: str,
+                    bytesize: int, pedido: bool = False) -> List[Candidato]:
+    """Interpreta los bytes recibidos con cada protocolo y devuelve los que reconocen tramas.
+
+    ``pedido`` indica que los datos llegaron después de enviar el comando de
+    solicitud: entonces sólo se consideran los protocolos que lo usan.
+    """
+    candidatos = []
+    for nombre in PROTOCOLOS:
+        protocolo = crear_protocolo({"protocolo": nombre})
+        if (protocolo.comando_solicitud is not None) != pedido:
+            continue
+        # Las tramas se copian porque las vistas del armador se invalidan
+        tramas = [bytes(t) for t in ArmadorTramas(protocolo.terminadores).alimentar(datos) if t]
+        if not tramas:
+            continue
+        ascii_ = nombre != "stx_etx"
+        validas = [t for t in tramas
+                   if (not ascii_ or _imprimible(t)) and protocolo.parsear(t) is not None]
+        if not validas:
+            continue
+        # Con pocas tramas la proporción no alcanza: hacen falta TRAMAS_SEGURAS para puntaje pleno
+        puntaje = len(validas) / len(tramas) * min(len(validas), TRAMAS_SEGURAS) / TRAMAS_SEGURAS
+        candidatos.append(Candidato(puerto, baudrate, parity, bytesize, nombre, len(tramas),
+                                    len(validas), round(puntaje, 3),
+                                    bytes(b for b in validas[0] if 0x20 <= b < 0x7F).decode('ascii').strip()))
+    return candidatos
+
+
+def muestrear(puerto: str, baudrate: int, parity: str, bytesize: int,
+              segundos: float, comando: Optional[bytes] = None,
+              segundos_pedido: Optional[float] = None) -> Tuple[bytes, bool]:
+    """Escucha el puerto durante ``segundos``.
+
+    Si en todo ese tiempo no llega nada y hay comando, pregunta el peso cada
+    0.1 s durante ``segundos_pedido`` más (por defecto, otros ``segundos``).
+    Una balanza continua lenta alcanza a transmitir antes de que se pregunte.
+    Devuelve los bytes recibidos y si se envió el comando.
+    """
+    if segundos_pedido is None:
+        segundos_pedido = segundos
+    with serial.Serial(puerto, baudrate=baudrate, parity=_PARIDADES[parity], bytesize=bytesize,
+                       stopbits=serial.STOPBITS_ONE, timeout=0.05) as ser:
+        ser.reset_input_buffer()
+        datos = bytearray()
+        ahora = time.monotonic()
+        fin = ahora + segundos
+        while ahora < fin:
+            datos += ser.read(ser.in_waiting or 1)
+            ahora = time.monotonic()
+        if datos or not comando or segundos_pedido <= 0:
+            return bytes(datos), False
+
+        # Balanzas que sólo responden a pedidos
+        fin = ahora + segundos_pedido
+        proximo_pedido = ahora
+        while ahora < fin:
+            if ahora >= proximo_pedido:
+                ser.write(comando)
+                proximo_pedido = ahora + 0.1
+            datos += ser.read(ser.in_waiting or 1)
+            ahora = time.monotonic()
+        return bytes(datos), True
+
+
+def _probar_puerto(puerto: str, combinaciones: Sequence[Tuple[int, str, int]],
+                   segundos: float, limite: float, comando: Optional[bytes]) -> List[Candidato]:
+    """Recorre las combinaciones en un puerto hasta encontrar una segura o agotar el tiempo"""
+    candidatos: List[Candidato] = []
+    for baudrate, parity, bytesize in combinaciones:
+        restante = limite - time.monotonic()
+        if restante <= 0.05:
+            break
+        try:
+            escucha = min(segundos, restante)
+            datos, pedido = muestrear(puerto, baudrate, parity, bytesize, escucha, comando,
+                                      min(segundos, restante - escucha))
+        except (serial.SerialException, OSError) as e:
+            # Puerto ocupado o inexistente: no tiene sentido probar otras velocidades
+            logger.info("No se puede abrir %s: %s", puerto, e)
+            break
+        except Exception as e:
+            # El adaptador no admite esta combinación (termios.error en Linux, ValueError)
+            logger.debug("%s no acepta %s bd %s/%s: %s", puerto, baudrate, parity, bytesize, e)
+            continue
+        if not datos:
+            continue
+        encontrados = evaluar_muestra(datos, puerto, baudrate, parity, bytesize, pedido)
+        candidatos.extend(encontrados)
+        if any(c.puntaje >= PUNTAJE_SEGURO for c in encontrados):
+            break
+    return candidatos
+
+
+def autodetectar(puertos: Optional[Iterable[str]] = None,
+                 baudrates: Sequence[int] = BAUDRATES_COMUNES,
+                 formatos: Sequence[Tuple[str, int]] = FORMATOS_COMUNES,
+                 segundos: float = 0.6, limite: float = 15.0,
+                 comando: Optional[str] = "P\r\n") -> List[Candidato]:
+    """Prueba los puertos en paralelo y devuelve los candidatos del mejor al peor.
+
+    ``segundos`` es lo que se escucha cada combinación (el doble si hay que
+    preguntar el peso) y ``limite`` el tiempo total. En un mismo puerto las combinaciones se prueban de a una.
+    """
+    puertos = list(puertos) if puertos is not None else listar_puertos()
+    if not puertos:
+        return []
+    combinaciones = [(b, p, bits) for b in baudrates for p, bits in formatos]
+    orden = {c: i for i, c in enumerate(combinaciones)}
+    fin = time.monotonic() + limite
+    comando_bytes = comando.encode('latin-1') if comando else None
+
+    with ThreadPoolExecutor(max_workers=len(puertos), thread_name_prefix="autodeteccion") as pool:
+        futuros = [pool.submit(_probar_puerto, p, combinaciones, segundos, fin, comando_bytes)
+                   for p in puertos]
+        candidatos = [c for f in futuros for c in f.result()]
+
+    candidatos.sort(key=lambda c: (-c.puntaje, -c.validas, orden[(c.baudrate, c.parity, c.bytesize)]))
+    return candidatos
+
+
+def aplicar_candidato(balanza: Dict[str, Any], candidato: Candidato) -> Dict[str, Any]:
+    """Copia el resultado en la configuración de una balanza, conservando el resto de los campos"""
+    balanza.setdefault("nombre", f"Balanza en {candidato.puerto}")
+    balanza.update({
+        "puerto": candidato.puerto,
+        "baudrate": candidato.baudrate,
+        "bytesize": candidato.bytesize,
+        "parity": candidato.parity,
+        "stopbits": 1,
+        "protocolo": candidato.protocolo
+    })
+    for clave, valor in (("timeout", 1), ("xonxoff", False), ("rtscts", False), ("dsrdtr", False),
+                         ("dtr", True), ("rts", True), ("unidad", "kg")):
+        balanza.setdefault(clave, valor)
+    return balanza
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detecta puerto, baudrate y protocolo de la balanza")
+    parser.add_argument("--puertos", nargs="*", help="Puertos a probar (por defecto, todos)")
+    parser.add_argument("--segundos", type=float, default=0.6, help="Escucha por combinación")
+    parser.add_argument("--limite", type=float, default=15.0, help="Tiempo total máximo")
+    parser.add_argument("--config", help="configuracion.json donde guardar el mejor candidato")
+    parser.add_argument("--balanza", default="balanza1", help="Balanza de --config a actualizar")
+    args = parser.parse_args()
+
+    inicio = time.monotonic()
+    candidatos = autodetectar(args.puertos, segundos=args.segundos, limite=args.limite)
+    print(f"{len(candidatos)} candidatos en {time.monotonic() - inicio:.1f} s")
+    for c in candidatos[:10]:
+        print(f"  {c.puntaje:5.2f}  {c.puerto} {c.baudrate} {c.parity}/{c.bytesize} "
+              f"{c.protocolo}: {c.validas}/{c.tramas} tramas, ej. {c.ejemplo!r}")
+
+    if args.config and candidatos:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        balanza = config.setdefault("balanzas", {}).setdefault(args.balanza, {})
+        aplicar_candidato(balanza, candidatos[0])
+        with open(args.config, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=4, ensure_ascii=False)
+        print(f"{args.config}: {args.balanza} usa {candidatos[0].puerto} a {candidatos[0].baudrate} bd")
+
+
+if __name__ == "__main__":
+    main()
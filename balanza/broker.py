@@ -0,0 +1,408 @@
+"""
+Broker local: un proceso abre el puerto de la balanza y reparte las lecturas.
+
+Sólo un proceso puede abrir el puerto COM. El broker lo abre con un
+BalanzaReader y atiende a cualquier cantidad de clientes locales (la
+aplicación principal, probar_balanza.py, el configurador) por un socket
+Unix o, donde no existe AF_UNIX (Windows), por TCP en 127.0.0.1.
+
+Cada mensaje es una cabecera <tipo:u8><largo:u16> seguida del contenido:
+
+    HOLA     JSON con versión, balanza, nombre y unidad (al conectarse)
+    LECTURA  <secuencia:u64><fecha:f64><peso:f64><tara:f64><peso_estable:f64>
+             <desviacion:f32><pico_a_pico:f32><banderas:u8>  (NaN = sin valor)
+
+Al conectarse el cliente recibe HOLA y enseguida la última lectura, sin
+esperar a la balanza. Después el broker revisa la publicación cada
+``intervalo_sondeo`` segundos y envía la última si es nueva: las muestras
+intermedias de un mismo intervalo no llegan a los clientes. Si no hay datos
+nuevos, repite la última cada ``intervalo_latido`` segundos.
+
+En configuracion.json, cada balanza que se comparte lleva "broker": true
+(dirección por defecto) o "broker": "ruta.sock" / "127.0.0.1:47801".
+BalanzaReader.conectar() usa el broker si está corriendo y, si no, abre el
+puerto como siempre.
+
+Uso: python -m balanza.broker --config configuracion.json [--balanzas balanza1 ...]
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import queue
+import signal
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from balanza.protocolos import Lectura
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+
+HOLA = 1
+LECTURA = 2
+
+CABECERA = struct.Struct("<BH")
+DATOS_LECTURA = struct.Struct("<QddddffB")
+
+# Banderas de LECTURA
+CON_PESO_ESTABLE = 0x01
+INDICADOR_INFORMA = 0x02    # El protocolo informa estabilidad (Lectura.estable no es None)
+INDICADOR_ESTABLE = 0x04
+OBSOLETA = 0x08             # El broker está reconectando la balanza
+
+PUERTO_TCP_BASE = 47800
+NAN = float("nan")
+
+
+class LecturaBroker(NamedTuple):
+    """Lectura recibida del broker"""
+    secuencia: int          # Secuencia de la publicación en el broker
+    fecha: float            # time.time() en que el broker recibió el dato
+    lectura: Lectura
+    peso_estable: Optional[float]
+    desviacion: float
+    pico_a_pico: float
+    obsoleta: bool
+
+
+def direccion_broker(balanza_key: str, balanza_config: Dict[str, Any]) -> Optional[str]:
+    """Dirección del broker de una balanza, o None si no se comparte por broker"""
+    valor = balanza_config.get("broker")
+    if not valor:
+        return None
+    if isinstance(valor, str):
+        return valor
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(tempfile.gettempdir(), f"balanza_{balanza_key}.sock")
+    return f"127.0.0.1:{PUERTO_TCP_BASE + zlib.crc32(balanza_key.encode()) % 100}"
+
+
+def _familia(direccion: str) -> Tuple[int, Any]:
+    """(familia, dirección) para socket(): 'host:puerto' es TCP, cualquier otra cosa una ruta Unix"""
+    host, separador, puerto = direccion.rpartition(":")
+    if separador and puerto.isdigit() and not os.path.isabs(direccion):
+        return socket.AF_INET, (host or "127.0.0.1", int(puerto))
+    if not hasattr(socket, "AF_UNIX"):
+        raise OSError(f"Este sistema no tiene sockets Unix; usar 'host:puerto' en lugar de {direccion}")
+    return socket.AF_UNIX, direccion
+
+
+def empaquetar_hola(datos: Dict[str, Any]) -> bytes:
+    contenido = json.dumps(dict(datos, version=VERSION)).encode("utf-8")
+    return CABECERA.pack(HOLA, len(contenido)) + contenido
+
+
+def empaquetar_lectura(secuencia: int, fecha: float, lectura: Lectura,
+                       peso_estable=None, obsoleta: bool = False) -> bytes:
+    """Arma un mensaje LECTURA; peso_estable es un PesoEstable o None"""
+    banderas = OBSOLETA if obsoleta else 0
+    if lectura.estable is not None:
+        banderas |= INDICADOR_INFORMA | (INDICADOR_ESTABLE if lectura.estable else 0)
+    if peso_estable is not None:
+        banderas |= CON_PESO_ESTABLE
+        estable, desviacion, pico = peso_estable.peso, peso_estable.desviacion, peso_estable.pico_a_pico
+    else:
+        estable = desviacion = pico = NAN
+    return CABECERA.pack(LECTURA, DATOS_LECTURA.size) + DATOS_LECTURA.pack(
+        secuencia, fecha, lectura.peso, NAN if lectura.tara is None else lectura.tara,
+        estable, desviacion, pico, banderas)
+
+
+def desempaquetar_lectura(contenido: bytes, unidad: Optional[str] = None) -> LecturaBroker:
+    secuencia, fecha, peso, tara, estable, desviacion, pico, banderas = DATOS_LECTURA.unpack(contenido)
+    indicador = bool(banderas & INDICADOR_ESTABLE) if banderas & INDICADOR_INFORMA else None
+    lectura = Lectura(peso, indicador, unidad, None if math.isnan(tara) else tara)
+    return LecturaBroker(secuencia, fecha, lectura,
+                         estable if banderas & CON_PESO_ESTABLE else None,
+                         desviacion, pico, bool(banderas & OBSOLETA))
+
+
+class ServidorBroker:
+    """Reparte las publicaciones de un BalanzaReader conectado a los clientes del socket.
+
+    Un hilo acepta conexiones y otro revisa la publicación del lector cada
+    ``intervalo_sondeo`` segundos (sin locks, ver Publicacion) y la envía a
+    todos. Los envíos no bloquean: un cliente que no vacía su socket se
+    desconecta en lugar de frenar a los demás.
+    """
+
+    def __init__(self, lector, balanza_key: str, direccion: str,
+                 intervalo_sondeo: float = 0.01, intervalo_latido: float = 1.0):
+        self.lector = lector
+        self.balanza_key = balanza_key
+        self.direccion = direccion
+        self.intervalo_sondeo = intervalo_sondeo
+        self.intervalo_latido = intervalo_latido
+        self.enviados = 0
+        self.desconectados_lentos = 0
+        self._clientes: List[socket.socket] = []
+        self._nuevos: "queue.SimpleQueue[socket.socket]" = queue.SimpleQueue()
+        self._detener = threading.Event()
+        self._socket: Optional[socket.socket] = None
+        self._hilos: List[threading.Thread] = []
+
+    @property
+    def clientes(self) -> int:
+        return len(self._clientes)
+
+    def iniciar(self):
+        """Abre el socket de escucha; lanza OSError si la dirección está ocupada"""
+        familia, direccion = _familia(self.direccion)
+        if familia == socket.AF_INET:
+            servidor = socket.socket(familia, socket.SOCK_STREAM)
+            if os.name != "nt":
+                servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        else:
+            self._liberar_ruta(direccion)
+            servidor = socket.socket(familia, socket.SOCK_STREAM)
+        servidor.bind(direccion)
+        servidor.listen(16)
+        servidor.settimeout(0.5)  # Para ver _detener sin depender de close() desde otro hilo
+        self._socket = servidor
+        self._detener.clear()
+        self._hilos = [
+            threading.Thread(target=self._aceptar, daemon=True, name=f"broker-aceptar-{self.balanza_key}"),
+            threading.Thread(target=self._difundir, daemon=True, name=f"broker-{self.balanza_key}")
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+        logger.info("Broker de %s escuchando en %s", self.balanza_key, self.direccion)
+
+    @staticmethod
+    def _liberar_ruta(ruta: str):
+        """Borra el socket que dejó un broker anterior, salvo que siga atendiendo"""
+        if not os.path.exists(ruta):
+            return
+        prueba = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            prueba.connect(ruta)
+        except OSError:
+            os.unlink(ruta)
+        else:
+            raise OSError(f"Ya hay un broker atendiendo en {ruta}")
+        finally:
+            prueba.close()
+
+    def detener(self):
+        self._detener.set()
+        for hilo in self._hilos:
+            hilo.join(timeout=2.0)
+        self._hilos = []
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            familia, direccion = _familia(self.direccion)
+            if familia != socket.AF_INET and os.path.exists(direccion):
+                os.unlink(direccion)
+        for cliente in self._clientes:
+            cliente.close()
+        self._clientes = []
+
+    def _aceptar(self):
+        while not self._detener.is_set():
+            try:
+                cliente, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            cliente.setblocking(False)
+            self._nuevos.put(cliente)
+
+    def _hola(self) -> bytes:
+        balanza = self.lector.config["balanzas"][self.balanza_key]
+        return empaquetar_hola({"balanza": self.balanza_key, "nombre": balanza.get("nombre", self.balanza_key),
+                                "unidad": balanza.get("unidad"), "protocolo": balanza.get("protocolo")})
+
+    def _mensaje(self, publicacion, obsoleta: bool) -> Optional[bytes]:
+        if publicacion.lectura is None:
+            return None
+        return empaquetar_lectura(publicacion.secuencia, publicacion.fecha, publicacion.lectura,
+                                  publicacion.peso_estable, obsoleta)
+
+    def _difundir(self):
+        """Único hilo que escribe en los clientes, así los mensajes nunca se mezclan"""
+        ultima = None
+        ultimo_envio = 0.0
+        while not self._detener.wait(self.intervalo_sondeo):
+            publicacion = self.lector.leer_publicacion()
+            obsoleta = self.lector.esta_obsoleta()
+            mensaje = None
+
+            while True:
+                try:
+                    cliente = self._nuevos.get_nowait()
+                except queue.Empty:
+                    break
+                mensaje = mensaje or self._mensaje(publicacion, obsoleta)
+                # La lectura actual va con el saludo: el cliente no espera a la balanza
+                if self._enviar(cliente, self._hola() + (mensaje or b"")):
+                    self._clientes = self._clientes + [cliente]
+                    logger.info("Cliente conectado al broker de %s (%d)", self.balanza_key, len(self._clientes))
+
+            ahora = time.monotonic()
+            estado = (publicacion.secuencia, obsoleta)
+            if estado == ultima and ahora - ultimo_envio < self.intervalo_latido:
+                continue
+            ultima = estado
+            ultimo_envio = ahora
+            mensaje = mensaje or self._mensaje(publicacion, obsoleta)
+            if mensaje is None or not self._clientes:
+                continue
+            vivos = [c for c in self._clientes if self._enviar(c, mensaje)]
+            if len(vivos) != len(self._clientes):
+                self._clientes = vivos
+                logger.info("Broker de %s: %d clientes", self.balanza_key, len(vivos))
+            self.enviados += 1
+
+    def _enviar(self, cliente: socket.socket, datos: bytes) -> bool:
+        """Envía sin bloquear; si no entra completo, cierra el cliente"""
+        try:
+            if cliente.send(datos) == len(datos):
+                return True
+            self.desconectados_lentos += 1
+            logger.warning("Cliente del broker de %s demasiado lento; se desconecta", self.balanza_key)
+        except (BlockingIOError, InterruptedError):
+            self.desconectados_lentos += 1
+            logger.warning("Cliente del broker de %s demasiado lento; se desconecta", self.balanza_key)
+        except OSError:
+            pass  # El cliente cerró la conexión
+        cliente.close()
+        return False
+
+
+class ClienteBroker:
+    """Conexión de un cliente con el broker.
+
+    Se comporta como la fuente de datos de un BalanzaReader: tiene is_open,
+    port, close() y cancel_read() (despierta al hilo que espera en recibir()).
+    """
+
+    def __init__(self, direccion: str, timeout: float = 1.0):
+        self.port = direccion
+        self.info: Dict[str, Any] = {}
+        self._buffer = bytearray()
+        familia, destino = _familia(direccion)
+        self._socket = socket.socket(familia, socket.SOCK_STREAM)
+        try:
+            self._socket.settimeout(timeout)
+            self._socket.connect(destino)
+            self._pendientes = self._recibir_hola()
+        except BaseException:
+            self._socket.close()
+            raise
+        self.is_open = True
+
+    def _recibir_hola(self) -> List[LecturaBroker]:
+        """Lee el saludo; devuelve las lecturas que llegaron con él"""
+        while True:
+            mensajes = self._leer()
+            if self.info:
+                return mensajes
+
+    def _leer(self) -> List[LecturaBroker]:
+        datos = self._socket.recv(65536)
+        if not datos:
+            raise ConnectionResetError("El broker cerró la conexión")
+        buffer = self._buffer
+        buffer += datos
+        mensajes = []
+        inicio = 0
+        while len(buffer) - inicio >= CABECERA.size:
+            tipo, largo = CABECERA.unpack_from(buffer, inicio)
+            fin = inicio + CABECERA.size + largo
+            if fin > len(buffer):
+                break
+            contenido = bytes(buffer[inicio + CABECERA.size:fin])
+            if tipo == LECTURA:
+                mensajes.append(desempaquetar_lectura(contenido, self.info.get("unidad")))
+            elif tipo == HOLA:
+                info = json.loads(contenido.decode("utf-8"))
+                if info.get("version") != VERSION:
+                    raise ConnectionError(f"Versión del broker {info.get('version')} no compatible ({VERSION})")
+                self.info = info
+            inicio = fin
+        del buffer[:inicio]
+        return mensajes
+
+    def recibir(self) -> List[LecturaBroker]:
+        """Espera datos hasta el timeout y devuelve las lecturas completas (puede ser [])"""
+        if self._pendientes:
+            mensajes, self._pendientes = self._pendientes, []
+            return mensajes
+        try:
+            return self._leer()
+        except socket.timeout:
+            return []
+
+    def cancel_read(self):
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        self.is_open = False
+        self._socket.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparte las balanzas con otros programas del equipo")
+    parser.add_argument("--config", default="configuracion.json")
+    parser.add_argument("--balanzas", nargs="*", help="Balanzas a compartir (por defecto, las que tienen 'broker')")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from balanza_reader import BalanzaReader
+    from funciones.registro import configurar_registro
+    configurar_registro()
+
+    config = BalanzaReader(args.config).config
+    claves = args.balanzas or [k for k, b in config["balanzas"].items() if b.get("broker")]
+    if not claves:
+        parser.error("Ninguna balanza tiene 'broker' en la configuración; indicar --balanzas")
+
+    servidores = []
+    for clave in claves:
+        balanza = config["balanzas"][clave]
+        direccion = direccion_broker(clave, dict(balanza, broker=balanza.get("broker") or True))
+        lector = BalanzaReader(args.config, config)
+        lector.usar_broker = False  # El broker es el único que abre el puerto
+        if not lector.conectar(clave):
+            print(f"{clave}: no se pudo abrir {balanza.get('puerto')}")
+            continue
+        servidor = ServidorBroker(lector, clave, direccion)
+        servidor.iniciar()
+        servidores.append(servidor)
+        print(f"{clave}: {balanza.get('puerto')} -> {direccion}")
+    if not servidores:
+        sys.exit(1)
+
+    # terminate() / kill sin -9: cerrar igual que con Ctrl+C y borrar el socket
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while True:
+            time.sleep(60)
+            for servidor in servidores:
+                logger.info("Broker de %s: %d clientes, %d mensajes", servidor.balanza_key,
+                            servidor.clientes, servidor.enviados)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for servidor in servidores:
+            servidor.detener()
+            servidor.lector.desconectar()
+
+
+if __name__ == "__main__":
+    main()
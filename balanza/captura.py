@@ -0,0 +1,173 @@
+import json
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Formato del archivo de captura (little endian):
+#   cabecera: "BZCAP", versión (1 byte), inicio en epoch (double), largo de los metadatos (uint32)
+#   metadatos: JSON en UTF-8 con la balanza y su configuración
+#   registros: microsegundos desde el registro anterior (uint32), largo (uint16), bytes recibidos
+MAGICO = b"BZCAP"
+VERSION = 1
+_CABECERA = struct.Struct("<5sBdI")
+_REGISTRO = struct.Struct("<IH")
+_MAX_DELTA = 0xFFFFFFFF
+_MAX_BLOQUE = 0xFFFF
+
+
+class CapturaSerial:
+    """Guarda los bloques de bytes crudos recibidos del puerto con su marca de tiempo"""
+
+    def __init__(self, ruta: str, metadatos: Optional[Dict[str, Any]] = None):
+        self.ruta = ruta
+        self.bloques = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._archivo = open(ruta, "wb", buffering=64 * 1024)
+        datos = json.dumps(metadatos or {}, ensure_ascii=False).encode("utf-8")
+        self._archivo.write(_CABECERA.pack(MAGICO, VERSION, time.time(), len(datos)))
+        self._archivo.write(datos)
+        self._ultimo_ns = time.monotonic_ns()
+
+    def registrar(self, datos: bytes, tiempo_ns: Optional[int] = None):
+        """Agrega un bloque recibido (tiempo_ns en la base de time.monotonic_ns)"""
+        if tiempo_ns is None:
+            tiempo_ns = time.monotonic_ns()
+        with self._lock:
+            archivo = self._archivo
+            if archivo is None:
+                return
+            delta = min(max(tiempo_ns - self._ultimo_ns, 0) // 1000, _MAX_DELTA)
+            self._ultimo_ns = tiempo_ns
+            for inicio in range(0, len(datos), _MAX_BLOQUE):
+                parte = datos[inicio:inicio + _MAX_BLOQUE]
+                archivo.write(_REGISTRO.pack(delta, len(parte)))
+                archivo.write(parte)
+                delta = 0
+            self.bloques += 1
+            self.bytes += len(datos)
+
+    def cerrar(self):
+        """Vacía el buffer y cierra el archivo"""
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+    @property
+    def abierta(self) -> bool:
+        return self._archivo is not None
+
+
+class LectorCaptura:
+    """Lee un archivo de captura: metadatos y bloques con su tiempo relativo al primero"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            cabecera = f.read(_CABECERA.size)
+            if len(cabecera) < _CABECERA.size:
+                raise ValueError(f"Archivo de captura incompleto: {ruta}")
+            magico, version, self.inicio, largo = _CABECERA.unpack(cabecera)
+            if magico != MAGICO or version != VERSION:
+                raise ValueError(f"No es un archivo de captura válido: {ruta}")
+            self.metadatos: Dict[str, Any] = json.loads(f.read(largo).decode("utf-8"))
+            self._datos = f.read()
+
+    def bloques(self) -> Iterator[Tuple[float, bytes]]:
+        """Recorre los bloques como (segundos desde el primer bloque, bytes)"""
+        datos = self._datos
+        desempaquetar = _REGISTRO.unpack_from
+        tamanio = _REGISTRO.size
+        posicion = 0
+        total = len(datos)
+        tiempo_us = 0
+        primero = True
+        while posicion + tamanio <= total:
+            delta, largo = desempaquetar(datos, posicion)
+            posicion += tamanio
+            # El primer delta cuenta desde que se abrió el archivo: no se espera
+            tiempo_us = 0 if primero else tiempo_us + delta
+            primero = False
+            yield tiempo_us / 1e6, datos[posicion:posicion + largo]
+            posicion += largo
+
+    def resumen(self) -> Dict[str, Any]:
+        """Cantidad de bloques, bytes y duración de la captura"""
+        bloques = 0
+        total = 0
+        duracion = 0.0
+        for duracion, datos in self.bloques():
+            bloques += 1
+            total += len(datos)
+        return {"bloques": bloques, "bytes": total, "duracion": duracion,
+                "balanza": self.metadatos.get("balanza")}
+
+
+class FuenteReproduccion:
+    """Reemplaza al puerto serial y entrega una captura respetando sus tiempos.
+
+    Implementa lo que usa el hilo de lectura de BalanzaReader (read, in_waiting,
+    write, is_open, cancel_read, close). ``velocidad`` multiplica el ritmo
+    original: 1 es tiempo real, 10 es diez veces más rápido y 0 entrega los
+    bloques sin esperar. Al terminar la captura la fuente se cierra sola.
+    """
+
+    def __init__(self, ruta: str, velocidad: float = 1.0):
+        self.captura = LectorCaptura(ruta)
+        self.velocidad = velocidad
+        self.is_open = True
+        self._bloques = self.captura.bloques()
+        self._pendiente = b""
+        self._proximo: Optional[Tuple[float, bytes]] = None
+        self._cancelado = threading.Event()
+        self._inicio: Optional[float] = None
+        self._avanzar()
+
+    def _avanzar(self):
+        self._proximo = next(self._bloques, None)
+
+    def _vencimiento(self, tiempo: float) -> float:
+        if self._inicio is None:
+            self._inicio = time.perf_counter()
+        if not self.velocidad:
+            return 0.0
+        return self._inicio + tiempo / self.velocidad
+
+    @property
+    def in_waiting(self) -> int:
+        if self._pendiente:
+            return len(self._pendiente)
+        if self._proximo is not None and time.perf_counter() >= self._vencimiento(self._proximo[0]):
+            return len(self._proximo[1])
+        return 0
+
+    def read(self, size: int = 1) -> bytes:
+        """Espera hasta que vence el próximo bloque y devuelve hasta size bytes"""
+        if not self._pendiente:
+            if self._proximo is None:
+                self.is_open = False
+                return b""
+            tiempo, datos = self._proximo
+            espera = self._vencimiento(tiempo) - time.perf_counter()
+            if espera > 0 and self._cancelado.wait(espera):
+                self._cancelado.clear()
+                return b""
+            self._pendiente = datos
+            self._avanzar()
+
+        datos = self._pendiente[:max(size, 1)]
+        self._pendiente = self._pendiente[len(datos):]
+        return datos
+
+    def write(self, datos: bytes) -> int:
+        """Las solicitudes de peso se descartan: la captura ya tiene las respuestas"""
+        return len(datos)
+
+    def cancel_read(self):
+        self._cancelado.set()
+
+    def close(self):
+        self.is_open = False
+        self._cancelado.set()
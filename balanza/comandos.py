@@ -0,0 +1,240 @@
+"""
+Comandos hacia el indicador (cero, tara, impresión, solicitud de peso).
+
+Cada protocolo declara sus comandos habituales en ``Protocolo.comandos`` y
+la balanza puede reemplazarlos o agregar otros en configuracion.json:
+
+    "comandos": {"cero": "Z\\r\\n",
+                 "tara": {"enviar": "T\\r\\n", "respuesta": "^T\\\\s*A", "rechazo": "^T\\\\s*I"}}
+
+Un comando como texto se da por respondido con la próxima trama con peso.
+Con ``respuesta`` (expresión regular sobre la trama) se espera esa trama
+puntual; ``rechazo`` reconoce la respuesta de un comando que el indicador no
+ejecutó (por ejemplo, cero con la balanza en movimiento).
+
+Los indicadores responden en el orden en que reciben los comandos, así que
+los pendientes forman una cola: cada trama se compara sólo con el más viejo.
+"""
+
+import logging
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Pattern
+
+from balanza.protocolos import Lectura
+
+logger = logging.getLogger(__name__)
+
+# Comando con el que los protocolos de solicitud y respuesta piden el peso
+SOLICITUD = "solicitud"
+
+
+class Comando(NamedTuple):
+    nombre: str
+    datos: bytes
+    respuesta: Optional[Pattern[bytes]] = None   # None: la próxima trama con peso
+    rechazo: Optional[Pattern[bytes]] = None
+
+
+class RespuestaComando(NamedTuple):
+    """Resultado de un comando enviado con CanalComandos.enviar"""
+    nombre: str
+    aceptado: bool              # False si la respuesta coincidió con 'rechazo'
+    trama: bytes
+    lectura: Optional[Lectura]  # Peso de la trama de respuesta, si traía
+    rtt: float                  # Segundos desde que se escribió el comando hasta la respuesta
+
+
+class ComandoVencido(TimeoutError):
+    """El indicador no respondió el comando a tiempo"""
+
+
+def _patron(texto: Optional[str]) -> Optional[Pattern[bytes]]:
+    return re.compile(texto.encode("latin-1")) if texto else None
+
+
+def crear_comandos(protocolo, balanza_config: Dict[str, Any]) -> Dict[str, Comando]:
+    """Comandos del protocolo con los reemplazos de 'comandos' de la balanza"""
+    definiciones: Dict[str, Any] = dict(protocolo.comandos)
+    definiciones.update(balanza_config.get("comandos", {}))
+    if protocolo.comando_solicitud:
+        definiciones.setdefault(SOLICITUD, protocolo.comando_solicitud.decode("latin-1"))
+    comandos = {}
+    for nombre, definicion in definiciones.items():
+        if isinstance(definicion, str):
+            definicion = {"enviar": definicion}
+        comandos[nombre] = Comando(nombre, definicion["enviar"].encode("latin-1"),
+                                   _patron(definicion.get("respuesta")), _patron(definicion.get("rechazo")))
+    return comandos
+
+
+class _Pendiente:
+    __slots__ = ("comando", "futuro", "enviado")
+
+    def __init__(self, comando: Comando, futuro: Future, enviado: float):
+        self.comando = comando
+        self.futuro = futuro
+        self.enviado = enviado
+
+
+class _Estadistica:
+    """Contadores y últimos tiempos de ida y vuelta de un comando"""
+
+    def __init__(self, historial: int):
+        self.enviados = 0
+        self.respondidos = 0
+        self.rechazados = 0
+        self.vencidos = 0
+        self.rtt: Deque[float] = deque(maxlen=historial)
+
+    def instantanea(self) -> Dict[str, Any]:
+        datos = {"enviados": self.enviados, "respondidos": self.respondidos,
+                 "rechazados": self.rechazados, "vencidos": self.vencidos}
+        rtt = sorted(self.rtt)
+        if rtt:
+            datos["rtt_ms"] = {
+                "ultimo": round(self.rtt[-1] * 1000, 2),
+                "p50": round(statistics.median(rtt) * 1000, 2),
+                "p95": round(rtt[int(len(rtt) * 0.95)] * 1000, 2),
+                "max": round(rtt[-1] * 1000, 2),
+            }
+        return datos
+
+
+class CanalComandos:
+    """Envía comandos al puerto y empareja las respuestas que arma el hilo de lectura.
+
+    ``enviar`` se puede llamar desde cualquier hilo: escribe en el puerto
+    bajo un lock propio, fuera del de la cola, así que una escritura lenta no
+    frena al hilo de lectura. Ese hilo llama a ``recibir`` con cada trama y a
+    ``vencer`` periódicamente, y pide el peso con ``esperar=False``: si otro
+    hilo está escribiendo, lo vuelve a pedir en la vuelta siguiente.
+    """
+
+    def __init__(self, comandos: Optional[Dict[str, Comando]] = None, timeout: float = 1.0,
+                 historial: int = 200):
+        self.comandos = comandos or {}
+        self.timeout = timeout
+        self._historial = historial
+        self._pendientes: Deque[_Pendiente] = deque()
+        self._lock = threading.Lock()               # Cola de pendientes y estadísticas
+        self._lock_escritura = threading.Lock()     # Sólo entre hilos que envían
+        self._estadisticas: Dict[str, _Estadistica] = {}
+
+    @classmethod
+    def desde_config(cls, protocolo, balanza_config: Dict[str, Any]) -> "CanalComandos":
+        return cls(crear_comandos(protocolo, balanza_config), balanza_config.get("timeout_comando", 1.0))
+
+    def disponibles(self) -> List[str]:
+        return sorted(self.comandos)
+
+    def hay_pendientes(self) -> bool:
+        return bool(self._pendientes)
+
+    def esperando(self, nombre: str) -> bool:
+        """True si hay un comando con ese nombre sin responder"""
+        return any(p.comando.nombre == nombre for p in self._pendientes)
+
+    def _estadistica(self, nombre: str) -> _Estadistica:
+        estadistica = self._estadisticas.get(nombre)
+        if estadistica is None:
+            estadistica = self._estadisticas[nombre] = _Estadistica(self._historial)
+        return estadistica
+
+    def enviar(self, nombre: str, escribir: Callable[[bytes], Any], esperar: bool = True) -> Optional[Future]:
+        """Escribe el comando con ``escribir`` y devuelve un Future con su RespuestaComando.
+
+        KeyError si el comando no existe; los errores de escritura se propagan.
+        El Future falla con ComandoVencido si no hay respuesta en ``timeout`` segundos.
+        Con ``esperar=False`` (el hilo de lectura) devuelve None sin escribir si
+        otro hilo está escribiendo un comando, en lugar de esperarlo.
+        """
+        comando = self.comandos[nombre]
+        futuro: Future = Future()
+        # _lock_escritura mantiene la cola en el orden de escritura entre hilos que envían;
+        # write() corre sin _lock para que recibir() y vencer() no esperen al puerto
+        if not self._lock_escritura.acquire(blocking=esperar):
+            return None
+        try:
+            with self._lock:
+                # Encolar antes de escribir: la respuesta puede llegar antes de que write() vuelva
+                pendiente = _Pendiente(comando, futuro, time.monotonic())
+                self._pendientes.append(pendiente)
+                self._estadistica(nombre).enviados += 1
+            try:
+                escribir(comando.datos)
+            except Exception:
+                with self._lock:
+                    # Pudo haberse respondido o vencido mientras se escribía
+                    if pendiente in self._pendientes:
+                        self._pendientes.remove(pendiente)
+                        self._estadistica(nombre).enviados -= 1
+                raise
+        finally:
+            self._lock_escritura.release()
+        return futuro
+
+    def recibir(self, trama, lectura: Optional[Lectura], ahora: float) -> bool:
+        """Compara una trama con el comando pendiente más viejo; True si era su respuesta"""
+        with self._lock:
+            if not self._pendientes:
+                return False
+            pendiente = self._pendientes[0]
+            comando = pendiente.comando
+            if comando.respuesta is None:
+                if lectura is None:
+                    return False
+                aceptado = True
+            elif comando.respuesta.search(trama):
+                aceptado = True
+            elif comando.rechazo is not None and comando.rechazo.search(trama):
+                aceptado = False
+            else:
+                return False
+            self._pendientes.popleft()
+            rtt = max(ahora - pendiente.enviado, 0.0)
+            estadistica = self._estadistica(comando.nombre)
+            estadistica.respondidos += 1
+            estadistica.rechazados += not aceptado
+            estadistica.rtt.append(rtt)
+
+        nivel = logging.DEBUG if comando.nombre == SOLICITUD else logging.INFO
+        logger.log(nivel, "Comando %s %s en %.1f ms", comando.nombre,
+                   "respondido" if aceptado else "rechazado", rtt * 1000,
+                   extra={"comando": comando.nombre, "rtt_ms": round(rtt * 1000, 2)})
+        pendiente.futuro.set_result(RespuestaComando(comando.nombre, aceptado, bytes(trama), lectura, rtt))
+        return True
+
+    def vencer(self, ahora: Optional[float] = None):
+        """Da por perdidos los comandos que esperan respuesta hace más de ``timeout``"""
+        if ahora is None:
+            ahora = time.monotonic()
+        vencidos = []
+        with self._lock:
+            while self._pendientes and ahora - self._pendientes[0].enviado > self.timeout:
+                pendiente = self._pendientes.popleft()
+                self._estadistica(pendiente.comando.nombre).vencidos += 1
+                vencidos.append(pendiente)
+        for pendiente in vencidos:
+            nombre = pendiente.comando.nombre
+            nivel = logging.DEBUG if nombre == SOLICITUD else logging.WARNING
+            logger.log(nivel, "Comando %s sin respuesta en %.1f s", nombre, self.timeout,
+                       extra={"comando": nombre})
+            pendiente.futuro.set_exception(ComandoVencido(f"{nombre}: sin respuesta en {self.timeout:g} s"))
+
+    def cancelar(self, motivo: str):
+        """Hace fallar todos los pendientes (al desconectar la balanza)"""
+        with self._lock:
+            pendientes = list(self._pendientes)
+            self._pendientes.clear()
+        for pendiente in pendientes:
+            pendiente.futuro.set_exception(ConnectionError(f"{pendiente.comando.nombre}: {motivo}"))
+
+    def instantanea(self) -> Dict[str, Dict[str, Any]]:
+        """Contadores y tiempos de ida y vuelta por comando"""
+        with self._lock:
+            return {nombre: e.instantanea() for nombre, e in self._estadisticas.items()}
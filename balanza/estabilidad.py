@@ -0,0 +1,173 @@
+from array import array
+from collections import deque
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+
+class PesoEstable(NamedTuple):
+    """Peso estable publicado junto con la ventana de muestras que lo originó"""
+    peso: float                    # Media de la ventana
+    tiempo: float                  # time.monotonic() de la última muestra
+    desviacion: float
+    pico_a_pico: float
+    muestras: Tuple[float, ...]    # Valores en orden cronológico
+    tiempos: Tuple[float, ...]     # time.monotonic() de cada muestra
+
+
+class DetectorEstabilidad:
+    """Detecta peso estable sobre las últimas N muestras.
+
+    Las muestras y sus tiempos se guardan en anillos array('d') de tamaño fijo.
+    Media y varianza se actualizan en O(1) por muestra (Welford con
+    reemplazo) y el pico a pico con colas monótonas de mínimos y máximos.
+    La ventana es estable cuando está completa, el pico a pico no supera la
+    tolerancia, la desviación no supera el máximo (si se configuró), cubre al
+    menos ``tiempo_minimo`` segundos y el indicador no informó movimiento.
+    """
+
+    # Cada cuántas vueltas del anillo se recalcula la varianza desde cero
+    # para no acumular error de redondeo
+    RECALCULO_VUELTAS = 100
+
+    def __init__(self, muestras: int = 10, tolerancia: float = 0.5,
+                 desviacion_max: Optional[float] = None, tiempo_minimo: float = 0.0):
+        if muestras < 2:
+            raise ValueError("La ventana de estabilidad necesita al menos 2 muestras")
+        self.tamanio = muestras
+        self.tolerancia = tolerancia
+        self.desviacion_max = desviacion_max
+        self.tiempo_minimo = tiempo_minimo
+
+        self._valores = array('d', bytes(8 * muestras))
+        self._tiempos = array('d', bytes(8 * muestras))
+        self._movimiento = array('b', bytes(muestras))  # 1 si el indicador informó movimiento
+        self.reiniciar()
+
+    @classmethod
+    def desde_config(cls, balanza_config: Dict[str, Any]) -> "DetectorEstabilidad":
+        """Crea el detector con la sección 'estabilidad' de la configuración de la balanza"""
+        config = balanza_config.get("estabilidad", {})
+        return cls(
+            muestras=config.get("muestras", 10),
+            tolerancia=config.get("tolerancia", 0.5),
+            desviacion_max=config.get("desviacion_max"),
+            tiempo_minimo=config.get("tiempo_minimo", 0.0)
+        )
+
+    def reiniciar(self):
+        """Vacía la ventana"""
+        self._secuencia = 0  # Total de muestras agregadas
+        self._cantidad = 0
+        self._media = 0.0
+        self._m2 = 0.0
+        self._en_movimiento = 0
+        self._maximos = deque()  # Secuencias con valores decrecientes
+        self._minimos = deque()  # Secuencias con valores crecientes
+
+    def agregar(self, valor: float, tiempo: float, estable_indicador: Optional[bool] = None) -> Optional[PesoEstable]:
+        """Agrega una muestra y devuelve el peso estable si la ventana lo es"""
+        n = self.tamanio
+        secuencia = self._secuencia
+        posicion = secuencia % n
+        valores = self._valores
+
+        if self._cantidad == n:
+            # Reemplazo de la muestra más vieja
+            viejo = valores[posicion]
+            media = self._media + (valor - viejo) / n
+            self._m2 += (valor - viejo) * (valor - media + viejo - self._media)
+            self._media = media
+            self._en_movimiento -= self._movimiento[posicion]
+        else:
+            self._cantidad += 1
+            delta = valor - self._media
+            self._media += delta / self._cantidad
+            self._m2 += delta * (valor - self._media)
+
+        valores[posicion] = valor
+        self._tiempos[posicion] = tiempo
+        movimiento = 1 if estable_indicador is False else 0
+        self._movimiento[posicion] = movimiento
+        self._en_movimiento += movimiento
+
+        # Colas monótonas para el pico a pico
+        limite = secuencia - n
+        maximos = self._maximos
+        minimos = self._minimos
+        if maximos and maximos[0] <= limite:
+            maximos.popleft()
+        if minimos and minimos[0] <= limite:
+            minimos.popleft()
+        while maximos and valores[maximos[-1] % n] <= valor:
+            maximos.pop()
+        maximos.append(secuencia)
+        while minimos and valores[minimos[-1] % n] >= valor:
+            minimos.pop()
+        minimos.append(secuencia)
+
+        self._secuencia = secuencia + 1
+        if self._secuencia % (n * self.RECALCULO_VUELTAS) == 0:
+            self._recalcular()
+
+        if self.es_estable():
+            return self.publicar()
+        return None
+
+    def _recalcular(self):
+        """Recalcula media y varianza desde las muestras guardadas"""
+        valores = self._valores[:self._cantidad]
+        self._media = sum(valores) / self._cantidad
+        self._m2 = sum((v - self._media) ** 2 for v in valores)
+
+    @property
+    def media(self) -> float:
+        return self._media
+
+    @property
+    def varianza(self) -> float:
+        if self._cantidad < 2:
+            return 0.0
+        return max(self._m2, 0.0) / (self._cantidad - 1)
+
+    @property
+    def pico_a_pico(self) -> float:
+        if not self._cantidad:
+            return 0.0
+        n = self.tamanio
+        return self._valores[self._maximos[0] % n] - self._valores[self._minimos[0] % n]
+
+    def es_estable(self) -> bool:
+        """Indica si la ventana actual cumple los criterios de estabilidad"""
+        if self._cantidad < self.tamanio or self._en_movimiento:
+            return False
+        if self.pico_a_pico > self.tolerancia:
+            return False
+        if self.desviacion_max is not None and self.varianza ** 0.5 > self.desviacion_max:
+            return False
+        if self.tiempo_minimo:
+            ultimo = (self._secuencia - 1) % self.tamanio
+            primero = self._secuencia % self.tamanio
+            if self._tiempos[ultimo] - self._tiempos[primero] < self.tiempo_minimo:
+                return False
+        return True
+
+    def ventana(self) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+        """Devuelve (valores, tiempos) de la ventana en orden cronológico"""
+        n = self.tamanio
+        if self._cantidad < n:
+            return tuple(self._valores[:self._cantidad]), tuple(self._tiempos[:self._cantidad])
+        corte = self._secuencia % n
+        valores = self._valores[corte:] + self._valores[:corte]
+        tiempos = self._tiempos[corte:] + self._tiempos[:corte]
+        return tuple(valores), tuple(tiempos)
+
+    def publicar(self) -> PesoEstable:
+        """Arma el peso estable con una copia de la ventana actual"""
+        valores, tiempos = self.ventana()
+        return PesoEstable(
+            peso=self._media,
+            tiempo=tiempos[-1],
+            desviacion=self.varianza ** 0.5,
+            pico_a_pico=self.pico_a_pico,
+            muestras=valores,
+            tiempos=tiempos
+        )
@@ -0,0 +1,281 @@
+"""
+Filtros digitales para el peso de balanzas con señal ruidosa.
+
+La cadena se configura por balanza en configuracion.json, en el orden en que
+se aplican:
+
+    "filtros": [
+        {"tipo": "atipicos", "muestras": 7, "umbral": 5.0},
+        {"tipo": "mediana", "muestras": 5},
+        {"tipo": "ema", "alfa": 0.3, "salto": 20.0},
+        {"tipo": "zona_muerta", "banda": 0.5}
+    ]
+
+Cada filtro procesa una muestra por vez con costo O(1) u O(log N).
+aplicar_lote() corre la misma cadena sobre un array('d') de pesos grabados,
+etapa por etapa, y da el mismo resultado que aplicar() muestra a muestra;
+sirve para ajustar los parámetros contra capturas:
+
+    python -m balanza.filtros turno.bzcap --filtros '[{"tipo": "mediana", "muestras": 5}]'
+"""
+
+import argparse
+import json
+import statistics
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from balanza.captura import LectorCaptura
+from balanza.estabilidad import DetectorEstabilidad
+from balanza.protocolos import crear_protocolo
+from balanza.tramas import ArmadorTramas
+
+# Registro de filtros disponibles {tipo: clase}
+FILTROS: Dict[str, Type["Filtro"]] = {}
+
+
+def registrar_filtro(tipo: str):
+    """Decorador que agrega una clase de filtro al registro"""
+    def decorador(clase):
+        clase.tipo = tipo
+        FILTROS[tipo] = clase
+        return clase
+    return decorador
+
+
+class Filtro:
+    """Base de los filtros: reciben un peso y devuelven el peso filtrado"""
+
+    tipo = ""
+
+    def aplicar(self, valor: float) -> float:
+        raise NotImplementedError
+
+    def aplicar_lote(self, valores: Iterable[float]) -> array:
+        """Filtra una serie de pesos continuando desde el estado actual"""
+        return array('d', map(self.aplicar, valores))
+
+    def reiniciar(self):
+        """Olvida las muestras anteriores"""
+
+
+@registrar_filtro("mediana")
+class FiltroMediana(Filtro):
+    """Mediana de las últimas N muestras.
+
+    Mantiene la ventana ordenada: cada muestra es una búsqueda binaria para
+    sacar la más vieja y otra para insertar la nueva.
+    """
+
+    def __init__(self, muestras: int = 5):
+        if muestras < 1:
+            raise ValueError("La mediana necesita al menos 1 muestra")
+        self.tamanio = muestras
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._anillo: deque = deque()  # En orden de llegada
+        self._ordenados: List[float] = []
+
+    def aplicar(self, valor: float) -> float:
+        ordenados = self._ordenados
+        anillo = self._anillo
+        if len(anillo) == self.tamanio:
+            del ordenados[bisect_left(ordenados, anillo.popleft())]
+        anillo.append(valor)
+        insort(ordenados, valor)
+        n = len(ordenados)
+        medio = n >> 1
+        return ordenados[medio] if n & 1 else (ordenados[medio - 1] + ordenados[medio]) / 2
+
+
+@registrar_filtro("atipicos")
+class FiltroAtipicos(FiltroMediana):
+    """Reemplaza por la mediana de la ventana las muestras que se alejan más de ``umbral``.
+
+    Todas las muestras entran a la ventana, así que un cambio real de peso
+    (un fardo que se apoya) pasa en cuanto ocupa más de media ventana.
+    """
+
+    def __init__(self, muestras: int = 7, umbral: float = 5.0):
+        super().__init__(muestras)
+        self.umbral = umbral
+        self.rechazadas = 0
+
+    def aplicar(self, valor: float) -> float:
+        mediana = FiltroMediana.aplicar(self, valor)
+        if abs(valor - mediana) > self.umbral:
+            self.rechazadas += 1
+            return mediana
+        return valor
+
+
+@registrar_filtro("ema")
+class FiltroExponencial(Filtro):
+    """Media móvil exponencial: y += alfa * (x - y).
+
+    Con ``salto`` configurado, un cambio mayor que ese valor reinicia el
+    filtro en el peso nuevo en lugar de acercarse de a poco.
+    """
+
+    def __init__(self, alfa: float = 0.3, salto: Optional[float] = None):
+        if not 0 < alfa <= 1:
+            raise ValueError("alfa debe estar entre 0 (excluido) y 1")
+        self.alfa = alfa
+        self.salto = salto
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._valor: Optional[float] = None
+
+    def aplicar(self, valor: float) -> float:
+        anterior = self._valor
+        if anterior is None or (self.salto is not None and abs(valor - anterior) > self.salto):
+            self._valor = valor
+        else:
+            self._valor = anterior + self.alfa * (valor - anterior)
+        return self._valor
+
+    def aplicar_lote(self, valores: Iterable[float]) -> array:
+        resultado = array('d')
+        agregar = resultado.append
+        alfa = self.alfa
+        salto = self.salto if self.salto is not None else float("inf")
+        y = self._valor
+        for x in valores:
+            if y is None or abs(x - y) > salto:
+                y = x
+            else:
+                y += alfa * (x - y)
+            agregar(y)
+        self._valor = y
+        return resultado
+
+
+@registrar_filtro("zona_muerta")
+class ZonaMuerta(Filtro):
+    """Muestra cero mientras el peso esté dentro de +-banda"""
+
+    def __init__(self, banda: float = 0.5):
+        self.banda = banda
+
+    def aplicar(self, valor: float) -> float:
+        return 0.0 if -self.banda < valor < self.banda else valor
+
+    def aplicar_lote(self, valores: Iterable[float]) -> array:
+        banda = self.banda
+        return array('d', [0.0 if -banda < v < banda else v for v in valores])
+
+
+def crear_filtro(config: Dict[str, Any]) -> Filtro:
+    """Crea un filtro a partir de {'tipo': ..., parámetros...}"""
+    parametros = dict(config)
+    tipo = parametros.pop("tipo", None)
+    if tipo not in FILTROS:
+        raise ValueError(f"Filtro desconocido: '{tipo}'. Disponibles: {', '.join(sorted(FILTROS))}")
+    try:
+        return FILTROS[tipo](**parametros)
+    except TypeError as e:
+        raise ValueError(f"Parámetros inválidos para el filtro '{tipo}': {e}") from None
+
+
+class CadenaFiltros:
+    """Filtros aplicados en orden; sin filtros devuelve el peso sin cambios"""
+
+    def __init__(self, filtros: Iterable[Filtro] = ()):
+        self.filtros: Tuple[Filtro, ...] = tuple(filtros)
+
+    @classmethod
+    def desde_config(cls, balanza_config: Dict[str, Any]) -> "CadenaFiltros":
+        """Crea la cadena con la lista 'filtros' de la configuración de la balanza"""
+        return cls(crear_filtro(f) for f in balanza_config.get("filtros", ()))
+
+    def __bool__(self) -> bool:
+        return bool(self.filtros)
+
+    def aplicar(self, valor: float) -> float:
+        for filtro in self.filtros:
+            valor = filtro.aplicar(valor)
+        return valor
+
+    def aplicar_lote(self, valores: Iterable[float]) -> array:
+        """Filtra una serie completa, una etapa a la vez"""
+        resultado = valores if isinstance(valores, array) else array('d', valores)
+        for filtro in self.filtros:
+            resultado = filtro.aplicar_lote(resultado)
+        return resultado
+
+    def reiniciar(self):
+        for filtro in self.filtros:
+            filtro.reiniciar()
+
+
+def pesos_de_captura(ruta: str, balanza_config: Optional[Dict[str, Any]] = None) -> Tuple[array, array, Dict[str, Any]]:
+    """Extrae (pesos, tiempos, configuración) de un archivo de captura sin filtrar"""
+    lector = LectorCaptura(ruta)
+    config = balanza_config or lector.metadatos.get("config", {})
+    protocolo = crear_protocolo(config)
+    armador = ArmadorTramas(protocolo.terminadores, config.get("max_trama", 128))
+    pesos = array('d')
+    tiempos = array('d')
+    for tiempo, datos in lector.bloques():
+        for trama in armador.alimentar(datos):
+            lectura = protocolo.parsear(trama)
+            if lectura is not None:
+                pesos.append(lectura.peso)
+                tiempos.append(tiempo)
+    return pesos, tiempos, config
+
+
+def evaluar(pesos: array, tiempos: array, config: Dict[str, Any], filtros: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Filtra los pesos grabados y resume ruido, estabilidad y costo.
+
+    El ruido es la mediana de la diferencia absoluta entre muestras seguidas
+    (los escalones de carga y descarga no lo afectan). 'estable' es la
+    proporción de muestras con peso estable y 'entradas' cuántas veces se
+    pasó a estable: con menos ruido sube la primera y bajan los cortes.
+    """
+    cadena = CadenaFiltros(crear_filtro(f) for f in filtros)
+    inicio = time.perf_counter()
+    filtrados = cadena.aplicar_lote(pesos)
+    duracion = time.perf_counter() - inicio
+
+    detector = DetectorEstabilidad.desde_config(config)
+    entradas = 0
+    estables = 0
+    anterior = False
+    for peso, tiempo in zip(filtrados, tiempos):
+        actual = detector.agregar(peso, tiempo) is not None
+        estables += actual
+        entradas += actual and not anterior
+        anterior = actual
+
+    diferencias = [abs(b - a) for a, b in zip(filtrados, filtrados[1:])]
+    return {
+        "ruido": statistics.median(diferencias) if diferencias else 0.0,
+        "estable": estables / max(len(pesos), 1),
+        "entradas": entradas,
+        "us_por_muestra": duracion / max(len(pesos), 1) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara cadenas de filtros sobre una captura de la balanza")
+    parser.add_argument("captura", help="Archivo .bzcap")
+    parser.add_argument("--filtros", action="append", default=[],
+                        help="Lista JSON de filtros; se puede repetir para comparar varias")
+    args = parser.parse_args()
+
+    pesos, tiempos, config = pesos_de_captura(args.captura)
+    print(f"{len(pesos)} pesos en {tiempos[-1] if tiempos else 0:.1f} s")
+    print(f"{'ruido':>8} {'estable':>8} {'entradas':>8} {'µs/muestra':>10}  filtros")
+    for texto in ["[]"] + args.filtros:
+        r = evaluar(pesos, tiempos, config, json.loads(texto))
+        print(f"{r['ruido']:8.3f} {r['estable']:8.1%} {r['entradas']:8d} {r['us_por_muestra']:10.2f}  {texto}")
+
+
+if __name__ == "__main__":
+    main()
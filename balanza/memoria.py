@@ -0,0 +1,293 @@
+"""
+Última lectura de una balanza en memoria compartida, protegida con un seqlock.
+
+Un solo proceso escribe (el que tiene el puerto) y cualquier cantidad de
+procesos leen sin tomar locks ni hacer llamadas al sistema. El bloque tiene:
+
+    encabezado  <mágico:4s><capacidad:u32><bytes_metricas:u32> (relleno a 16)
+    contador    u64; impar mientras se escribe
+    lectura     <secuencia:u64><tiempo:f64><fecha:f64><peso:f64><tara:f64>
+                <peso_estable:f64><desviacion:f64><pico_a_pico:f64>
+                <tiempo_estable:f64><banderas:u8><unidad:8s>
+                <cantidad:u32><indice:u32><largo_metricas:u32>  (NaN = sin valor)
+    ventana     capacidad pesos f64 y capacidad tiempos f64 (anillo)
+    metricas    JSON de BalanzaReader.metricas()
+
+El escritor incrementa el contador antes y después de cada escritura. El
+lector toma el contador, lee los campos con struct.unpack_from directamente
+del bloque (sin copiarlo) y vuelve a leer el contador: si cambió o era impar,
+repite. ``tiempo`` y ``tiempo_estable`` son time.monotonic() del escritor,
+que en Windows y Linux es el mismo reloj para todos los procesos.
+"""
+
+import json
+import logging
+import math
+import struct
+import threading
+import time
+from array import array
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from balanza.estabilidad import PesoEstable
+from balanza.protocolos import Lectura
+
+logger = logging.getLogger(__name__)
+
+MAGICO = b"BZM1"
+ENCABEZADO = struct.Struct("<4sII")
+CONTADOR = struct.Struct("<Q")
+DATOS = struct.Struct("<QddddddddB8sIII")
+# Peso y banderas en una sola lectura: los cinco f64 intermedios se saltean
+PESO = struct.Struct("<d40xB")
+ESTADO = struct.Struct("<B")
+
+POS_CONTADOR = 16
+POS_DATOS = POS_CONTADOR + CONTADOR.size
+POS_PESO = POS_DATOS + 24
+POS_BANDERAS = POS_DATOS + 72
+POS_VENTANA = (POS_DATOS + DATOS.size + 7) // 8 * 8
+
+# Banderas
+HAY_LECTURA = 1
+INDICADOR_INFORMA = 2      # El protocolo informa movimiento (Lectura.estable no es None)
+INDICADOR_ESTABLE = 4
+CON_PESO_ESTABLE = 8
+OBSOLETA = 16              # El puerto se cayó y la lectura es la anterior a la caída
+CONECTADO = 32
+
+# Vueltas que espera un lector mientras el escritor está a mitad de una escritura
+REINTENTOS = 10000
+
+_NAN = float("nan")
+
+
+class EstadoMemoria(NamedTuple):
+    """Contenido de la lectura del bloque"""
+    secuencia: int
+    tiempo: float
+    fecha: Optional[float]
+    lectura: Optional[Lectura]
+    peso_estable: Optional[PesoEstable]
+    banderas: int
+
+
+def _opcional(valor: float) -> Optional[float]:
+    return None if math.isnan(valor) else valor
+
+
+class MemoriaPeso:
+    """Bloque de memoria compartida con la última lectura y una ventana de muestras.
+
+    El proceso que adquiere lo crea con ``crear`` y los demás se conectan por
+    nombre con ``abrir``. Escribe un solo proceso a la vez y sus escrituras
+    se serializan con un lock local; las lecturas no toman ninguno.
+    """
+
+    def __init__(self, memoria: shared_memory.SharedMemory, capacidad: int, bytes_metricas: int,
+                 propia: bool):
+        self._shm = memoria
+        self._buf = memoria.buf
+        self.capacidad = capacidad
+        self.bytes_metricas = bytes_metricas
+        self._propia = propia
+        pos_tiempos = POS_VENTANA + 8 * capacidad
+        self._pos_metricas = pos_tiempos + 8 * capacidad
+        self._pesos = self._buf[POS_VENTANA:pos_tiempos].cast("d")
+        self._tiempos = self._buf[pos_tiempos:self._pos_metricas].cast("d")
+        # Estado del escritor
+        self._escritura = threading.Lock()
+        self._cantidad = 0
+        self._indice = 0
+        self._banderas_estado = 0
+
+    @property
+    def nombre(self) -> str:
+        return self._shm.name
+
+    @classmethod
+    def crear(cls, capacidad: int = 256, bytes_metricas: int = 8192) -> "MemoriaPeso":
+        """Crea un bloque nuevo con un nombre único; lo libera cerrar() de este objeto"""
+        tamano = POS_VENTANA + 16 * capacidad + bytes_metricas
+        memoria = shared_memory.SharedMemory(create=True, size=tamano)
+        memoria.buf[:tamano] = bytes(tamano)
+        ENCABEZADO.pack_into(memoria.buf, 0, MAGICO, capacidad, bytes_metricas)
+        return cls(memoria, capacidad, bytes_metricas, True)
+
+    @classmethod
+    def abrir(cls, nombre: str) -> "MemoriaPeso":
+        """Se conecta a un bloque creado por otro proceso; ValueError si no es un bloque de balanza"""
+        memoria = shared_memory.SharedMemory(name=nombre)
+        magico, capacidad, bytes_metricas = ENCABEZADO.unpack_from(memoria.buf, 0)
+        if magico != MAGICO:
+            memoria.close()
+            raise ValueError(f"{nombre} no es un bloque de lecturas de balanza")
+        return cls(memoria, capacidad, bytes_metricas, False)
+
+    def cerrar(self):
+        """Suelta el bloque; el que lo creó además lo borra"""
+        self._pesos.release()
+        self._tiempos.release()
+        self._buf = None
+        self._shm.close()
+        if self._propia:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # --- Escritor ---
+
+    def _abrir_escritura(self):
+        # Se parte del valor del bloque: un escritor anterior pudo morir a mitad
+        # de una escritura y dejar el contador impar
+        contador = CONTADOR.unpack_from(self._buf, POS_CONTADOR)[0]
+        CONTADOR.pack_into(self._buf, POS_CONTADOR, contador + 1 + (contador & 1))
+
+    def _cerrar_escritura(self):
+        contador = CONTADOR.unpack_from(self._buf, POS_CONTADOR)[0]
+        CONTADOR.pack_into(self._buf, POS_CONTADOR, contador + 1)
+
+    def escribir(self, secuencia: int, tiempo: float, fecha: Optional[float], lectura: Optional[Lectura],
+                 estable: Optional[PesoEstable], muestras: Iterable[Tuple[float, float]] = ()):
+        """Publica una lectura y agrega las muestras (peso, tiempo) a la ventana"""
+        banderas = 0
+        peso = tara = _NAN
+        unidad = b""
+        if lectura is not None:
+            banderas |= HAY_LECTURA
+            peso = lectura.peso
+            if lectura.tara is not None:
+                tara = lectura.tara
+            if lectura.unidad:
+                unidad = lectura.unidad.encode("latin-1", errors="replace")
+            if lectura.estable is not None:
+                banderas |= INDICADOR_INFORMA | (INDICADOR_ESTABLE if lectura.estable else 0)
+        if estable is not None:
+            banderas |= CON_PESO_ESTABLE
+            valores_estables = (estable.peso, estable.desviacion, estable.pico_a_pico, estable.tiempo)
+        else:
+            valores_estables = (_NAN, _NAN, _NAN, _NAN)
+
+        with self._escritura:
+            capacidad = self.capacidad
+            self._abrir_escritura()
+            for muestra, momento in muestras:
+                self._pesos[self._indice] = muestra
+                self._tiempos[self._indice] = momento
+                self._indice = (self._indice + 1) % capacidad
+                self._cantidad = min(self._cantidad + 1, capacidad)
+            DATOS.pack_into(self._buf, POS_DATOS, secuencia, tiempo, fecha or _NAN, peso, tara,
+                            *valores_estables, banderas | self._banderas_estado, unidad,
+                            self._cantidad, self._indice, self._largo_metricas())
+            self._cerrar_escritura()
+
+    def escribir_estado(self, conectado: bool, obsoleta: bool):
+        """Actualiza las banderas de conexión sin tocar la lectura"""
+        estado = (CONECTADO if conectado else 0) | (OBSOLETA if obsoleta else 0)
+        with self._escritura:
+            if estado == self._banderas_estado:
+                return
+            self._banderas_estado = estado
+            banderas = ESTADO.unpack_from(self._buf, POS_BANDERAS)[0] & ~(CONECTADO | OBSOLETA)
+            self._abrir_escritura()
+            ESTADO.pack_into(self._buf, POS_BANDERAS, banderas | estado)
+            self._cerrar_escritura()
+
+    def escribir_metricas(self, metricas: Dict[str, Any]):
+        """Guarda las métricas del escritor; si no entran en el bloque se omiten"""
+        datos = json.dumps(metricas, ensure_ascii=False, default=str).encode("utf-8")
+        if len(datos) > self.bytes_metricas:
+            logger.warning("Métricas de %d bytes no entran en la memoria compartida (%d)",
+                           len(datos), self.bytes_metricas)
+            return
+        with self._escritura:
+            self._abrir_escritura()
+            self._buf[self._pos_metricas:self._pos_metricas + len(datos)] = datos
+            struct.pack_into("<I", self._buf, POS_DATOS + DATOS.size - 4, len(datos))
+            self._cerrar_escritura()
+
+    def _largo_metricas(self) -> int:
+        return struct.unpack_from("<I", self._buf, POS_DATOS + DATOS.size - 4)[0]
+
+    # --- Lectores ---
+
+    def _leer(self, estructura: struct.Struct, posicion: int) -> Optional[tuple]:
+        """Lee una estructura con el seqlock; None si el escritor nunca termina de escribir"""
+        buf = self._buf
+        for intento in range(REINTENTOS):
+            antes = CONTADOR.unpack_from(buf, POS_CONTADOR)[0]
+            if not antes & 1:
+                valores = estructura.unpack_from(buf, posicion)
+                if CONTADOR.unpack_from(buf, POS_CONTADOR)[0] == antes:
+                    return valores
+            if intento & 63 == 63:
+                time.sleep(0)
+        logger.warning("Memoria compartida %s bloqueada a mitad de una escritura", self.nombre)
+        return None
+
+    def contador(self) -> int:
+        """Valor actual del seqlock: cambia con cada escritura"""
+        return CONTADOR.unpack_from(self._buf, POS_CONTADOR)[0]
+
+    def leer_peso(self) -> Optional[float]:
+        """Último peso, leído del bloque sin copiarlo ni armar la publicación completa"""
+        valores = self._leer(PESO, POS_PESO)
+        if valores is None or not valores[1] & HAY_LECTURA:
+            return None
+        return valores[0]
+
+    def leer_banderas(self) -> int:
+        valores = self._leer(ESTADO, POS_BANDERAS)
+        return valores[0] if valores is not None else 0
+
+    def leer(self) -> Optional[EstadoMemoria]:
+        """Última lectura completa; el peso estable no trae la ventana (ver leer_ventana)"""
+        valores = self._leer(DATOS, POS_DATOS)
+        if valores is None:
+            return None
+        (secuencia, tiempo, fecha, peso, tara, peso_estable, desviacion, pico, tiempo_estable,
+         banderas, unidad, _cantidad, _indice, _largo) = valores
+        lectura = None
+        if banderas & HAY_LECTURA:
+            indicador = bool(banderas & INDICADOR_ESTABLE) if banderas & INDICADOR_INFORMA else None
+            lectura = Lectura(peso, indicador, unidad.rstrip(b"\0").decode("latin-1") or None, _opcional(tara))
+        estable = None
+        if banderas & CON_PESO_ESTABLE:
+            estable = PesoEstable(peso_estable, tiempo_estable, desviacion, pico, (), ())
+        return EstadoMemoria(secuencia, tiempo, _opcional(fecha), lectura, estable, banderas)
+
+    def leer_ventana(self) -> Tuple[array, array]:
+        """Copia de las últimas muestras (pesos, tiempos) en orden cronológico"""
+        buf = self._buf
+        for intento in range(REINTENTOS):
+            antes = CONTADOR.unpack_from(buf, POS_CONTADOR)[0]
+            if not antes & 1:
+                cantidad, indice = struct.unpack_from("<II", buf, POS_DATOS + DATOS.size - 12)
+                inicio = (indice - cantidad) % self.capacidad
+                if inicio + cantidad <= self.capacidad:
+                    pesos = array("d", self._pesos[inicio:inicio + cantidad])
+                    tiempos = array("d", self._tiempos[inicio:inicio + cantidad])
+                else:
+                    pesos = array("d", self._pesos[inicio:]) + array("d", self._pesos[:indice])
+                    tiempos = array("d", self._tiempos[inicio:]) + array("d", self._tiempos[:indice])
+                if CONTADOR.unpack_from(buf, POS_CONTADOR)[0] == antes:
+                    return pesos, tiempos
+            if intento & 63 == 63:
+                time.sleep(0)
+        return array("d"), array("d")
+
+    def leer_metricas(self) -> Dict[str, Any]:
+        """Últimas métricas que guardó el escritor"""
+        buf = self._buf
+        for intento in range(REINTENTOS):
+            antes = CONTADOR.unpack_from(buf, POS_CONTADOR)[0]
+            if not antes & 1:
+                largo = self._largo_metricas()
+                datos = bytes(buf[self._pos_metricas:self._pos_metricas + largo])
+                if CONTADOR.unpack_from(buf, POS_CONTADOR)[0] == antes:
+                    return json.loads(datos) if datos else {}
+            if intento & 63 == 63:
+                time.sleep(0)
+        return {}
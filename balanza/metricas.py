@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MetricasLectura:
+    """Contadores de adquisición de una balanza, con tiempos de time.monotonic().
+
+    Los actualiza sólo el hilo de lectura; instantanea() se puede llamar desde
+    cualquier hilo sin tomar locks (los valores pueden estar desfasados en
+    una trama entre sí).
+    """
+
+    # Límites superiores (ms) de los intervalos del histograma de llegada entre tramas
+    LIMITES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+    VENTANA = 10  # Segundos usados para tramas/s y bytes/s
+
+    _LIMITES_S = tuple(l / 1000 for l in LIMITES_MS)
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Pone todos los contadores en cero"""
+        self.inicio = time.monotonic()
+        self.tramas = 0
+        self.bytes = 0
+        self.fallas_parseo = 0
+        self.reinicios_hilo = 0
+        self.ultima_trama: Optional[float] = None
+        self.histograma = [0] * (len(self.LIMITES_MS) + 1)
+        self.caidas = 0               # Veces que el supervisor dio el puerto por caído
+        self.recuperaciones = 0
+        self.ultima_recuperacion: Optional[float] = None  # Segundos desde la caída hasta la primera trama
+        self.recuperacion_max = 0.0
+        # Tramas y bytes por segundo en un anillo de VENTANA segundos
+        self._segundo = int(self.inicio)
+        self._tramas_seg = [0] * self.VENTANA
+        self._bytes_seg = [0] * self.VENTANA
+
+    def _rotar(self, segundo: int):
+        """Limpia los casilleros de los segundos que pasaron desde el último dato"""
+        for s in range(self._segundo + 1, min(segundo, self._segundo + self.VENTANA) + 1):
+            self._tramas_seg[s % self.VENTANA] = 0
+            self._bytes_seg[s % self.VENTANA] = 0
+        self._segundo = segundo
+
+    def registrar_bytes(self, cantidad: int, ahora: float):
+        segundo = int(ahora)
+        if segundo != self._segundo:
+            self._rotar(segundo)
+        self.bytes += cantidad
+        self._bytes_seg[segundo % self.VENTANA] += cantidad
+
+    def registrar_trama(self, ahora: float):
+        segundo = int(ahora)
+        if segundo != self._segundo:
+            self._rotar(segundo)
+        self.tramas += 1
+        self._tramas_seg[segundo % self.VENTANA] += 1
+        if self.ultima_trama is not None:
+            self.histograma[bisect_right(self._LIMITES_S, ahora - self.ultima_trama)] += 1
+        self.ultima_trama = ahora
+
+    def registrar_recuperacion(self, duracion: float):
+        self.recuperaciones += 1
+        self.ultima_recuperacion = duracion
+        if duracion > self.recuperacion_max:
+            self.recuperacion_max = duracion
+
+    def _por_segundo(self, casilleros: List[int], ahora: float) -> float:
+        """Promedio de los segundos completos de la ventana (sin el segundo en curso)"""
+        actual = int(ahora)
+        desde = max(actual - self.VENTANA + 1, self._segundo - self.VENTANA + 1, int(self.inicio) + 1)
+        hasta = min(actual, self._segundo + 1)
+        total = sum(casilleros[s % self.VENTANA] for s in range(desde, hasta))
+        segundos = min(self.VENTANA - 1, actual - int(self.inicio) - 1)
+        return total / segundos if segundos > 0 else 0.0
+
+    def instantanea(self) -> Dict[str, Any]:
+        """Copia barata de las métricas actuales"""
+        ahora = time.monotonic()
+        etiquetas = [f"<={l}ms" for l in self.LIMITES_MS] + [f">{self.LIMITES_MS[-1]}ms"]
+        return {
+            "tramas": self.tramas,
+            "bytes": self.bytes,
+            "tramas_por_segundo": round(self._por_segundo(self._tramas_seg, ahora), 2),
+            "bytes_por_segundo": round(self._por_segundo(self._bytes_seg, ahora), 1),
+            "fallas_parseo": self.fallas_parseo,
+            "edad_ultima_trama": round(ahora - self.ultima_trama, 3) if self.ultima_trama is not None else None,
+            "histograma_llegadas": dict(zip(etiquetas, self.histograma)),
+            "reinicios_hilo": self.reinicios_hilo,
+            "caidas": self.caidas,
+            "recuperaciones": self.recuperaciones,
+            "ultima_recuperacion_s": round(self.ultima_recuperacion, 3) if self.ultima_recuperacion is not None else None,
+            "recuperacion_max_s": round(self.recuperacion_max, 3),
+            "segundos_activo": round(ahora - self.inicio, 1),
+        }
+
+
+class VolcadorMetricas:
+    """Agrega periódicamente una línea JSON con las métricas a un archivo"""
+
+    def __init__(self, fuente: Callable[[], Dict[str, Any]], ruta: str,
+                 intervalo: float = 60.0, max_bytes: int = 1024 * 1024):
+        self.fuente = fuente
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.max_bytes = max_bytes
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, daemon=True, name="volcado-metricas")
+        self._hilo.start()
+        logger.info("Volcando métricas cada %s s en %s", self.intervalo, self.ruta)
+
+    def detener(self):
+        """Detiene el hilo después de un último volcado"""
+        if self._hilo is not None:
+            self._detener.set()
+            self._hilo.join(timeout=5.0)
+            self._hilo = None
+
+    def _ejecutar(self):
+        while not self._detener.wait(self.intervalo):
+            self.volcar()
+        self.volcar()
+
+    def volcar(self):
+        """Escribe una línea con la fecha y las métricas actuales"""
+        try:
+            if os.path.exists(self.ruta) and os.path.getsize(self.ruta) > self.max_bytes:
+                os.replace(self.ruta, self.ruta + ".1")
+            linea = {"fecha": time.strftime("%Y-%m-%d %H:%M:%S"), "metricas": self.fuente()}
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(json.dumps(linea, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.warning("No se pudieron volcar las métricas en %s: %s", self.ruta, e)
@@ -0,0 +1,152 @@
+import re
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Type
+
+
+class Lectura(NamedTuple):
+    """Resultado de interpretar una trama de la balanza"""
+    peso: float
+    estable: Optional[bool] = None  # None si el protocolo no informa movimiento
+    unidad: Optional[str] = None
+    tara: Optional[float] = None
+
+
+# Construcción directa de la tupla, sin pasar por el __new__ de NamedTuple
+_nueva_lectura = tuple.__new__
+
+# Registro de protocolos disponibles {nombre: clase}
+PROTOCOLOS: Dict[str, Type["Protocolo"]] = {}
+
+PROTOCOLO_POR_DEFECTO = "continuo_ascii"
+
+
+def registrar_protocolo(nombre: str):
+    """Decorador que agrega una clase de protocolo al registro"""
+    def decorador(clase):
+        clase.nombre = nombre
+        PROTOCOLOS[nombre] = clase
+        return clase
+    return decorador
+
+
+def crear_protocolo(balanza_config: Dict[str, Any]) -> "Protocolo":
+    """Crea el protocolo indicado en el campo 'protocolo' de la balanza"""
+    nombre = balanza_config.get("protocolo", PROTOCOLO_POR_DEFECTO)
+    if nombre not in PROTOCOLOS:
+        raise ValueError(f"Protocolo desconocido: '{nombre}'. "
+                         f"Disponibles: {', '.join(sorted(PROTOCOLOS))}")
+    return PROTOCOLOS[nombre](balanza_config)
+
+
+class Protocolo:
+    """Base de los protocolos de comunicación de indicadores de peso"""
+
+    nombre = ""
+    terminadores: Tuple[bytes, ...] = (b"\r", b"\n")
+    comando_solicitud: Optional[bytes] = None  # Sólo para balanzas que no transmiten solas
+    # Comandos habituales del indicador {nombre: texto o {enviar, respuesta, rechazo}}; ver balanza.comandos
+    comandos: Dict[str, Any] = {}
+
+    def __init__(self, balanza_config: Dict[str, Any]):
+        self.config = balanza_config
+        self.unidad = balanza_config.get("unidad", "kg")
+        if "terminadores" in balanza_config:
+            self.terminadores = tuple(t.encode('latin-1') for t in balanza_config["terminadores"])
+
+    def parsear(self, trama) -> Optional[Lectura]:
+        """Interpreta una trama (bytes o memoryview) sin terminador"""
+        raise NotImplementedError
+
+
+@registrar_protocolo("continuo_ascii")
+class ProtocoloContinuoAscii(Protocolo):
+    """Texto ASCII continuo, por ejemplo 'ST,GS,+0001234.5kg' o '  1234.5 kg'.
+
+    Los prefijos ST / US / OL indican estable, en movimiento y sobrecarga.
+    Si no hay prefijo, la estabilidad queda sin informar.
+    """
+
+    # Salta el texto inicial y toma el primer número con su signo y unidad; la unidad tiene
+    # que ser una palabra entera para no tomar la G de '1234.5 GROSS' o la T de 'Tare'
+    _PATRON = re.compile(rb"[^-+\d.]*([-+])?\s*(\d*\.?\d+)\s*(?:(kg|lb|g|t)(?![a-z]))?", re.IGNORECASE)
+    _PATRON_BUSQUEDA = re.compile(rb"([-+])?\s*(\d*\.?\d+)\s*(?:(kg|lb|g|t)(?![a-z]))?", re.IGNORECASE)
+    # Prefijo de dos letras en mayúsculas (como entero) -> estable
+    _ESTADOS = {0x5354: True, 0x5553: False, 0x4F4C: False}  # ST, US, OL
+    _UNIDADES = {b"kg": "kg", b"KG": "kg", b"Kg": "kg", b"lb": "lb", b"LB": "lb",
+                 b"g": "g", b"G": "g", b"t": "t", b"T": "t"}
+    # Cero y tara responden 'Z A' / 'T A' (o 'I' si no se pudo); imprimir, con una trama de peso
+    comandos = {
+        "cero": {"enviar": "Z\r\n", "respuesta": r"^Z\s*A", "rechazo": r"^Z\s*[I+-]"},
+        "tara": {"enviar": "T\r\n", "respuesta": r"^T\s*A", "rechazo": r"^T\s*[I+-]"},
+        "imprimir": "P\r\n",
+    }
+
+    def parsear(self, trama) -> Optional[Lectura]:
+        coincidencia = self._PATRON.match(trama) or self._PATRON_BUSQUEDA.search(trama)
+        if coincidencia is None:
+            return None
+
+        signo, numero, unidad = coincidencia.groups()
+        peso = -float(numero) if signo == b"-" else float(numero)
+        estable = self._ESTADOS.get((trama[0] << 8 | trama[1]) & 0xDFDF) if len(trama) > 1 else None
+        if unidad is None:
+            unidad = self.unidad
+        else:
+            unidad = self._UNIDADES.get(unidad) or unidad.decode('ascii').lower()
+        return _nueva_lectura(Lectura, (peso, estable, unidad, None))
+
+
+@registrar_protocolo("stx_etx")
+class ProtocoloStxEtx(Protocolo):
+    """Registro de longitud fija que empieza con STX (formato continuo tipo Toledo).
+
+    STX, tres bytes de estado (SWA, SWB, SWC), seis dígitos de peso y seis de
+    tara; termina en CR o ETX. SWA indica la posición del punto decimal y SWB
+    el signo, el movimiento y la unidad.
+    """
+
+    terminadores = (b"\r", b"\x03")
+    # Comandos de un carácter; el indicador no responde aparte y sigue transmitiendo
+    comandos = {"cero": "Z", "tara": "T", "imprimir": "P"}
+
+    STX = 0x02
+    LARGO = 16  # STX + 3 estados + 6 peso + 6 tara
+
+    # Divisor por código de punto decimal (bits 0-2 de SWA)
+    _DIVISORES = (0.01, 0.1, 1, 10, 100, 1000, 10000, 100000)
+
+    def parsear(self, trama) -> Optional[Lectura]:
+        # El byte de checksum de la trama anterior puede quedar antes del STX
+        inicio = 0 if trama and trama[0] == self.STX else bytes(trama).find(b"\x02")
+        if inicio < 0 or len(trama) - inicio < self.LARGO:
+            return None
+
+        swb = trama[inicio + 2]
+        divisor = self._DIVISORES[trama[inicio + 1] & 0x07]
+        try:
+            peso = int(trama[inicio + 4:inicio + 10]) / divisor
+            tara = int(trama[inicio + 10:inicio + 16]) / divisor
+        except ValueError:
+            return None
+
+        return _nueva_lectura(Lectura, (
+            -peso if swb & 0x02 else peso,
+            not swb & 0x0C,  # Ni en movimiento ni fuera de rango
+            "kg" if swb & 0x10 else "lb",
+            tara
+        ))
+
+
+@registrar_protocolo("solicitud_respuesta")
+class ProtocoloSolicitudRespuesta(ProtocoloContinuoAscii):
+    """Indicadores que sólo envían el peso cuando se lo piden.
+
+    El comando se configura en 'comando_solicitud' (por defecto 'P' + CRLF) y
+    se envía cada 'intervalo_solicitud' segundos, nunca antes de que llegue la
+    respuesta anterior o venza 'timeout_comando'; la respuesta es ASCII.
+    """
+
+    def __init__(self, balanza_config: Dict[str, Any]):
+        super().__init__(balanza_config)
+        comando = balanza_config.get("comando_solicitud", "P\r\n")
+        self.comando_solicitud = comando.encode('latin-1')
+        self.intervalo_solicitud = balanza_config.get("intervalo_solicitud", 0.2)
@@ -0,0 +1,324 @@
+"""
+Serie temporal compacta con todas las muestras de peso de una balanza.
+
+Cada balanza con "serie" en configuracion.json guarda cada peso recibido
+(después de los filtros) en ``{carpeta}/{balanza}/{AAAA-MM-DD}.bzts``, un
+archivo por día:
+
+    encabezado  <mágico:4s><versión:u16><tamaño_bloque:u16><resolución:f64> (32 bytes)
+    bloques     de ``tamaño_bloque`` bytes: <cantidad:u16><usados:u16>
+                <t0:i64 ms><p0:i64 resoluciones> y después, por cada muestra
+                siguiente, la diferencia de tiempo y de peso con la anterior
+                como varint zigzag
+
+Junto a cada archivo, ``.idx`` tiene una entrada <t_inicio:i64><t_fin:i64>
+<cantidad:u32> por bloque (la entrada i describe el bloque i), así una
+consulta lee sólo los bloques que cubren el intervalo pedido. Con tramas
+cada 50 ms y ruido de décimas cada muestra ocupa 2 a 3 bytes.
+
+Las muestras se encolan desde el hilo de lectura y un hilo propio las
+codifica y escribe cada ``intervalo`` segundos; el bloque en curso se
+reescribe en su lugar hasta llenarse, así que lo perdido ante un corte es a
+lo sumo el último intervalo.
+
+Uso: python -m balanza.serie --carpeta series --balanza balanza1 --desde "2026-10-18 10:15:00" --segundos 30
+"""
+
+import argparse
+import logging
+import os
+import struct
+import threading
+from array import array
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+MAGICO = b"BZTS"
+VERSION = 1
+ENCABEZADO = struct.Struct("<4sHHd")
+TAMANO_ENCABEZADO = 32
+CABECERA_BLOQUE = struct.Struct("<HHqq")
+ENTRADA_INDICE = struct.Struct("<qqI")
+TAMANO_BLOQUE = 4096
+EXTENSION = ".bzts"
+
+# Una muestra codificada ocupa como mucho dos varints de 10 bytes
+_MAXIMO_MUESTRA = 20
+
+Momento = Union[datetime, float]
+
+
+def _zigzag(n: int) -> int:
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+
+def _agregar_varint(destino: bytearray, n: int):
+    n = _zigzag(n)
+    while n >= 0x80:
+        destino.append((n & 0x7F) | 0x80)
+        n >>= 7
+    destino.append(n)
+
+
+def _leer_varints(datos: bytes) -> Iterator[int]:
+    n = desplazamiento = 0
+    for byte in datos:
+        n |= (byte & 0x7F) << desplazamiento
+        if byte & 0x80:
+            desplazamiento += 7
+            continue
+        yield (n >> 1) ^ -(n & 1)
+        n = desplazamiento = 0
+
+
+def _milisegundos(momento: Momento) -> int:
+    if isinstance(momento, datetime):
+        momento = momento.timestamp()
+    return int(round(momento * 1000))
+
+
+def _ruta(carpeta: str, balanza_key: str, dia: date) -> str:
+    return os.path.join(carpeta, balanza_key, dia.isoformat() + EXTENSION)
+
+
+class _Bloque:
+    """Bloque en construcción: primera muestra completa y el resto como diferencias"""
+
+    __slots__ = ("numero", "t_inicio", "t_ultimo", "p_ultimo", "cantidad", "datos")
+
+    def __init__(self, numero: int, t: int, p: int):
+        self.numero = numero
+        self.t_inicio = self.t_ultimo = t
+        self.p_ultimo = p
+        self.cantidad = 1
+        self.datos = bytearray(CABECERA_BLOQUE.pack(0, 0, t, p))
+
+    def agregar(self, t: int, p: int) -> bool:
+        """Agrega una muestra; False si el bloque está lleno"""
+        if len(self.datos) + _MAXIMO_MUESTRA > TAMANO_BLOQUE or self.cantidad == 0xFFFF:
+            return False
+        _agregar_varint(self.datos, t - self.t_ultimo)
+        _agregar_varint(self.datos, p - self.p_ultimo)
+        self.t_ultimo = t
+        self.p_ultimo = p
+        self.cantidad += 1
+        return True
+
+    def contenido(self) -> bytes:
+        usados = len(self.datos) - CABECERA_BLOQUE.size
+        struct.pack_into("<HH", self.datos, 0, self.cantidad, usados)
+        return bytes(self.datos) + bytes(TAMANO_BLOQUE - len(self.datos))
+
+
+def _decodificar_bloque(contenido: bytes, resolucion: float, tiempos: array, pesos: array,
+                        desde: int, hasta: int):
+    """Agrega a tiempos (s) y pesos las muestras del bloque dentro de [desde, hasta] ms"""
+    cantidad, usados, t, p = CABECERA_BLOQUE.unpack_from(contenido)
+    if cantidad == 0:
+        return
+    diferencias = _leer_varints(contenido[CABECERA_BLOQUE.size:CABECERA_BLOQUE.size + usados])
+    for i in range(cantidad):
+        if i:
+            t += next(diferencias)
+            p += next(diferencias)
+        if desde <= t <= hasta:
+            tiempos.append(t / 1000)
+            pesos.append(p * resolucion)
+
+
+class RegistroSerie:
+    """Escribe las muestras de una balanza en su serie temporal diaria"""
+
+    def __init__(self, carpeta: str, balanza_key: str, resolucion: float = 0.01, intervalo: float = 1.0):
+        self.carpeta = carpeta
+        self.balanza_key = balanza_key
+        self.resolucion = resolucion
+        self.intervalo = intervalo
+        self.muestras = 0
+        # El hilo de lectura sólo agrega a esta cola (deque.append no necesita lock)
+        self._cola: Deque[Tuple[float, List[float]]] = deque()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._dia: Optional[date] = None
+        self._archivo = None
+        self._indice = None
+        self._bloque: Optional[_Bloque] = None
+        self._resolucion_archivo = resolucion
+
+    @classmethod
+    def desde_config(cls, balanza_key: str, balanza_config: Dict[str, Any]) -> Optional["RegistroSerie"]:
+        """Registro según 'serie' de la balanza (true o {carpeta, resolucion, intervalo}); None si no tiene"""
+        config = balanza_config.get("serie")
+        if not config:
+            return None
+        if not isinstance(config, dict):
+            config = {}
+        return cls(config.get("carpeta", "series"), balanza_key, config.get("resolucion", 0.01),
+                   config.get("intervalo", 1.0))
+
+    def iniciar(self):
+        os.makedirs(os.path.join(self.carpeta, self.balanza_key), exist_ok=True)
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._escribir_periodicamente, daemon=True,
+                                      name=f"serie-{self.balanza_key}")
+        self._hilo.start()
+
+    def agregar(self, pesos: List[float], fecha: float):
+        """Encola los pesos de un bloque recibido en fecha (time.time())"""
+        self._cola.append((fecha, pesos))
+
+    def detener(self):
+        """Escribe lo pendiente y cierra los archivos"""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5.0)
+            self._hilo = None
+        try:
+            self._volcar()
+        except OSError as e:
+            logger.error("No se pudo escribir la serie de %s: %s", self.balanza_key, e)
+        self._cerrar_archivos()
+
+    def _escribir_periodicamente(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self._volcar()
+            except OSError as e:
+                logger.error("No se pudo escribir la serie de %s: %s", self.balanza_key, e)
+
+    def _volcar(self):
+        """Codifica las muestras encoladas y reescribe el bloque en curso"""
+        if not self._cola:
+            return
+        while self._cola:
+            fecha, pesos = self._cola.popleft()
+            t = int(round(fecha * 1000))
+            dia = date.fromtimestamp(fecha)
+            if dia != self._dia:
+                self._abrir_dia(dia)
+            resolucion = self._resolucion_archivo
+            for peso in pesos:
+                p = int(round(peso / resolucion))
+                bloque = self._bloque
+                if bloque is None:
+                    self._bloque = _Bloque(self._bloques_en_archivo(), t, p)
+                elif not bloque.agregar(t, p):
+                    self._escribir_bloque(bloque)
+                    self._bloque = _Bloque(bloque.numero + 1, t, p)
+                self.muestras += 1
+        if self._bloque is not None:
+            self._escribir_bloque(self._bloque)
+        self._archivo.flush()
+        self._indice.flush()
+
+    def _escribir_bloque(self, bloque: _Bloque):
+        self._archivo.seek(TAMANO_ENCABEZADO + bloque.numero * TAMANO_BLOQUE)
+        self._archivo.write(bloque.contenido())
+        self._indice.seek(bloque.numero * ENTRADA_INDICE.size)
+        self._indice.write(ENTRADA_INDICE.pack(bloque.t_inicio, bloque.t_ultimo, bloque.cantidad))
+
+    def _bloques_en_archivo(self) -> int:
+        self._archivo.seek(0, os.SEEK_END)
+        return max(self._archivo.tell() - TAMANO_ENCABEZADO, 0) // TAMANO_BLOQUE
+
+    def _abrir_dia(self, dia: date):
+        """Cierra el archivo del día anterior y abre (o crea) el del día de la muestra"""
+        if self._bloque is not None:
+            self._escribir_bloque(self._bloque)
+            self._bloque = None
+        self._cerrar_archivos()
+        ruta = _ruta(self.carpeta, self.balanza_key, dia)
+        if os.path.exists(ruta):
+            # Se sigue en un bloque nuevo a continuación del último escrito
+            self._archivo = open(ruta, "r+b")
+            _, _, _, self._resolucion_archivo = ENCABEZADO.unpack(self._archivo.read(ENCABEZADO.size))
+        else:
+            self._archivo = open(ruta, "w+b")
+            self._resolucion_archivo = self.resolucion
+            encabezado = ENCABEZADO.pack(MAGICO, VERSION, TAMANO_BLOQUE, self.resolucion)
+            self._archivo.write(encabezado + bytes(TAMANO_ENCABEZADO - len(encabezado)))
+        ruta_indice = ruta[:-len(EXTENSION)] + ".idx"
+        self._indice = open(ruta_indice, "r+b" if os.path.exists(ruta_indice) else "w+b")
+        self._dia = dia
+
+    def _cerrar_archivos(self):
+        for archivo in (self._archivo, self._indice):
+            if archivo is not None:
+                archivo.close()
+        self._archivo = self._indice = None
+        self._dia = None
+
+
+class LectorSerie:
+    """Consultas sobre la serie temporal de una balanza"""
+
+    def __init__(self, carpeta: str, balanza_key: str):
+        self.carpeta = carpeta
+        self.balanza_key = balanza_key
+
+    def leer(self, desde: Momento, hasta: Momento) -> Tuple[array, array]:
+        """Muestras entre desde y hasta como (tiempos en segundos epoch, pesos)"""
+        desde_ms = _milisegundos(desde)
+        hasta_ms = _milisegundos(hasta)
+        tiempos = array("d")
+        pesos = array("d")
+        dia = date.fromtimestamp(desde_ms / 1000)
+        ultimo_dia = date.fromtimestamp(hasta_ms / 1000)
+        while dia <= ultimo_dia:
+            self._leer_archivo(_ruta(self.carpeta, self.balanza_key, dia), desde_ms, hasta_ms, tiempos, pesos)
+            dia += timedelta(days=1)
+        return tiempos, pesos
+
+    def alrededor(self, momento: Momento, antes: float = 30.0, despues: float = 5.0) -> Tuple[array, array]:
+        """Muestras desde ``antes`` segundos previos a momento hasta ``despues`` segundos después"""
+        if isinstance(momento, datetime):
+            momento = momento.timestamp()
+        return self.leer(momento - antes, momento + despues)
+
+    def fardo(self, fardo, antes: float = 30.0, despues: float = 5.0) -> Tuple[array, array]:
+        """Curva de asentamiento de un Fardo, alrededor de su hora de captura (o de pesaje)"""
+        momento = fardo.hora_captura or fardo.hora_pesaje
+        if momento is None:
+            return array("d"), array("d")
+        return self.alrededor(momento, antes, despues)
+
+    @staticmethod
+    def _leer_archivo(ruta: str, desde: int, hasta: int, tiempos: array, pesos: array):
+        if not os.path.exists(ruta):
+            return
+        with open(ruta[:-len(EXTENSION)] + ".idx", "rb") as f:
+            indice = f.read()
+        with open(ruta, "rb") as f:
+            magico, _, tamano_bloque, resolucion = ENCABEZADO.unpack(f.read(ENCABEZADO.size))
+            if magico != MAGICO:
+                logger.warning("%s no es una serie de pesos", ruta)
+                return
+            # Las entradas se recorren todas: si el reloj se atrasó, no están ordenadas
+            for numero in range(len(indice) // ENTRADA_INDICE.size):
+                t_inicio, t_fin, cantidad = ENTRADA_INDICE.unpack_from(indice, numero * ENTRADA_INDICE.size)
+                if cantidad == 0 or t_fin < desde or t_inicio > hasta:
+                    continue
+                f.seek(TAMANO_ENCABEZADO + numero * tamano_bloque)
+                _decodificar_bloque(f.read(tamano_bloque), resolucion, tiempos, pesos, desde, hasta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muestra las muestras guardadas de una balanza")
+    parser.add_argument("--carpeta", default="series")
+    parser.add_argument("--balanza", required=True)
+    parser.add_argument("--desde", required=True, help="Fecha y hora, por ejemplo '2026-10-18 10:15:00'")
+    parser.add_argument("--segundos", type=float, default=60.0)
+    args = parser.parse_args()
+
+    desde = datetime.fromisoformat(args.desde)
+    tiempos, pesos = LectorSerie(args.carpeta, args.balanza).leer(desde, desde + timedelta(seconds=args.segundos))
+    for tiempo, peso in zip(tiempos, pesos):
+        print(f"{datetime.fromtimestamp(tiempo).strftime('%H:%M:%S.%f')[:-3]}  {peso:10.2f}")
+    print(f"{len(pesos)} muestras")
+
+
+if __name__ == "__main__":
+    main()
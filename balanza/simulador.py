@@ -0,0 +1,337 @@
+"""
+Balanza virtual sobre un pseudo-terminal (Linux) para pruebas sin hardware.
+
+Abre un pty y transmite tramas con un peso que sigue ciclos de carga:
+vacío, subida, asentamiento con oscilación, peso estable con ruido,
+movimientos ocasionales y vuelta a cero. Puede perder bytes y mandar ráfagas
+de tramas seguidas, y respeta el tiempo de transmisión del baudrate elegido.
+Atiende los comandos Z (cero), T (tara) y P (enviar una trama); en los
+formatos ASCII responde 'Z A' / 'T A', o 'Z I' / 'T I' con el peso en movimiento.
+
+Uso:
+    python -m balanza.simulador --enlace /tmp/balanza_sim --baudrate 9600 --tps 10
+    python -m balanza.simulador --config configuracion.json --balanza balanza1
+
+La ruta del pty (o el enlace) va en el campo 'puerto' de la balanza en
+configuracion.json; con --config y --balanza se escribe automáticamente.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import select
+import signal
+import threading
+import time
+import tty
+from typing import Any, Dict, Optional, Tuple
+
+ESCENARIO_POR_DEFECTO: Dict[str, Any] = {
+    "peso_min": 150.0,        # Rango de peso de los fardos (kg)
+    "peso_max": 260.0,
+    "capacidad": 1000.0,      # Por encima se informa sobrecarga
+    "t_vacio": 2.0,           # Segundos de cada fase del ciclo
+    "t_carga": 1.0,
+    "t_asentamiento": 1.5,
+    "t_estable": 4.0,
+    "t_descarga": 0.8,
+    "ruido": 0.1,             # Desviación del ruido con la balanza quieta
+    "oscilacion": 0.03,       # Amplitud inicial del asentamiento (fracción del peso)
+    "movimiento": 0.02,       # Probabilidad por trama de un golpe con la balanza cargada
+    "perdida_bytes": 0.0,     # Probabilidad por trama de perder un byte
+    "rafagas": 0.0,           # Probabilidad por trama de mandar una ráfaga
+    "largo_rafaga": 8         # Tramas por ráfaga
+}
+
+BITS_POR_BYTE = 10  # Arranque + 8 datos + parada
+
+
+class ModeloPeso:
+    """Genera el peso de la balanza a lo largo de ciclos de carga y descarga"""
+
+    def __init__(self, escenario: Dict[str, Any], azar: random.Random):
+        self.e = escenario
+        self.azar = azar
+        self._fases = (("vacio", self.e["t_vacio"]), ("carga", self.e["t_carga"]),
+                       ("asentamiento", self.e["t_asentamiento"]), ("estable", self.e["t_estable"]),
+                       ("descarga", self.e["t_descarga"]))
+        self._duracion_ciclo = sum(d for _, d in self._fases)
+        self._ciclo = -1
+        self.objetivo = 0.0
+        self.ciclos = 0
+
+    def peso(self, t: float) -> Tuple[float, bool]:
+        """Devuelve (peso, estable) en el segundo t de la simulación"""
+        ciclo, t_ciclo = divmod(t, self._duracion_ciclo)
+        if ciclo != self._ciclo:
+            self._ciclo = ciclo
+            self.ciclos += 1
+            self.objetivo = round(self.azar.uniform(self.e["peso_min"], self.e["peso_max"]), 1)
+
+        e = self.e
+        azar = self.azar
+        for fase, duracion in self._fases:
+            if t_ciclo < duracion:
+                break
+            t_ciclo -= duracion
+        avance = t_ciclo / duracion if duracion else 1.0
+
+        if fase == "vacio":
+            return azar.gauss(0.0, e["ruido"]), True
+        if fase == "carga":
+            return self.objetivo * avance + azar.gauss(0.0, e["ruido"] * 5), False
+        if fase == "asentamiento":
+            amplitud = self.objetivo * e["oscilacion"] * math.exp(-4 * avance)
+            return self.objetivo + amplitud * math.sin(12 * math.pi * avance) + azar.gauss(0.0, e["ruido"]), False
+        if fase == "estable":
+            if azar.random() < e["movimiento"]:
+                return self.objetivo + azar.gauss(0.0, 5.0), False
+            return self.objetivo + azar.gauss(0.0, e["ruido"]), True
+        return self.objetivo * (1 - avance) + azar.gauss(0.0, e["ruido"] * 5), False
+
+
+def trama_continuo_ascii(peso: float, estable: bool, sobrecarga: bool) -> bytes:
+    estado = b"OL" if sobrecarga else (b"ST" if estable else b"US")
+    return b"%s,GS,%+010.1fkg\r\n" % (estado, peso)
+
+
+def trama_stx_etx(peso: float, estable: bool, sobrecarga: bool) -> bytes:
+    swa = 0x20 | 0x03  # Punto decimal XXXXX.X
+    swb = 0x20 | 0x10 | (0x02 if peso < 0 else 0) | (0 if estable else 0x08) | (0x04 if sobrecarga else 0)
+    digitos = min(int(round(abs(peso) * 10)), 999999)
+    return bytes((0x02, swa, swb, 0x20)) + b"%06d%06d\r" % (digitos, 0)
+
+
+def trama_solicitud_respuesta(peso: float, estable: bool, sobrecarga: bool) -> bytes:
+    return b"%10.1f kg\r\n" % peso
+
+
+FORMATOS = {
+    "continuo_ascii": trama_continuo_ascii,
+    "stx_etx": trama_stx_etx,
+    "solicitud_respuesta": trama_solicitud_respuesta,
+}
+
+
+class SimuladorBalanza:
+    """Balanza virtual que transmite por un pseudo-terminal en un hilo propio"""
+
+    def __init__(self, protocolo: str = "continuo_ascii", baudrate: int = 9600,
+                 tramas_por_segundo: float = 10.0, escenario: Optional[Dict[str, Any]] = None,
+                 enlace: Optional[str] = None, semilla: Optional[int] = None):
+        if protocolo not in FORMATOS:
+            raise ValueError(f"Protocolo no simulado: '{protocolo}'. "
+                             f"Disponibles: {', '.join(sorted(FORMATOS))}")
+        self.protocolo = protocolo
+        self.baudrate = baudrate
+        self.tramas_por_segundo = tramas_por_segundo
+        self.escenario = dict(ESCENARIO_POR_DEFECTO, **(escenario or {}))
+        self.enlace = enlace
+        self._azar = random.Random(semilla)
+        self._formato = FORMATOS[protocolo]
+        self._modelo = ModeloPeso(self.escenario, self._azar)
+        self._maestro = None
+        self._esclavo = None
+        self._hilo = None
+        self._detener = threading.Event()
+        self._cero = 0.0
+        self._tara = 0.0
+        self.ruta: Optional[str] = None
+        self.estadisticas = {"tramas": 0, "bytes": 0, "bytes_perdidos": 0,
+                             "tramas_danadas": 0, "rafagas": 0, "desbordes": 0, "comandos": 0}
+
+    @property
+    def puerto(self) -> Optional[str]:
+        """Ruta para el campo 'puerto' de configuracion.json"""
+        return self.enlace or self.ruta
+
+    def config_balanza(self, nombre: str = "Balanza simulada") -> Dict[str, Any]:
+        """Entrada de configuracion.json para leer esta balanza"""
+        return {
+            "nombre": nombre,
+            "puerto": self.puerto,
+            "baudrate": self.baudrate,
+            "bytesize": 8,
+            "parity": "none",
+            "stopbits": 1,
+            "timeout": 1,
+            "xonxoff": False,
+            "rtscts": False,
+            "dsrdtr": False,
+            "dtr": False,
+            "rts": False,
+            "unidad": "kg",
+            "protocolo": self.protocolo
+        }
+
+    def iniciar(self) -> str:
+        """Abre el pty, crea el enlace si corresponde y empieza a transmitir"""
+        self._maestro, self._esclavo = os.openpty()
+        tty.setraw(self._esclavo)
+        # El esclavo queda abierto para que el pty no se cierre cuando el lector se desconecta
+        os.set_blocking(self._maestro, False)
+        self.ruta = os.ttyname(self._esclavo)
+        if self.enlace:
+            if os.path.islink(self.enlace):
+                os.unlink(self.enlace)
+            os.symlink(self.ruta, self.enlace)
+
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._transmitir, daemon=True)
+        self._hilo.start()
+        return self.puerto
+
+    def detener(self):
+        """Deja de transmitir y cierra el pty (el lector ve la desconexión)"""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2.0)
+            self._hilo = None
+        for fd in (self._maestro, self._esclavo):
+            if fd is not None:
+                os.close(fd)
+        self._maestro = self._esclavo = None
+        if self.enlace and os.path.islink(self.enlace):
+            os.unlink(self.enlace)
+
+    def _generar(self, t: float) -> bytes:
+        """Arma la trama del instante t aplicando las fallas configuradas"""
+        peso, estable = self._modelo.peso(t)
+        trama = self._formato(peso - self._cero - self._tara, estable, peso > self.escenario["capacidad"])
+        if self._azar.random() < self.escenario["perdida_bytes"]:
+            posicion = self._azar.randrange(len(trama))
+            trama = trama[:posicion] + trama[posicion + 1:]
+            self.estadisticas["bytes_perdidos"] += 1
+            self.estadisticas["tramas_danadas"] += 1
+        return trama
+
+    def _escribir(self, datos: bytes) -> bool:
+        try:
+            os.write(self._maestro, datos)
+        except BlockingIOError:
+            # Nadie lee el puerto y se llenó el buffer del pty: la trama se pierde
+            self.estadisticas["desbordes"] += 1
+            return False
+        self.estadisticas["bytes"] += len(datos)
+        return True
+
+    def _atender(self, datos: bytes, t: float) -> bool:
+        """Ejecuta los comandos recibidos; True si alguno pide una trama de peso"""
+        pedido = False
+        con_respuesta = self.protocolo != "stx_etx"
+        for comando in datos.replace(b"\n", b"\r").split(b"\r"):
+            letra = comando.strip()[:1].upper()
+            if not letra:
+                continue
+            self.estadisticas["comandos"] += 1
+            if letra not in (b"Z", b"T"):
+                pedido = True
+                continue
+            peso, estable = self._modelo.peso(t)
+            if estable:
+                if letra == b"Z":
+                    self._cero, self._tara = peso, 0.0
+                else:
+                    self._tara = peso - self._cero
+            if con_respuesta:
+                self._escribir(letra + (b" A\r\n" if estable else b" I\r\n"))
+        return pedido
+
+    def _transmitir(self):
+        inicio = time.perf_counter()
+        proxima = inicio
+        solicitud = self.protocolo == "solicitud_respuesta"
+        intervalo = 1.0 / self.tramas_por_segundo
+        segundos_por_byte = BITS_POR_BYTE / self.baudrate
+
+        while not self._detener.is_set():
+            # Hasta la próxima trama (o, si sólo responde a pedidos, en tramos de 0.1 s)
+            # se atienden los comandos que lleguen
+            espera = 0.1 if solicitud else max(proxima - time.perf_counter(), 0.0)
+            pedido = False
+            listos, _, _ = select.select([self._maestro], [], [], espera)
+            if listos:
+                try:
+                    datos = os.read(self._maestro, 256)
+                except (BlockingIOError, OSError):
+                    datos = b""
+                pedido = self._atender(datos, time.perf_counter() - inicio)
+            if not pedido and (solicitud or time.perf_counter() < proxima):
+                continue
+
+            ahora = time.perf_counter()
+            trama = self._generar(ahora - inicio)
+            cantidad = 1
+            if not solicitud and not pedido and self._azar.random() < self.escenario["rafagas"]:
+                # Varias tramas seguidas sin pausa, como un indicador que vacía su buffer
+                cantidad = self.escenario["largo_rafaga"]
+                trama += b"".join(self._generar(ahora - inicio) for _ in range(cantidad - 1))
+                self.estadisticas["rafagas"] += 1
+
+            if self._escribir(trama):
+                self.estadisticas["tramas"] += cantidad
+            # La próxima trama sale cuando terminó de transmitirse ésta; una trama
+            # pedida con P no corre la cadencia de la transmisión continua
+            if not pedido:
+                proxima = max(proxima + intervalo * cantidad, ahora + len(trama) * segundos_por_byte)
+
+    @property
+    def ciclos(self) -> int:
+        """Fardos simulados hasta el momento"""
+        return self._modelo.ciclos
+
+
+def escribir_config(ruta_config: str, balanza_key: str, simulador: SimuladorBalanza):
+    """Apunta la balanza indicada de configuracion.json al simulador"""
+    with open(ruta_config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    balanza = config.setdefault("balanzas", {}).setdefault(balanza_key, {})
+    nombre = balanza.get("nombre", "Balanza simulada")
+    balanza.update(simulador.config_balanza(nombre))
+    with open(ruta_config, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=4, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Balanza virtual sobre un pseudo-terminal")
+    parser.add_argument("--protocolo", default="continuo_ascii", choices=sorted(FORMATOS))
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--tps", type=float, default=10.0, help="Tramas por segundo")
+    parser.add_argument("--enlace", help="Enlace simbólico estable hacia el pty")
+    parser.add_argument("--semilla", type=int)
+    parser.add_argument("--perdida", type=float, default=0.0, help="Probabilidad de perder un byte por trama")
+    parser.add_argument("--rafagas", type=float, default=0.0, help="Probabilidad de ráfaga por trama")
+    parser.add_argument("--escenario", help="JSON con valores que reemplazan ESCENARIO_POR_DEFECTO")
+    parser.add_argument("--config", help="configuracion.json a actualizar con el puerto simulado")
+    parser.add_argument("--balanza", default="balanza1", help="Balanza de --config a actualizar")
+    args = parser.parse_args()
+
+    escenario = json.loads(args.escenario) if args.escenario else {}
+    escenario.setdefault("perdida_bytes", args.perdida)
+    escenario.setdefault("rafagas", args.rafagas)
+    simulador = SimuladorBalanza(args.protocolo, args.baudrate, args.tps, escenario,
+                                 args.enlace, args.semilla)
+    puerto = simulador.iniciar()
+    if args.config:
+        escribir_config(args.config, args.balanza, simulador)
+        print(f"✓ {args.config}: {args.balanza} apunta a {puerto}")
+    print(f"⚖️ Balanza simulada en {puerto} ({args.protocolo}, {args.baudrate} bd, {args.tps} tramas/s)",
+          flush=True)
+
+    terminar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: terminar.set())
+    try:
+        while not terminar.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulador.detener()
+        estadisticas = dict(simulador.estadisticas, ciclos=simulador.ciclos)
+        print(f"ESTADISTICAS {json.dumps(estadisticas)}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
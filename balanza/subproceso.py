@@ -0,0 +1,349 @@
+"""
+Adquisición de una balanza en un proceso aparte, con salida en memoria compartida.
+
+El proceso hijo abre el puerto con un BalanzaReader normal (armado de
+tramas, filtros, estabilidad y reconexión) y publica cada lectura y la
+ventana de muestras en un bloque MemoriaPeso. En el proceso principal,
+LectorSubproceso tiene la misma interfaz que BalanzaReader pero lee ese
+bloque: leer_peso() y leer_publicacion() no toman locks ni esperan al
+hilo de lectura, y una pausa larga del proceso principal (la interfaz, el
+recolector de basura, la base de datos) no hace perder tramas.
+
+En configuracion.json, la balanza lleva "adquisicion": "subproceso" y,
+opcionalmente, "ventana_compartida" (muestras que guarda la ventana, 256).
+GestorBalanzas crea el lector que corresponde. Los mensajes de registro
+del hijo llegan al registro del proceso principal.
+"""
+
+import logging
+import logging.handlers
+import multiprocessing
+import random
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from balanza.estabilidad import PesoEstable
+from balanza.memoria import CONECTADO, OBSOLETA, MemoriaPeso
+from balanza.protocolos import Lectura
+from balanza_reader import RECONEXION_POR_DEFECTO, SIN_DATOS, BalanzaReader, Publicacion
+
+logger = logging.getLogger(__name__)
+
+# spawn también en Linux: hacer fork con los hilos de lectura y de Tk corriendo no es seguro
+_contexto = multiprocessing.get_context("spawn")
+
+
+class _Reenvio(logging.Handler):
+    """Entrega los mensajes del proceso hijo al logger del mismo nombre en este proceso"""
+
+    def emit(self, record: logging.LogRecord):
+        logging.getLogger(record.name).handle(record)
+
+
+class LectorMemoria(BalanzaReader):
+    """BalanzaReader del proceso hijo: además de publicar, escribe en la memoria compartida"""
+
+    def __init__(self, config_path: str, config: Dict[str, Any], memoria: MemoriaPeso):
+        self._memoria = None
+        super().__init__(config_path, config)
+        self._memoria = memoria
+
+    def _publicar(self, lecturas: List[Tuple[Lectura, Optional[PesoEstable]]], ahora: float,
+                  fecha: Optional[float] = None):
+        super()._publicar(lecturas, ahora, fecha)
+        publicacion = self._publicacion
+        self._memoria.escribir(publicacion.secuencia, publicacion.tiempo, publicacion.fecha,
+                               publicacion.lectura, publicacion.peso_estable,
+                               [(lectura.peso, ahora) for lectura, _ in lecturas])
+
+    def _vaciar_publicacion(self):
+        super()._vaciar_publicacion()
+        if self._memoria is not None:
+            publicacion = self._publicacion
+            self._memoria.escribir(publicacion.secuencia, publicacion.tiempo, None, None, None)
+
+
+def adquirir(config_path: str, config: Dict[str, Any], balanza_key: str, nombre_memoria: str,
+             detener, cola_registro, nivel_registro: int):
+    """Cuerpo del proceso hijo: conecta la balanza y mantiene al día estado y métricas"""
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [logging.handlers.QueueHandler(cola_registro)]
+    raiz.setLevel(nivel_registro)
+
+    memoria = MemoriaPeso.abrir(nombre_memoria)
+    lector = LectorMemoria(config_path, config, memoria)
+    padre = multiprocessing.parent_process()
+    try:
+        if not lector.conectar(balanza_key):
+            return
+        ultimo_volcado = 0.0
+        while True:
+            memoria.escribir_estado(lector._connected, lector.esta_obsoleta())
+            ahora = time.monotonic()
+            if ahora - ultimo_volcado >= 1.0:
+                ultimo_volcado = ahora
+                memoria.escribir_metricas(lector.metricas())
+            # Si el proceso principal murió sin avisar, soltar el puerto igual
+            if detener.wait(0.1) or (padre is not None and not padre.is_alive()):
+                break
+    finally:
+        lector.desconectar()
+        memoria.escribir_estado(False, False)
+        memoria.cerrar()
+
+
+class LectorSubproceso(BalanzaReader):
+    """Lector de una balanza cuya adquisición corre en un proceso hijo.
+
+    Las lecturas se toman de la memoria compartida; los suscriptores reciben
+    los cambios desde un hilo que revisa el bloque cada ``intervalo_vigia``
+    segundos. Si el proceso hijo termina, se relanza con la misma espera
+    exponencial que la reconexión del puerto.
+    """
+
+    intervalo_vigia = 0.01
+    espera_inicio = 15.0    # Segundos que se espera a que el hijo abra el puerto
+
+    def __init__(self, config_path: str = "configuracion.json", config: Optional[Dict[str, Any]] = None):
+        self._memoria: Optional[MemoriaPeso] = None
+        self._publicacion_local = SIN_DATOS
+        self._secuencia_base = 0
+        super().__init__(config_path, config)
+        self._proceso: Optional[multiprocessing.Process] = None
+        self._detener_proceso = None
+        self._cola_registro = None
+        self._oyente: Optional[logging.handlers.QueueListener] = None
+        self._vigia: Optional[threading.Thread] = None
+        self._detener_vigia = threading.Event()
+        self._reinicios_proceso = 0
+
+    @property
+    def _publicacion(self) -> Publicacion:
+        memoria = self._memoria
+        if memoria is None:
+            return self._publicacion_local
+        try:
+            estado = memoria.leer()
+        except (ValueError, TypeError):
+            # El bloque se cerró mientras se leía
+            return self._publicacion_local
+        if estado is None:
+            return self._publicacion_local
+        lectura = estado.lectura
+        return Publicacion(lectura.peso if lectura is not None else None, estado.peso_estable is not None,
+                           self._secuencia_base + estado.secuencia, estado.tiempo, lectura,
+                           estado.peso_estable, estado.fecha)
+
+    @_publicacion.setter
+    def _publicacion(self, publicacion: Publicacion):
+        self._publicacion_local = publicacion
+
+    def conectar(self, balanza_key: Optional[str] = None) -> bool:
+        """Lanza el proceso que adquiere la balanza y espera a que abra el puerto"""
+        if balanza_key is None:
+            balanza_key = self.get_balanza_selected()
+        if self._connected and self._balanza_actual == balanza_key:
+            return True
+        if self._connected:
+            self._desconectar_internal()
+        if balanza_key not in self.config["balanzas"]:
+            logger.error("Balanza '%s' no encontrada en la configuración", balanza_key)
+            return False
+
+        balanza_config = self.config["balanzas"][balanza_key]
+        self._balanza_config = balanza_config
+        self._reconexion = dict(RECONEXION_POR_DEFECTO, **balanza_config.get("reconexion", {}))
+        self._espera_reconexion = self._reconexion["espera_inicial"]
+        memoria = MemoriaPeso.crear(balanza_config.get("ventana_compartida", 256))
+        self._cola_registro = _contexto.Queue()
+        self._oyente = logging.handlers.QueueListener(self._cola_registro, _Reenvio())
+        self._oyente.start()
+
+        self._detener_vigia.clear()
+        if not self._lanzar_proceso(balanza_key, memoria):
+            self._terminar_proceso()
+            memoria.cerrar()
+            self._parar_registro()
+            return False
+
+        self._secuencia_base = self._publicacion_local.secuencia
+        self._memoria = memoria
+        self._connected = True
+        self._balanza_actual = balanza_key
+        self._vigia = threading.Thread(target=self._vigilar, daemon=True, name=f"vigia-{balanza_key}")
+        self._vigia.start()
+        logger.info("Balanza %s adquirida por el proceso %d", balanza_key, self._proceso.pid,
+                    extra={"balanza": balanza_key, "pid": self._proceso.pid})
+        return True
+
+    def _lanzar_proceso(self, balanza_key: str, memoria: MemoriaPeso) -> bool:
+        """Arranca el proceso hijo; True cuando informa que la balanza quedó conectada"""
+        self._detener_proceso = _contexto.Event()
+        self._proceso = _contexto.Process(
+            target=adquirir, daemon=True, name=f"adquisicion-{balanza_key}",
+            args=(self.config_path, self.config, balanza_key, memoria.nombre, self._detener_proceso,
+                  self._cola_registro, logging.getLogger().getEffectiveLevel()))
+        self._proceso.start()
+
+        limite = time.monotonic() + self.espera_inicio
+        while time.monotonic() < limite:
+            if memoria.leer_banderas() & CONECTADO:
+                return True
+            if not self._proceso.is_alive() or self._detener_vigia.wait(0.02):
+                break
+        logger.error("El proceso de adquisición de %s no pudo conectar la balanza (código %s)",
+                     balanza_key, self._proceso.exitcode, extra={"balanza": balanza_key})
+        return False
+
+    def _terminar_proceso(self):
+        """Pide al proceso hijo que suelte el puerto; si no responde, lo termina"""
+        proceso = self._proceso
+        if proceso is None:
+            return
+        self._detener_proceso.set()
+        proceso.join(timeout=5.0)
+        if proceso.is_alive():
+            logger.warning("El proceso de adquisición %d no terminó; se lo fuerza", proceso.pid)
+            proceso.terminate()
+            proceso.join(timeout=1.0)
+        self._proceso = None
+
+    def _parar_registro(self):
+        if self._oyente is not None:
+            self._oyente.stop()
+            self._oyente = None
+        if self._cola_registro is not None:
+            self._cola_registro.close()
+            self._cola_registro = None
+
+    def _vigilar(self):
+        """Notifica a los suscriptores los cambios del bloque y relanza el proceso si muere"""
+        memoria = self._memoria
+        ultimo = None
+        while not self._detener_vigia.wait(self.intervalo_vigia):
+            proceso = self._proceso
+            if proceso is None or not proceso.is_alive():
+                self._relanzar()
+                ultimo = None
+                continue
+            contador = memoria.contador()
+            if contador == ultimo:
+                continue
+            ultimo = contador
+            estado = memoria.leer()
+            if estado is None or estado.lectura is None:
+                continue
+            cambio = (estado.lectura.peso, estado.peso_estable is not None)
+            if cambio != self._ultimo_notificado:
+                self._ultimo_notificado = cambio
+                self._notificar(estado.lectura, estado.peso_estable)
+
+    def _relanzar(self):
+        """Vuelve a lanzar el proceso hijo con espera exponencial entre intentos"""
+        config = self._reconexion
+        with self._conexion_lock:
+            if self._detener_vigia.is_set():
+                return
+            proceso = self._proceso
+            logger.error("El proceso de adquisición de %s terminó (código %s); relanzando",
+                         self._balanza_actual, proceso.exitcode if proceso is not None else None,
+                         extra={"balanza": self._balanza_actual})
+            # El hijo murió: hasta que el nuevo conecte, la lectura es la anterior
+            self._memoria.escribir_estado(False, True)
+            # La secuencia del hijo nuevo vuelve a empezar
+            self._secuencia_base = self._publicacion.secuencia
+            self._proceso = None
+            if self._lanzar_proceso(self._balanza_actual, self._memoria):
+                self._reinicios_proceso += 1
+                self._espera_reconexion = config["espera_inicial"]
+                return
+            self._terminar_proceso()
+
+        espera = self._espera_reconexion * (1 + random.uniform(-config["variacion"], config["variacion"]))
+        self._espera_reconexion = min(self._espera_reconexion * config["factor"], config["espera_maxima"])
+        self._detener_vigia.wait(espera)
+
+    def _desconectar_internal(self):
+        """Detiene el proceso hijo y libera la memoria compartida"""
+        self._detener_vigia.set()
+        vigia = self._vigia
+        if vigia is not None and vigia is not threading.current_thread():
+            vigia.join(timeout=5.0)
+        self._vigia = None
+        with self._conexion_lock:
+            self._terminar_proceso()
+            memoria = self._memoria
+            if memoria is not None:
+                # La última publicación queda como local; los lectores dejan de ver el bloque
+                self._publicacion_local = self._publicacion
+                self._memoria = None
+                memoria.cerrar()
+            self._parar_registro()
+            self._connected = False
+            self._balanza_actual = None
+
+    def iniciar_captura(self, ruta: str) -> bool:
+        """La captura se hace en el proceso que tiene el puerto"""
+        logger.warning("La balanza %s se adquiere en otro proceso; no se puede capturar desde aquí",
+                       self._balanza_actual)
+        return False
+
+    def enviar_comando(self, nombre: str) -> None:
+        """El puerto lo tiene el proceso hijo"""
+        logger.error("No se puede enviar '%s': la balanza %s se adquiere en otro proceso",
+                     nombre, self._balanza_actual)
+        return None
+
+    def leer_peso(self) -> Optional[float]:
+        """Último peso, leído directamente de la memoria compartida"""
+        memoria = self._memoria
+        if not self._connected or memoria is None:
+            return None
+        try:
+            return memoria.leer_peso()
+        except (ValueError, TypeError):
+            return None
+
+    def leer_peso_estable(self) -> Optional[PesoEstable]:
+        if self.esta_obsoleta():
+            return None
+        return super().leer_peso_estable()
+
+    def leer_ventana(self) -> Tuple[array, array]:
+        """Últimas muestras (pesos, tiempos monotonic) que publicó el proceso hijo"""
+        memoria = self._memoria
+        if memoria is None:
+            return array("d"), array("d")
+        return memoria.leer_ventana()
+
+    def esta_conectado(self) -> bool:
+        memoria = self._memoria
+        proceso = self._proceso
+        return (self._connected and memoria is not None and proceso is not None and proceso.is_alive()
+                and bool(memoria.leer_banderas() & CONECTADO))
+
+    def esta_obsoleta(self) -> bool:
+        """True si el hijo perdió el puerto o el propio proceso hijo no está corriendo"""
+        memoria = self._memoria
+        if not self._connected or memoria is None:
+            return False
+        proceso = self._proceso
+        if proceso is None or not proceso.is_alive():
+            return True
+        return bool(memoria.leer_banderas() & OBSOLETA)
+
+    def get_status(self) -> Dict[str, Any]:
+        status = super().get_status()
+        proceso = self._proceso
+        status["hilo_activo"] = bool(proceso is not None and proceso.is_alive())
+        status["pid"] = proceso.pid if proceso is not None else None
+        return status
+
+    def metricas(self) -> Dict[str, Any]:
+        """Métricas del proceso hijo (se actualizan cada segundo) y reinicios del proceso"""
+        memoria = self._memoria
+        datos = memoria.leer_metricas() if memoria is not None else super().metricas()
+        datos["reinicios_proceso"] = self._reinicios_proceso
+        return datos
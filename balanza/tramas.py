@@ -0,0 +1,107 @@
+import re
+from typing import Iterable, List, Tuple
+
+
+class ArmadorTramas:
+    """Separa en tramas los bloques de bytes recibidos por el puerto serial.
+
+    Los datos se copian a un buffer fijo (bytearray) y las tramas se entregan
+    como memoryview sobre ese buffer, sin copias intermedias. Las vistas
+    entregadas son válidas hasta la siguiente llamada a ``alimentar``.
+    Si se acumulan más de ``max_trama`` bytes sin terminador, el contenido se
+    descarta y se resincroniza en el próximo terminador.
+    """
+
+    def __init__(self, terminadores: Iterable[bytes] = (b"\r", b"\n"),
+                 max_trama: int = 128, capacidad: int = 4096):
+        self.terminadores: Tuple[bytes, ...] = tuple(t for t in terminadores if t)
+        if not self.terminadores:
+            raise ValueError("Se necesita al menos un terminador de trama")
+        self.max_trama = max_trama
+        self._buffer = bytearray(max(capacidad, max_trama * 2))
+        self._vista = memoryview(self._buffer)
+        self._inicio = 0  # Comienzo de la trama en curso
+        self._fin = 0     # Fin de los datos válidos
+        self._max_terminador = max(len(t) for t in self.terminadores)
+        # Un único patrón encuentra cualquiera de los terminadores en una pasada
+        self._patron = re.compile(b"|".join(
+            re.escape(t) for t in sorted(self.terminadores, key=len, reverse=True)))
+        self._descartando = False
+
+        # Estadísticas
+        self.tramas = 0
+        self.resincronizaciones = 0
+        self.bytes_descartados = 0
+
+    def reiniciar(self):
+        """Descarta los datos pendientes (por ejemplo al reconectar)"""
+        self._inicio = 0
+        self._fin = 0
+        self._descartando = False
+
+    def pendientes(self) -> int:
+        """Cantidad de bytes recibidos que aún no forman una trama"""
+        return self._fin - self._inicio
+
+    def alimentar(self, datos) -> List[memoryview]:
+        """Agrega un bloque de bytes y devuelve las tramas completas encontradas"""
+        tramas: List[memoryview] = []
+        vista_datos = memoryview(datos)
+
+        while vista_datos:
+            libre = len(self._buffer) - self._fin
+            if len(vista_datos) > libre and self._inicio:
+                # El buffer sólo se compacta cuando hace falta lugar; las
+                # tramas ya armadas se copian porque sus bytes se van a mover
+                if tramas:
+                    tramas = [bytes(t) for t in tramas]
+                self._compactar()
+                libre = len(self._buffer) - self._fin
+            bloque = vista_datos[:libre]
+            vista_datos = vista_datos[libre:]
+
+            fin = self._fin
+            desde = max(self._inicio, fin - self._max_terminador + 1)
+            self._fin = fin + len(bloque)
+            self._buffer[fin:self._fin] = bloque
+            self._extraer_tramas(desde, tramas)
+
+        return tramas
+
+    def _compactar(self):
+        """Mueve la trama incompleta al comienzo del buffer"""
+        pendientes = self._fin - self._inicio
+        if pendientes:
+            self._buffer[0:pendientes] = self._buffer[self._inicio:self._fin]
+        self._inicio = 0
+        self._fin = pendientes
+
+    def _extraer_tramas(self, desde: int, tramas: List[memoryview]):
+        """Busca terminadores a partir de ``desde`` y corta las tramas completas"""
+        inicio = self._inicio
+        fin = self._fin
+        max_trama = self.max_trama
+
+        for terminador in self._patron.finditer(self._buffer, desde, fin):
+            corte = terminador.start()
+            if self._descartando:
+                # Fin de la basura: la próxima trama arranca sincronizada
+                self._descartando = False
+                self.bytes_descartados += corte - inicio
+            elif corte - inicio > max_trama:
+                self.resincronizaciones += 1
+                self.bytes_descartados += corte - inicio
+            elif corte > inicio:
+                tramas.append(self._vista[inicio:corte])
+                self.tramas += 1
+            inicio = terminador.end()
+
+        # Trama incompleta demasiado larga: se descarta hasta el próximo terminador
+        if fin - inicio > max_trama:
+            if not self._descartando:
+                self._descartando = True
+                self.resincronizaciones += 1
+            self.bytes_descartados += fin - inicio
+            inicio = fin
+
+        self._inicio = inicio
@@ -1,40 +1,99 @@
 import json
+import logging
+import random
 import serial
-import re
 import sys
 import threading
 import time
-from typing import Dict, Any, Optional
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Tuple
+from balanza.tramas import ArmadorTramas
+from balanza.protocolos import Lectura, Protocolo, crear_protocolo, PROTOCOLO_POR_DEFECTO
+from balanza.estabilidad import DetectorEstabilidad, PesoEstable
+from balanza.filtros import CadenaFiltros
+from balanza.captura import CapturaSerial, FuenteReproduccion
+from balanza.metricas import MetricasLectura, VolcadorMetricas
+from balanza.broker import ClienteBroker, LecturaBroker, direccion_broker
+from balanza.comandos import SOLICITUD, CanalComandos
+from balanza.serie import RegistroSerie
+
+logger = logging.getLogger(__name__)
+
+# Valores por defecto de la sección 'reconexion' de cada balanza
+RECONEXION_POR_DEFECTO = {
+    "espera_inicial": 0.5,      # Segundos entre el primer y el segundo intento
+    "espera_maxima": 30.0,      # Tope de la espera exponencial
+    "factor": 2.0,              # Multiplicador de la espera en cada intento fallido
+    "variacion": 0.25,          # Variación aleatoria de la espera (+-25 %)
+    "sin_datos": 10.0,          # Segundos sin tramas para dar el puerto por caído (0 = no controlar)
+    "intervalo_control": 0.5    # Cada cuánto revisa el supervisor
+}
+
+class Publicacion(NamedTuple):
+    """Última lectura de una balanza, tal como la publica el hilo de lectura.
+    
+    Nunca se modifica: cada bloque de datos crea una nueva y la reemplaza
+    con una sola asignación, así que se puede leer desde cualquier hilo sin
+    lock. Una secuencia mayor que la última vista indica datos nuevos.
+    """
+    peso: Optional[float]
+    estable: bool                              # Hay peso estable
+    secuencia: int                             # Crece con cada publicación; 0 = nunca hubo datos
+    tiempo: float                              # time.monotonic() del bloque que la originó
+    lectura: Optional[Lectura] = None
+    peso_estable: Optional[PesoEstable] = None
+    fecha: Optional[float] = None              # time.time() de la publicación, sólo para mostrar
+
+SIN_DATOS = Publicacion(None, False, 0, 0.0)
 
 class BalanzaReader:
-    _instance = None
-    _lock = threading.Lock()
+    """Lector de una balanza: un puerto serial y su hilo de lectura.
     
-    def __new__(cls, config_path: str = "configuracion.json"):
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super(BalanzaReader, cls).__new__(cls)
-                    cls._instance._initialized = False
-        return cls._instance
+    Para tener varias balanzas conectadas a la vez usar GestorBalanzas.
+    """
     
-    def __init__(self, config_path: str = "configuracion.json"):
-        if self._initialized:
-            return
-            
+    # Si la balanza tiene 'broker' y el broker está corriendo, se lee de él en
+    # lugar de abrir el puerto (el propio broker lo pone en False)
+    usar_broker = True
+    
+    def __init__(self, config_path: str = "configuracion.json", config: Optional[Dict[str, Any]] = None):
         self.config_path = config_path
-        self.config = self.load_config()
+        # Los lectores de un mismo gestor comparten el diccionario de configuración
+        self.config = config if config is not None else self.load_config()
         self.ser = None
-        self.buffer = ""
-        self.peso_anterior = None
-        self.peso_actual = None
+        self._armador = ArmadorTramas()
+        self._protocolo: Protocolo = crear_protocolo({})
+        self._proxima_solicitud = 0.0
+        self._publicacion = SIN_DATOS  # Sólo la reemplaza el hilo de lectura (ver Publicacion)
+        self._estabilidad = DetectorEstabilidad()
+        self._filtros = CadenaFiltros()
+        # Lista de suscriptores: se reemplaza completa al modificarla para que
+        # el hilo de lectura pueda recorrerla sin tomar el lock
+        self._suscriptores: List[Callable[[Lectura, Optional[PesoEstable]], None]] = []
+        self._ultimo_notificado = None
         self._reading_thread = None
         self._stop_reading = False
         self._data_lock = threading.Lock()
         self._connected = False
         self._balanza_actual = None
-        self._last_data_time = None
-        self._initialized = True
+        self._metricas = MetricasLectura()
+        self._ultimo_aviso = 0.0
+        # Supervisor de reconexión
+        self._balanza_config: Dict[str, Any] = {}
+        self._reconexion = dict(RECONEXION_POR_DEFECTO)
+        self._supervisor: Optional[threading.Thread] = None
+        self._detener_supervisor = threading.Event()
+        self._conexion_lock = threading.RLock()
+        self._puerto_caido = False
+        self._caida_desde: Optional[float] = None  # monotonic de la caída en curso; la lectura queda obsoleta
+        self._espera_reconexion = 0.0
+        self._ultima_apertura = 0.0  # monotonic de la última vez que el supervisor reabrió el puerto
+        self._modo_lectura = "bloqueante"
+        self._captura: Optional[CapturaSerial] = None
+        self._broker: Optional[str] = None  # Dirección del broker si la balanza llega por él
+        self._secuencia_broker: Optional[int] = None
+        self._comandos = CanalComandos()
+        self._serie: Optional[RegistroSerie] = None
         
     def load_config(self) -> Dict[str, Any]:
         """Carga la configuración desde el archivo JSON"""
@@ -43,12 +102,12 @@ class BalanzaReader:
                 config = json.load(f)
             return config
         except FileNotFoundError:
-            print(f"Error: No se encontró el archivo {self.config_path}")
+            logger.error("No se encontró el archivo %s", self.config_path)
             self.create_default_config()
-            print(f"Se creó un archivo de configuración por defecto: {self.config_path}")
+            logger.info("Se creó un archivo de configuración por defecto: %s", self.config_path)
             return self.load_config()
         except json.JSONDecodeError as e:
-            print(f"Error al leer el archivo JSON: {e}")
+            logger.critical("Error al leer el archivo JSON: %s", e)
             sys.exit(1)
     
     def create_default_config(self):
@@ -69,7 +128,8 @@ class BalanzaReader:
                     "dsrdtr": False,
                     "dtr": True,
                     "rts": True,
-                    "unidad": "kg"
+                    "unidad": "kg",
+                    "protocolo": PROTOCOLO_POR_DEFECTO
                 },
                 "balanza2": {
                     "nombre": "Balanza Secundaria",
@@ -84,7 +144,8 @@ class BalanzaReader:
                     "dsrdtr": False,
                     "dtr": True,
                     "rts": True,
-                    "unidad": "kg"
+                    "unidad": "kg",
+                    "protocolo": PROTOCOLO_POR_DEFECTO
                 }
             }
         }
@@ -98,8 +159,8 @@ class BalanzaReader:
         
         # Verificar que la balanza seleccionada existe en la configuración
         if balanza_selected not in self.config["balanzas"]:
-            print(f"⚠ Warning: La balanza '{balanza_selected}' no existe en la configuración")
-            print("Usando la primera balanza disponible...")
+            logger.warning("La balanza '%s' no existe en la configuración; se usa la primera disponible",
+                           balanza_selected)
             balanza_selected = list(self.config["balanzas"].keys())[0]
             
         return balanza_selected
@@ -107,7 +168,7 @@ class BalanzaReader:
     def set_balanza_selected(self, balanza_key: str) -> bool:
         """Establece la balanza seleccionada y la guarda en el JSON"""
         if balanza_key not in self.config["balanzas"]:
-            print(f"Error: La balanza '{balanza_key}' no existe en la configuración")
+            logger.error("La balanza '%s' no existe en la configuración", balanza_key)
             return False
         
         # Actualizar la configuración en memoria
@@ -117,10 +178,10 @@ class BalanzaReader:
         try:
             with open(self.config_path, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, indent=4, ensure_ascii=False)
-            print(f"✓ Balanza seleccionada guardada: {self.config['balanzas'][balanza_key]['nombre']}")
+            logger.info("Balanza seleccionada guardada: %s", self.config['balanzas'][balanza_key]['nombre'])
             return True
         except Exception as e:
-            print(f"Error al guardar la configuración: {e}")
+            logger.error("Error al guardar la configuración: %s", e)
             return False
     
     def get_balanzas_disponibles(self):
@@ -146,75 +207,211 @@ class BalanzaReader:
         # Si no se especifica balanza, usar la del JSON
         if balanza_key is None:
             balanza_key = self.get_balanza_selected()
-            print(f"🎯 Using balanza from JSON: {balanza_key}")
+            logger.info("Usando la balanza del JSON: %s", balanza_key)
         
         # Si ya está conectada a la misma balanza, no hacer nada
         if self._connected and self._balanza_actual == balanza_key:
-            print(f"✓ Ya conectado a {self.config['balanzas'][balanza_key]['nombre']}")
+            logger.info("Ya conectado a %s", self.config['balanzas'][balanza_key]['nombre'])
             return True
         
         # Si está conectada a otra balanza, desconectar primero
         if self._connected:
-            print(f"Cambiando de {self._balanza_actual} a {balanza_key}...")
+            logger.info("Cambiando de %s a %s", self._balanza_actual, balanza_key)
             self._desconectar_internal()
         
         if balanza_key not in self.config["balanzas"]:
-            print(f"Error: Balanza '{balanza_key}' no encontrada en la configuración")
+            logger.error("Balanza '%s' no encontrada en la configuración", balanza_key)
             return False
             
         balanza_config = self.config["balanzas"][balanza_key]
         
+        direccion = direccion_broker(balanza_key, balanza_config) if self.usar_broker else None
+        if direccion and self._conectar_broker(balanza_key, balanza_config, direccion):
+            return True
+        
         try:
-            print(f"Conectando a {balanza_config['nombre']} en {balanza_config['puerto']}...")
+            logger.info("Conectando a %s en %s", balanza_config['nombre'], balanza_config['puerto'],
+                        extra={"balanza": balanza_key, "puerto": balanza_config['puerto']})
             
-            self.ser = serial.Serial(
-                port=balanza_config["puerto"],
-                baudrate=balanza_config["baudrate"],
-                bytesize=balanza_config["bytesize"],
-                parity=self.get_parity(balanza_config["parity"]),
-                stopbits=balanza_config["stopbits"],
-                timeout=balanza_config["timeout"],
-                xonxoff=balanza_config["xonxoff"],
-                rtscts=balanza_config["rtscts"],
-                dsrdtr=balanza_config["dsrdtr"]
-            )
+            protocolo = crear_protocolo(balanza_config)
+            self.ser = self._abrir_puerto(balanza_config, protocolo)
             
-            # Verificar que la conexión se abrió correctamente
-            if not self.ser.is_open:
-                print("Error: No se pudo abrir el puerto serial")
-                return False
-            
-            # Configurar DTR y RTS si están especificados
-            if balanza_config.get("dtr"):
-                self.ser.setDTR(True)
-            if balanza_config.get("rts"):
-                self.ser.setRTS(True)
-            
-            # Limpiar variables
-            with self._data_lock:
-                self.buffer = ""
-                self.peso_actual = None
-                self.peso_anterior = None
-                self._last_data_time = time.time()
-            
-            # Iniciar el hilo de lectura continua
+            # Limpiar variables e iniciar el hilo de lectura continua
+            self._preparar_lectura(balanza_config, protocolo)
+            self._iniciar_serie(balanza_key, balanza_config)
             self._start_reading_thread()
             
             self._connected = True
             self._balanza_actual = balanza_key
+            self._iniciar_supervisor(balanza_config)
             
-            print(f"✓ Conectado exitosamente a {balanza_config['nombre']}")
+            logger.info("Conectado a %s", balanza_config['nombre'], extra={"balanza": balanza_key})
             return True
             
         except serial.SerialException as e:
-            print(f"✗ Error al conectar con la balanza: {e}")
+            logger.error("Error al conectar con la balanza %s: %s", balanza_key, e, extra={"balanza": balanza_key})
             self.ser = None
             return False
         except Exception as e:
-            print(f"✗ Error inesperado al conectar: {e}")
+            logger.exception("Error inesperado al conectar con la balanza %s", balanza_key)
             self.ser = None
             return False
     
+    def _conectar_broker(self, balanza_key: str, balanza_config: Dict[str, Any], direccion: str) -> bool:
+        """Se conecta al broker que comparte la balanza; False si no está corriendo"""
+        try:
+            fuente = ClienteBroker(direccion, balanza_config.get("timeout", 1))
+        except (OSError, ValueError) as e:
+            logger.info("Broker de %s no disponible en %s (%s); se abre el puerto", balanza_key, direccion, e)
+            return False
+        
+        self.ser = fuente
+        self._broker = direccion
+        self._preparar_lectura(balanza_config, crear_protocolo(balanza_config))
+        self._iniciar_serie(balanza_key, balanza_config)
+        self._start_reading_thread()
+        self._connected = True
+        self._balanza_actual = balanza_key
+        self._iniciar_supervisor(balanza_config)
+        logger.info("Conectado a %s por el broker %s", balanza_config['nombre'], direccion,
+                    extra={"balanza": balanza_key, "broker": direccion})
+        return True
+    
+    def _iniciar_serie(self, balanza_key: str, balanza_config: Dict[str, Any]):
+        """Empieza a guardar todas las muestras si la balanza tiene 'serie'"""
+        self._serie = RegistroSerie.desde_config(balanza_key, balanza_config)
+        if self._serie is not None:
+            self._serie.iniciar()
+            logger.info("Guardando las muestras de %s en %s", balanza_key, self._serie.carpeta)
+    
+    def _abrir_fuente(self):
+        """Reabre la conexión con el broker o el puerto serial, según cómo se conectó la balanza"""
+        if self._broker:
+            return ClienteBroker(self._broker, self._balanza_config.get("timeout", 1))
+        return self._abrir_puerto(self._balanza_config, self._protocolo)
+    
+    def _abrir_puerto(self, balanza_config: Dict[str, Any], protocolo: Protocolo) -> serial.Serial:
+        """Abre el puerto serial de la balanza; lanza SerialException si no se puede"""
+        timeout = balanza_config["timeout"]
+        if protocolo.comando_solicitud:
+            # El hilo tiene que despertar a tiempo para enviar cada solicitud
+            timeout = min(timeout, protocolo.intervalo_solicitud)
+        
+        ser = serial.Serial(
+            port=balanza_config["puerto"],
+            baudrate=balanza_config["baudrate"],
+            bytesize=balanza_config["bytesize"],
+            parity=self.get_parity(balanza_config["parity"]),
+            stopbits=balanza_config["stopbits"],
+            timeout=timeout,
+            xonxoff=balanza_config["xonxoff"],
+            rtscts=balanza_config["rtscts"],
+            dsrdtr=balanza_config["dsrdtr"]
+        )
+        
+        # Verificar que la conexión se abrió correctamente
+        if not ser.is_open:
+            raise serial.SerialException(f"No se pudo abrir el puerto serial {balanza_config['puerto']}")
+        
+        # Configurar DTR y RTS si están especificados (los pseudo-terminales
+        # del simulador no tienen líneas de control)
+        try:
+            if balanza_config.get("dtr"):
+                ser.setDTR(True)
+            if balanza_config.get("rts"):
+                ser.setRTS(True)
+        except (serial.SerialException, OSError) as e:
+            logger.warning("No se pudieron configurar DTR/RTS en %s: %s", balanza_config['puerto'], e)
+        return ser
+    
+    def _preparar_lectura(self, balanza_config: Dict[str, Any], protocolo: Protocolo):
+        """Deja protocolo, armador y detector listos para una nueva fuente de datos"""
+        with self._data_lock:
+            self._protocolo = protocolo
+            self._armador = self._crear_armador(balanza_config)
+            self._modo_lectura = balanza_config.get("modo_lectura", "bloqueante")
+            self._proxima_solicitud = 0.0
+            self._estabilidad = DetectorEstabilidad.desde_config(balanza_config)
+            self._filtros = CadenaFiltros.desde_config(balanza_config)
+            self._comandos = CanalComandos.desde_config(protocolo, balanza_config)
+            self._ultimo_notificado = None
+            self._vaciar_publicacion()
+            self._metricas.reiniciar()
+            self._ultimo_aviso = 0.0
+            self._puerto_caido = False
+            self._caida_desde = None
+    
+    def reproducir_captura(self, ruta: str, velocidad: float = 1.0, balanza_key: Optional[str] = None) -> bool:
+        """Reproduce un archivo de captura como si fuera la balanza conectada.
+        
+        Usa la configuración guardada en la captura, o la de balanza_key si se
+        indica. velocidad: 1 tiempo real, N veces más rápido, 0 sin esperas.
+        El hilo de lectura termina solo al llegar al final del archivo.
+        """
+        if self._connected:
+            self._desconectar_internal()
+        
+        try:
+            fuente = FuenteReproduccion(ruta, velocidad)
+            metadatos = fuente.captura.metadatos
+            if balanza_key is not None:
+                balanza_config = self.config["balanzas"][balanza_key]
+            else:
+                balanza_key = metadatos.get("balanza")
+                balanza_config = metadatos.get("config") or self.config["balanzas"][balanza_key]
+            protocolo = crear_protocolo(balanza_config)
+        except Exception as e:
+            logger.error("Error al abrir la captura %s: %s", ruta, e)
+            return False
+        
+        logger.info("Reproduciendo %s a velocidad %s", ruta, velocidad or 'máxima')
+        self.ser = fuente
+        self._preparar_lectura(balanza_config, protocolo)
+        self._start_reading_thread()
+        self._connected = True
+        self._balanza_actual = balanza_key
+        return True
+    
+    def esperar_reproduccion(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que termine la reproducción; devuelve False si venció el timeout"""
+        if self._reading_thread is not None:
+            self._reading_thread.join(timeout)
+            return not self._reading_thread.is_alive()
+        return True
+    
+    def iniciar_captura(self, ruta: str) -> bool:
+        """Empieza a guardar en ruta los bytes crudos que llegan del puerto"""
+        if not self._connected:
+            logger.warning("No se puede capturar: la balanza no está conectada")
+            return False
+        if self._broker:
+            logger.warning("La balanza llega por el broker: los datos crudos se capturan en el broker")
+            return False
+        
+        self.detener_captura()
+        metadatos = {
+            "balanza": self._balanza_actual,
+            "config": self.config["balanzas"].get(self._balanza_actual),
+            "inicio": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        try:
+            self._captura = CapturaSerial(ruta, metadatos)
+        except OSError as e:
+            logger.error("Error al crear la captura %s: %s", ruta, e)
+            return False
+        logger.info("Capturando datos crudos en %s", ruta)
+        return True
+    
+    def detener_captura(self) -> Optional[Dict[str, Any]]:
+        """Cierra la captura en curso y devuelve {ruta, bloques, bytes}"""
+        captura = self._captura
+        if captura is None:
+            return None
+        self._captura = None
+        captura.cerrar()
+        logger.info("Captura cerrada: %s (%d bytes)", captura.ruta, captura.bytes)
+        return {"ruta": captura.ruta, "bloques": captura.bloques, "bytes": captura.bytes}
+    
     def conectar_selected(self) -> bool:
         """Conecta directamente a la balanza seleccionada en el JSON"""
         return self.conectar()
@@ -222,127 +419,668 @@ class BalanzaReader:
     def _start_reading_thread(self):
         """Inicia el hilo de lectura continua en segundo plano"""
         self._stop_reading = False
-        self._reading_thread = threading.Thread(target=self._read_continuously, daemon=True)
+        self._reading_thread = threading.Thread(target=self._leer_broker if self._broker else self._read_continuously,
+                                                daemon=True,
+                                                name=f"lectura-{getattr(self.ser, 'port', 'captura')}")
         self._reading_thread.start()
-        print("✓ Hilo de lectura iniciado")
+        logger.debug("Hilo de lectura iniciado")
+    
+    def _crear_armador(self, balanza_config: Dict[str, Any]) -> ArmadorTramas:
+        """Crea el armador de tramas con los terminadores del protocolo de la balanza"""
+        return ArmadorTramas(
+            terminadores=self._protocolo.terminadores,
+            max_trama=balanza_config.get("max_trama", 128)
+        )
     
     def _read_continuously(self):
         """Función que se ejecuta en un hilo separado para leer continuamente"""
-        print("🔄 Iniciando lectura continua...")
+        logger.info("Iniciando lectura continua")
         
         while not self._stop_reading and self.ser and self.ser.is_open:
             try:
-                if self.ser.in_waiting:
-                    byte = self.ser.read().decode('ascii', errors='ignore')
-                    if byte in ['\r', '\n']:  # Detectar fin de línea
-                        if self.buffer.strip():
-                            nuevo_peso = self.extraer_peso(self.buffer.strip())
-                            if nuevo_peso is not None:
-                                with self._data_lock:
-                                    self.peso_actual = nuevo_peso
-                                    self._last_data_time = time.time()
-                                    # Debug: mostrar datos recibidos
-                                    print(f"📊 Peso recibido: {nuevo_peso} kg")
-                        self.buffer = ""
+                comandos = self._comandos
+                if comandos.hay_pendientes():
+                    comandos.vencer()
+                # Balanzas que no transmiten solas: pedir el peso cuando llegó la respuesta anterior
+                if self._protocolo.comando_solicitud:
+                    ahora = time.monotonic()
+                    if ahora >= self._proxima_solicitud and not comandos.esperando(SOLICITUD):
+                        # Sin esperar a un comando que otro hilo esté escribiendo: se pide en la vuelta siguiente
+                        if comandos.enviar(SOLICITUD, self.ser.write, esperar=False) is not None:
+                            self._proxima_solicitud = ahora + self._protocolo.intervalo_solicitud
+                
+                if self._modo_lectura == "sondeo":
+                    pendientes = self.ser.in_waiting
+                    if pendientes:
+                        datos = self.ser.read(pendientes)
                     else:
-                        self.buffer += byte
+                        datos = b""
+                        time.sleep(0.01)  # Pequeña pausa para no saturar la CPU
                 else:
-                    time.sleep(0.01)  # Pequeña pausa para no saturar la CPU
+                    # Bloquea hasta que llegue al menos un byte o venza el timeout
+                    # del puerto; desconectar() interrumpe la espera con cancel_read()
+                    datos = self.ser.read(self.ser.in_waiting or 1)
+                
+                ahora = time.monotonic()
+                if datos:
+                    captura = self._captura
+                    if captura is not None:
+                        captura.registrar(datos)
+                    self._metricas.registrar_bytes(len(datos), ahora)
+                    self._procesar_datos(datos, ahora)
                     
                 # Verificar si llevamos mucho tiempo sin datos (posible desconexión)
-                if self._last_data_time and time.time() - self._last_data_time > 30:
-                    print("⚠ Warning: No se han recibido datos en 30 segundos")
-                    self._last_data_time = time.time()  # Reset warning
+                ultima = self._metricas.ultima_trama or self._metricas.inicio
+                if ahora - max(ultima, self._ultimo_aviso) > 30:
+                    logger.warning("No se han recibido datos en 30 segundos")
+                    self._ultimo_aviso = ahora
                     
+            except (serial.SerialException, OSError) as e:
+                if self._stop_reading:
+                    break
+                # Adaptador desconectado o puerto cerrado: el supervisor lo reabre
+                logger.error("Puerto caído: %s", e)
+                self._puerto_caido = True
+                break
             except Exception as e:
-                print(f"💥 Error en lectura continua: {e}")
-                print("🔄 Intentando recuperar conexión...")
+                if self._stop_reading:
+                    break
+                logger.exception("Error en lectura continua; se reintenta en 1 s")
                 time.sleep(1)
-                # No break - intentar continuar
         
-        print("🛑 Hilo de lectura terminado")
+        logger.info("Hilo de lectura terminado")
+    
+    def _leer_broker(self):
+        """Hilo de lectura cuando la balanza llega por el broker"""
+        logger.info("Iniciando lectura desde el broker %s", self._broker)
+        self._secuencia_broker = None
+        
+        while not self._stop_reading and self.ser and self.ser.is_open:
+            try:
+                mensajes = self.ser.recibir()
+            except (OSError, ValueError) as e:
+                if self._stop_reading:
+                    break
+                # El broker se cerró: el supervisor vuelve a conectarse
+                logger.error("Conexión con el broker perdida: %s", e)
+                self._puerto_caido = True
+                break
+            if mensajes:
+                self._procesar_broker(mensajes, time.monotonic())
+        
+        logger.info("Hilo de lectura terminado")
+    
+    def _procesar_broker(self, mensajes: List[LecturaBroker], ahora: float):
+        """Publica las lecturas recibidas del broker.
+        
+        El broker ya aplicó filtros y estabilidad; la ventana de muestras no
+        viaja, así que el PesoEstable publicado tiene muestras vacías.
+        """
+        metricas = self._metricas
+        for _ in mensajes:
+            metricas.registrar_trama(ahora)
+        
+        if mensajes[-1].obsoleta:
+            # El broker está reconectando la balanza y repite la lectura anterior a la caída
+            if self._caida_desde is None:
+                self._caida_desde = ahora
+                metricas.caidas += 1
+            return
+        if self._caida_desde is not None:
+            self._registrar_recuperacion(ahora)
+        
+        # Los latidos repiten la última secuencia: no son datos nuevos
+        nuevos = []
+        for mensaje in mensajes:
+            if mensaje.secuencia != self._secuencia_broker:
+                self._secuencia_broker = mensaje.secuencia
+                estable = None
+                if mensaje.peso_estable is not None:
+                    estable = PesoEstable(mensaje.peso_estable, ahora, mensaje.desviacion,
+                                          mensaje.pico_a_pico, (), ())
+                nuevos.append((mensaje.lectura, estable))
+        if nuevos:
+            self._publicar(nuevos, ahora, mensajes[-1].fecha)
+    
+    def _procesar_datos(self, datos: bytes, ahora: Optional[float] = None):
+        """Arma las tramas de un bloque de bytes recibido y actualiza el peso.
+        
+        ahora es el time.monotonic() en que llegó el bloque. Sólo se publica la
+        última lectura del bloque y después se notifican los cambios en orden.
+        """
+        if ahora is None:
+            ahora = time.monotonic()
+        metricas = self._metricas
+        filtrar = self._filtros.aplicar if self._filtros else None
+        # Sólo se buscan respuestas si hay comandos esperándolas
+        comandos = self._comandos if self._comandos.hay_pendientes() else None
+        lecturas = []
+        for trama in self._armador.alimentar(datos):
+            lectura = self._protocolo.parsear(trama)
+            if comandos is not None and comandos.recibir(trama, lectura, ahora) and lectura is None:
+                continue
+            if lectura is None:
+                metricas.fallas_parseo += 1
+                continue
+            metricas.registrar_trama(ahora)
+            if filtrar is not None:
+                lectura = lectura._replace(peso=filtrar(lectura.peso))
+            lecturas.append((lectura, self._estabilidad.agregar(lectura.peso, ahora, lectura.estable)))
+        if not lecturas:
+            return
+        
+        if self._caida_desde is not None:
+            self._registrar_recuperacion(ahora)
+        self._publicar(lecturas, ahora)
+    
+    def _publicar(self, lecturas: List[Tuple[Lectura, Optional[PesoEstable]]], ahora: float,
+                  fecha: Optional[float] = None):
+        """Publica la última lectura de un bloque y notifica los cambios en orden"""
+        lectura, estable = lecturas[-1]
+        fecha = fecha or time.time()
+        self._publicacion = Publicacion(lectura.peso, estable is not None, self._publicacion.secuencia + 1,
+                                        ahora, lectura, estable, fecha)
+        serie = self._serie
+        if serie is not None:
+            serie.agregar([lectura.peso for lectura, _ in lecturas], fecha)
+        logger.debug("Peso recibido: %s %s", lectura.peso, lectura.unidad)
+        
+        # Notificar sólo cuando cambia el valor o el estado de estabilidad
+        for lectura, estable in lecturas:
+            cambio = (lectura.peso, estable is not None)
+            if cambio != self._ultimo_notificado:
+                self._ultimo_notificado = cambio
+                self._notificar(lectura, estable)
+    
+    def _iniciar_supervisor(self, balanza_config: Dict[str, Any]):
+        """Arranca el hilo que vigila el puerto y lo reabre si se cae"""
+        self._balanza_config = balanza_config
+        self._reconexion = dict(RECONEXION_POR_DEFECTO, **balanza_config.get("reconexion", {}))
+        self._espera_reconexion = self._reconexion["espera_inicial"]
+        self._detener_supervisor.clear()
+        self._supervisor = threading.Thread(target=self._supervisar, daemon=True,
+                                            name=f"supervisor-{balanza_config['puerto']}")
+        self._supervisor.start()
+    
+    def _parar_supervisor(self):
+        self._detener_supervisor.set()
+        supervisor = self._supervisor
+        if supervisor is not None and supervisor is not threading.current_thread():
+            supervisor.join(timeout=5.0)
+        self._supervisor = None
+    
+    def _supervisar(self):
+        """Detecta puerto caído, flujo de datos detenido o hilo de lectura muerto y reconecta"""
+        while not self._detener_supervisor.wait(self._reconexion["intervalo_control"]):
+            motivo = self._detectar_caida()
+            if motivo:
+                self._recuperar(motivo)
+    
+    def _detectar_caida(self) -> Optional[str]:
+        """Devuelve el motivo por el que hay que reabrir el puerto, o None si está sano"""
+        if self._puerto_caido:
+            return "puerto caído"
+        hilo = self._reading_thread
+        if hilo is None or not hilo.is_alive():
+            return "hilo de lectura terminado"
+        sin_datos = self._reconexion["sin_datos"]
+        if sin_datos:
+            ultima = max(self._metricas.ultima_trama or self._metricas.inicio, self._ultima_apertura)
+            if time.monotonic() - ultima > sin_datos:
+                return f"sin datos hace {sin_datos:g} s"
+        return None
+    
+    def _recuperar(self, motivo: str):
+        """Cierra el puerto y lo reabre con espera exponencial y variación aleatoria"""
+        config = self._reconexion
+        with self._conexion_lock:
+            if self._detener_supervisor.is_set():
+                return
+            if self._caida_desde is None:
+                self._caida_desde = time.monotonic()
+                self._metricas.caidas += 1
+            logger.warning("Balanza %s: %s; reconectando", self._balanza_actual, motivo,
+                           extra={"balanza": self._balanza_actual, "motivo": motivo})
+            self._cerrar_puerto()
+        
+        intento = 0
+        while True:
+            intento += 1
+            with self._conexion_lock:
+                if self._detener_supervisor.is_set():
+                    return
+                if self._reading_thread is not None and self._reading_thread.is_alive():
+                    error = "el hilo de lectura anterior sigue activo"
+                else:
+                    try:
+                        ser = self._abrir_fuente()
+                    except Exception as e:
+                        error = str(e)
+                    else:
+                        self.ser = ser
+                        # El hilo de lectura anterior ya terminó y el nuevo todavía no arrancó
+                        self._armador.reiniciar()
+                        self._estabilidad.reiniciar()
+                        self._filtros.reiniciar()
+                        self._puerto_caido = False
+                        self._ultima_apertura = time.monotonic()
+                        self._metricas.reinicios_hilo += 1
+                        self._start_reading_thread()
+                        logger.info("Puerto %s reabierto en el intento %d", ser.port, intento)
+                        return
+            
+            espera = self._espera_reconexion * (1 + random.uniform(-config["variacion"], config["variacion"]))
+            logger.warning("Intento %d de reconexión fallido (%s); próximo en %.1f s", intento, error, espera)
+            self._espera_reconexion = min(self._espera_reconexion * config["factor"], config["espera_maxima"])
+            if self._detener_supervisor.wait(espera):
+                return
+    
+    def _registrar_recuperacion(self, ahora: float):
+        """Llegaron datos después de una caída: la lectura vuelve a ser válida"""
+        duracion = ahora - self._caida_desde
+        self._caida_desde = None
+        self._espera_reconexion = self._reconexion["espera_inicial"]
+        self._metricas.registrar_recuperacion(duracion)
+        logger.info("Balanza %s recuperada en %.2f s", self._balanza_actual, duracion,
+                    extra={"balanza": self._balanza_actual, "recuperacion_s": round(duracion, 3)})
+    
+    def _notificar(self, lectura: Lectura, estable: Optional[PesoEstable]):
+        """Llama a los suscriptores desde el hilo de lectura"""
+        for callback in self._suscriptores:
+            try:
+                callback(lectura, estable)
+            except Exception as e:
+                logger.exception("Error en suscriptor de peso")
+    
+    def suscribir(self, callback: Callable[[Lectura, Optional[PesoEstable]], None]):
+        """Registra una función que recibe (lectura, peso_estable) cada vez que cambia el peso.
+        
+        La función se ejecuta en el hilo de lectura: debe ser rápida y no tocar
+        widgets de Tk directamente.
+        """
+        with self._data_lock:
+            if callback not in self._suscriptores:
+                self._suscriptores = self._suscriptores + [callback]
+    
+    def desuscribir(self, callback: Callable[[Lectura, Optional[PesoEstable]], None]):
+        """Quita una función registrada con suscribir()"""
+        with self._data_lock:
+            self._suscriptores = [c for c in self._suscriptores if c != callback]
     
     def _desconectar_internal(self):
-        """Desconecta internamente sin resetear el singleton"""
-        # Detener el hilo de lectura
-        if hasattr(self, '_stop_reading'):
-            self._stop_reading = True
+        """Desconecta el puerto y detiene el hilo sin limpiar las lecturas"""
+        self._parar_supervisor()
+        with self._conexion_lock:
+            self._cerrar_puerto()
+            if self._serie is not None:
+                self._serie.detener()
+                self._serie = None
+            self._connected = False
+            self._balanza_actual = None
+            self._broker = None
+            self._caida_desde = None
+    
+    def _cerrar_puerto(self):
+        """Detiene el hilo de lectura y cierra el puerto"""
+        self._stop_reading = True
+        
+        # Despertar al hilo si está bloqueado esperando datos del puerto
+        if self.ser and self.ser.is_open and hasattr(self.ser, 'cancel_read'):
+            try:
+                self.ser.cancel_read()
+            except Exception:
+                pass
             
-        if hasattr(self, '_reading_thread') and self._reading_thread and self._reading_thread.is_alive():
+        if self._reading_thread and self._reading_thread.is_alive() and self._reading_thread is not threading.current_thread():
             self._reading_thread.join(timeout=2.0)
         
+        # Los comandos sin respuesta ya no la van a tener
+        self._comandos.cancelar("puerto cerrado")
+        
         # Cerrar la conexión serial
         if self.ser and self.ser.is_open:
             try:
                 self.ser.close()
-                print("🔌 Conexión cerrada")
+                logger.info("Conexión cerrada")
             except Exception as e:
-                print(f"Error al cerrar conexión: {e}")
+                logger.error("Error al cerrar conexión: %s", e)
             finally:
                 self.ser = None
-        
-        self._connected = False
-        self._balanza_actual = None
     
     def desconectar(self):
         """Desconecta de la balanza"""
+        self.detener_captura()
         self._desconectar_internal()
         # Reset de variables
         with self._data_lock:
-            self.buffer = ""
-            self.peso_actual = None
-            self.peso_anterior = None
+            self._armador.reiniciar()
+            self._estabilidad.reiniciar()
+            self._filtros.reiniciar()
+            self._vaciar_publicacion()
+    
+    def _vaciar_publicacion(self):
+        """Publica 'sin datos' con una secuencia nueva para que los lectores vean el cambio"""
+        self._publicacion = SIN_DATOS._replace(secuencia=self._publicacion.secuencia + 1,
+                                               tiempo=time.monotonic())
     
     def extraer_peso(self, texto: str) -> Optional[float]:
         """Extrae el valor numérico del peso del texto recibido"""
-        # Buscar números con posibles decimales
-        match = re.search(r'[-+]?\d*\.?\d+', texto)
-        if match:
-            try:
-                return float(match.group())
-            except ValueError:
-                return None
-        return None
+        lectura = self._protocolo.parsear(texto.encode('latin-1', errors='ignore'))
+        return lectura.peso if lectura is not None else None
+    
+    @property
+    def peso_actual(self) -> Optional[float]:
+        return self._publicacion.peso
+    
+    @property
+    def lectura_actual(self) -> Optional[Lectura]:
+        return self._publicacion.lectura
+    
+    @property
+    def peso_estable(self) -> Optional[PesoEstable]:
+        return self._publicacion.peso_estable
+    
+    def leer_publicacion(self) -> Publicacion:
+        """Devuelve la última lectura publicada, sin tomar locks.
+        
+        Para esperar datos nuevos, comparar su secuencia con la de la última
+        publicación vista. Durante una reconexión la publicación es la
+        anterior a la caída (ver esta_obsoleta).
+        """
+        return self._publicacion
     
     def leer_peso(self) -> Optional[float]:
-        """Lee el peso actual de la balanza"""
+        """Lee el peso actual de la balanza (durante una reconexión, el último recibido; ver esta_obsoleta)"""
         if not self._connected:
             return None
-        
-        with self._data_lock:
-            return self.peso_actual
+        return self._publicacion.peso
+    
+    def leer_lectura(self) -> Optional[Lectura]:
+        """Lee la última lectura completa (peso, estabilidad, unidad y tara)"""
+        if not self._connected:
+            return None
+        return self._publicacion.lectura
+    
+    def leer_peso_estable(self) -> Optional[PesoEstable]:
+        """Devuelve el peso estable actual con su ventana de muestras, o None si la balanza no está estable"""
+        if not self._connected or self._caida_desde is not None:
+            return None
+        return self._publicacion.peso_estable
     
     def esta_conectado(self) -> bool:
         """Verifica si está conectado a una balanza"""
         return self._connected and self.ser and self.ser.is_open
     
+    def esta_obsoleta(self) -> bool:
+        """True si el puerto se cayó y la última lectura no se renovó desde entonces"""
+        return self._caida_desde is not None
+    
     def get_status(self) -> Dict[str, Any]:
         """Devuelve el estado actual de la conexión"""
+        publicacion = self._publicacion
+        conectado = self._connected
+        estable = publicacion.peso_estable if conectado and not self.esta_obsoleta() else None
         return {
-            "conectado": self._connected,
+            "conectado": conectado,
             "balanza_actual": self._balanza_actual,
             "balanza_selected_json": self.get_balanza_selected(),
-            "peso_actual": self.leer_peso(),
-            "ultimo_dato": self._last_data_time.strftime("%H:%M:%S") if self._last_data_time else None,
-            "hilo_activo": self._reading_thread and self._reading_thread.is_alive() if hasattr(self, '_reading_thread') else False
+            "peso_actual": publicacion.peso if conectado else None,
+            "peso_estable": estable.peso if estable else None,
+            "secuencia": publicacion.secuencia,
+            "ultimo_dato": time.strftime("%H:%M:%S", time.localtime(publicacion.fecha)) if publicacion.fecha else None,
+            "hilo_activo": bool(self._reading_thread and self._reading_thread.is_alive()),
+            "obsoleta": self.esta_obsoleta(),
+            "broker": self._broker,
+            "metricas": self.metricas()
         }
     
+    def metricas(self) -> Dict[str, Any]:
+        """Instantánea de las métricas de adquisición (ver MetricasLectura)"""
+        datos = self._metricas.instantanea()
+        armador = self._armador
+        datos["resincronizaciones"] = armador.resincronizaciones
+        datos["bytes_descartados"] = armador.bytes_descartados
+        datos["comandos"] = self._comandos.instantanea()
+        return datos
+    
+    def comandos_disponibles(self) -> List[str]:
+        """Nombres de los comandos que acepta el indicador de la balanza conectada"""
+        return self._comandos.disponibles()
+    
+    def enviar_comando(self, nombre: str) -> Optional[Future]:
+        """Envía un comando al indicador ('cero', 'tara', 'imprimir'...) sin detener la lectura.
+        
+        Devuelve un Future con la RespuestaComando (y su tiempo de ida y vuelta);
+        falla con ComandoVencido si el indicador no responde a tiempo. None si
+        no se pudo enviar.
+        """
+        ser = self.ser
+        if not self._connected or ser is None or not ser.is_open:
+            logger.error("No se puede enviar '%s': la balanza no está conectada", nombre)
+            return None
+        if self._broker:
+            logger.error("No se puede enviar '%s': la balanza llega por el broker %s", nombre, self._broker)
+            return None
+        if nombre not in self._comandos.comandos:
+            logger.error("Comando desconocido '%s'. Disponibles: %s", nombre,
+                         ", ".join(self.comandos_disponibles()))
+            return None
+        try:
+            return self._comandos.enviar(nombre, ser.write)
+        except (serial.SerialException, OSError) as e:
+            logger.error("Error al enviar '%s' a la balanza %s: %s", nombre, self._balanza_actual, e)
+            return None
+    
     def reiniciar_conexion(self):
         """Reinicia la conexión actual (útil en caso de error)"""
         if self._balanza_actual:
             balanza_key = self._balanza_actual
-            print("🔄 Reiniciando conexión...")
+            logger.info("Reiniciando conexión")
             self._desconectar_internal()
             time.sleep(1)
             return self.conectar(balanza_key)
         return False
 
+class GestorBalanzas:
+    """Mantiene conectadas varias balanzas de la configuración a la vez.
+    
+    Cada balanza tiene su BalanzaReader con su propio puerto e hilo de
+    lectura, así que cambiar la balanza activa no cierra ni reabre puertos.
+    Los suscriptores reciben sólo los cambios de la balanza activa.
+    """
+    
+    def __init__(self, config_path: str = "configuracion.json"):
+        self.config_path = config_path
+        # El primer lector carga el JSON y el resto comparte su configuración
+        self._configuracion = BalanzaReader(config_path)
+        self.config = self._configuracion.config
+        self._lectores: Dict[str, BalanzaReader] = {}
+        self._activa: Optional[str] = None
+        self._lock = threading.Lock()
+        self._suscriptores: List[Callable[[Lectura, Optional[PesoEstable]], None]] = []
+        self._volcador: Optional[VolcadorMetricas] = None
+        
+        for balanza_key, balanza_config in self.config["balanzas"].items():
+            if balanza_config.get("adquisicion") == "subproceso":
+                # Importado acá porque balanza.subproceso importa este módulo
+                from balanza.subproceso import LectorSubproceso
+                lector = LectorSubproceso(config_path, self.config)
+            elif any(l is self._configuracion for l in self._lectores.values()):
+                lector = BalanzaReader(config_path, self.config)
+            else:
+                lector = self._configuracion
+            lector.suscribir(self._crear_reenvio(balanza_key))
+            self._lectores[balanza_key] = lector
+    
+    def _crear_reenvio(self, balanza_key: str) -> Callable[[Lectura, Optional[PesoEstable]], None]:
+        """Crea el suscriptor que reenvía los cambios de una balanza si es la activa"""
+        def reenviar(lectura: Lectura, estable: Optional[PesoEstable]):
+            if self._activa == balanza_key:
+                self._notificar(lectura, estable)
+        return reenviar
+    
+    def _notificar(self, lectura: Lectura, estable: Optional[PesoEstable]):
+        """Llama a los suscriptores del gestor"""
+        for callback in self._suscriptores:
+            try:
+                callback(lectura, estable)
+            except Exception as e:
+                logger.exception("Error en suscriptor de peso")
+    
+    @property
+    def balanza_activa(self) -> Optional[str]:
+        return self._activa
+    
+    def lector(self, balanza_key: Optional[str] = None) -> Optional[BalanzaReader]:
+        """Devuelve el lector de la balanza indicada (por defecto, la activa)"""
+        return self._lectores.get(balanza_key or self._activa)
+    
+    def get_balanza_selected(self) -> str:
+        """Obtiene la balanza seleccionada desde el JSON"""
+        return self._configuracion.get_balanza_selected()
+    
+    def set_balanza_selected(self, balanza_key: str) -> bool:
+        """Establece la balanza seleccionada y la guarda en el JSON"""
+        return self._configuracion.set_balanza_selected(balanza_key)
+    
+    def get_balanzas_disponibles(self) -> Dict[str, str]:
+        """Devuelve un diccionario con las balanzas disponibles {key: nombre}"""
+        return self._configuracion.get_balanzas_disponibles()
+    
+    def conectar(self, balanza_key: str) -> bool:
+        """Conecta una balanza sin tocar las demás"""
+        lector = self._lectores.get(balanza_key)
+        if lector is None:
+            logger.error("Balanza '%s' no encontrada en la configuración", balanza_key)
+            return False
+        return lector.conectar(balanza_key)
+    
+    def conectar_todas(self) -> Dict[str, bool]:
+        """Conecta en paralelo todas las balanzas configuradas y devuelve {key: conectada}"""
+        resultados = {}
+        
+        def conectar(balanza_key):
+            resultados[balanza_key] = self.conectar(balanza_key)
+        
+        hilos = [threading.Thread(target=conectar, args=(key,), daemon=True) for key in self._lectores]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados
+    
+    def activar(self, balanza_key: str) -> bool:
+        """Cambia la balanza activa; si todavía no está conectada, la conecta.
+        
+        Si la balanza ya tiene una lectura, se envía enseguida a los
+        suscriptores (desde el hilo que llama) para no esperar el próximo cambio.
+        """
+        lector = self._lectores.get(balanza_key)
+        if lector is None:
+            logger.error("Balanza '%s' no encontrada en la configuración", balanza_key)
+            return False
+        
+        with self._lock:
+            if not lector.esta_conectado() and not lector.conectar(balanza_key):
+                return False
+            self._activa = balanza_key
+        
+        logger.info("Balanza activa: %s", self.config['balanzas'][balanza_key]['nombre'],
+                    extra={"balanza": balanza_key})
+        lectura = lector.leer_lectura()
+        if lectura is not None:
+            self._notificar(lectura, lector.leer_peso_estable())
+        return True
+    
+    def leer_peso(self, balanza_key: Optional[str] = None) -> Optional[float]:
+        """Lee el peso actual de una balanza (por defecto, la activa)"""
+        lector = self.lector(balanza_key)
+        return lector.leer_peso() if lector else None
+    
+    def leer_lectura(self, balanza_key: Optional[str] = None) -> Optional[Lectura]:
+        """Lee la última lectura completa de una balanza (por defecto, la activa)"""
+        lector = self.lector(balanza_key)
+        return lector.leer_lectura() if lector else None
+    
+    def leer_peso_estable(self, balanza_key: Optional[str] = None) -> Optional[PesoEstable]:
+        """Devuelve el peso estable de una balanza (por defecto, la activa)"""
+        lector = self.lector(balanza_key)
+        return lector.leer_peso_estable() if lector else None
+    
+    def leer_publicacion(self, balanza_key: Optional[str] = None) -> Publicacion:
+        """Devuelve la última publicación de una balanza (por defecto, la activa), sin locks"""
+        lector = self.lector(balanza_key)
+        return lector.leer_publicacion() if lector else SIN_DATOS
+    
+    def lecturas(self) -> Dict[str, Dict[str, Any]]:
+        """Devuelve la última lectura y el peso estable de cada balanza conectada"""
+        return {
+            key: {"lectura": lector.leer_lectura(), "peso_estable": lector.leer_peso_estable()}
+            for key, lector in self._lectores.items() if lector.esta_conectado()
+        }
+    
+    def suscribir(self, callback: Callable[[Lectura, Optional[PesoEstable]], None]):
+        """Registra una función que recibe (lectura, peso_estable) cuando cambia el peso de la balanza activa"""
+        with self._lock:
+            if callback not in self._suscriptores:
+                self._suscriptores = self._suscriptores + [callback]
+    
+    def desuscribir(self, callback: Callable[[Lectura, Optional[PesoEstable]], None]):
+        """Quita una función registrada con suscribir()"""
+        with self._lock:
+            self._suscriptores = [c for c in self._suscriptores if c != callback]
+    
+    def metricas(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas de adquisición de cada balanza conectada"""
+        return {key: lector.metricas() for key, lector in self._lectores.items() if lector.esta_conectado()}
+    
+    def iniciar_volcado_metricas(self) -> bool:
+        """Vuelca las métricas periódicamente si la configuración tiene 'metricas': {'archivo', 'intervalo'}"""
+        config = self.config.get("metricas") or {}
+        if not config.get("archivo") or self._volcador is not None:
+            return False
+        self._volcador = VolcadorMetricas(self.metricas, config["archivo"], config.get("intervalo", 60))
+        self._volcador.iniciar()
+        return True
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Devuelve el estado de la balanza activa y un resumen de todas"""
+        lector = self.lector()
+        if lector is not None:
+            status = lector.get_status()
+        else:
+            status = {"conectado": False, "balanza_actual": None,
+                      "balanza_selected_json": self.get_balanza_selected()}
+        status["balanza_activa"] = self._activa
+        status["balanzas"] = {
+            key: {"conectado": bool(lector.esta_conectado()), "peso_actual": lector.leer_peso(),
+                  "obsoleta": lector.esta_obsoleta()}
+            for key, lector in self._lectores.items()
+        }
+        return status
+    
+    def desconectar_todas(self):
+        """Desconecta todas las balanzas"""
+        if self._volcador is not None:
+            self._volcador.detener()
+            self._volcador = None
+        for lector in self._lectores.values():
+            lector.desconectar()
+        self._activa = None
+
 # Funciones globales para facilitar el uso
-_reader_instance = None
+_gestor: Optional[GestorBalanzas] = None
+
+def _obtener_gestor(config_path: str = "configuracion.json") -> GestorBalanzas:
+    """Devuelve el gestor de balanzas del proceso, creándolo la primera vez"""
+    global _gestor
+    if _gestor is None:
+        _gestor = GestorBalanzas(config_path)
+    return _gestor
 
 def inicializar_balanza(balanza_key: Optional[str] = None, config_path: str = "configuracion.json") -> bool:
     """
-    Inicializa la conexión con la balanza
+    Conecta una balanza y la deja como activa (las demás balanzas conectadas siguen leyendo)
     
     Args:
         balanza_key: Clave de la balanza a usar. Si es None, usa la del JSON (balanza_selected)
@@ -351,78 +1089,141 @@ def inicializar_balanza(balanza_key: Optional[str] = None, config_path: str = "c
     Returns:
         bool: True si se conectó exitosamente
     """
-    global _reader_instance
-    _reader_instance = BalanzaReader(config_path)
-    return _reader_instance.conectar(balanza_key)
+    gestor = _obtener_gestor(config_path)
+    if balanza_key is None:
+        balanza_key = gestor.get_balanza_selected()
+    gestor.iniciar_volcado_metricas()
+    return gestor.activar(balanza_key)
 
 def inicializar_balanza_selected(config_path: str = "configuracion.json") -> bool:
     """Inicializa usando directamente la balanza seleccionada en el JSON"""
     return inicializar_balanza(None, config_path)
 
+def inicializar_balanzas(config_path: str = "configuracion.json") -> bool:
+    """
+    Conecta todas las balanzas configuradas y activa la seleccionada en el JSON
+    
+    Returns:
+        bool: True si la balanza seleccionada quedó conectada
+    """
+    gestor = _obtener_gestor(config_path)
+    for balanza_key, conectada in gestor.conectar_todas().items():
+        if not conectada:
+            logger.warning("No se pudo conectar %s", balanza_key)
+    gestor.iniciar_volcado_metricas()
+    return gestor.activar(gestor.get_balanza_selected())
+
+def activar_balanza(balanza_key: str) -> bool:
+    """Cambia la balanza activa sin reconectar las que ya están conectadas"""
+    return _obtener_gestor().activar(balanza_key)
+
 def cambiar_balanza_selected(balanza_key: str) -> bool:
     """Cambia la balanza seleccionada y la guarda en el JSON"""
-    global _reader_instance
-    if _reader_instance is None:
-        _reader_instance = BalanzaReader()
+    gestor = _obtener_gestor()
     
     # Cambiar la selección en el JSON
-    if _reader_instance.set_balanza_selected(balanza_key):
-        # Si ya está conectado, cambiar a la nueva balanza
-        if _reader_instance.esta_conectado():
-            return _reader_instance.conectar(balanza_key)
+    if gestor.set_balanza_selected(balanza_key):
+        # Si ya hay una balanza activa, pasar a la nueva
+        if gestor.balanza_activa is not None:
+            return gestor.activar(balanza_key)
         return True
     return False
 
-def obtener_peso() -> Optional[float]:
-    """Obtiene el peso actual (función simple para usar desde cualquier parte)"""
-    global _reader_instance
-    if _reader_instance is None:
-        print("⚠ Balanza no inicializada. Llama a inicializar_balanza() primero.")
+def obtener_peso(balanza_key: Optional[str] = None) -> Optional[float]:
+    """Obtiene el peso actual de la balanza activa o de la indicada"""
+    if _gestor is None:
+        logger.warning("Balanza no inicializada. Llama a inicializar_balanza() primero.")
         return None
-    return _reader_instance.leer_peso()
+    return _gestor.leer_peso(balanza_key)
+
+def obtener_publicacion(balanza_key: Optional[str] = None) -> Publicacion:
+    """Obtiene la última lectura publicada (peso, estable, secuencia, tiempo) sin tomar locks"""
+    if _gestor is None:
+        return SIN_DATOS
+    return _gestor.leer_publicacion(balanza_key)
+
+def obtener_lecturas() -> Dict[str, Dict[str, Any]]:
+    """Obtiene la última lectura y el peso estable de cada balanza conectada"""
+    if _gestor is None:
+        return {}
+    return _gestor.lecturas()
+
+def obtener_metricas() -> Dict[str, Dict[str, Any]]:
+    """Obtiene las métricas de adquisición de cada balanza conectada"""
+    if _gestor is None:
+        return {}
+    return _gestor.metricas()
+
+def suscribir_peso(callback: Callable[[Lectura, Optional[PesoEstable]], None]) -> bool:
+    """Registra una función que se llama cada vez que cambia el peso de la balanza activa"""
+    if _gestor is None:
+        logger.warning("Balanza no inicializada. Llama a inicializar_balanza() primero.")
+        return False
+    _gestor.suscribir(callback)
+    return True
+
+def desuscribir_peso(callback: Callable[[Lectura, Optional[PesoEstable]], None]):
+    """Quita una función registrada con suscribir_peso()"""
+    if _gestor is not None:
+        _gestor.desuscribir(callback)
 
 def get_status_balanza() -> Dict[str, Any]:
     """Obtiene el estado de la balanza"""
-    global _reader_instance
-    if _reader_instance is None:
+    if _gestor is None:
         return {"error": "Balanza no inicializada"}
-    return _reader_instance.get_status()
+    return _gestor.get_status()
 
 def get_balanzas_disponibles() -> Dict[str, str]:
     """Obtiene las balanzas disponibles"""
-    global _reader_instance
-    if _reader_instance is None:
-        _reader_instance = BalanzaReader()
-    return _reader_instance.get_balanzas_disponibles()
+    return _obtener_gestor().get_balanzas_disponibles()
 
 def get_balanza_selected() -> str:
     """Obtiene la balanza actualmente seleccionada en el JSON"""
-    global _reader_instance
-    if _reader_instance is None:
-        _reader_instance = BalanzaReader()
-    return _reader_instance.get_balanza_selected()
+    return _obtener_gestor().get_balanza_selected()
+
+def iniciar_captura_balanza(ruta: str, balanza_key: Optional[str] = None) -> bool:
+    """Empieza a guardar los bytes crudos de la balanza activa (o de la indicada)"""
+    lector = _gestor.lector(balanza_key) if _gestor else None
+    if lector is None:
+        logger.warning("Balanza no inicializada. Llama a inicializar_balanza() primero.")
+        return False
+    return lector.iniciar_captura(ruta)
+
+def detener_captura_balanza(balanza_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Cierra la captura en curso de la balanza activa (o de la indicada)"""
+    lector = _gestor.lector(balanza_key) if _gestor else None
+    return lector.detener_captura() if lector else None
+
+def enviar_comando_balanza(nombre: str, balanza_key: Optional[str] = None) -> Optional[Future]:
+    """Envía un comando ('cero', 'tara', 'imprimir'...) al indicador de la balanza activa (o de la indicada)"""
+    lector = _gestor.lector(balanza_key) if _gestor else None
+    if lector is None:
+        logger.warning("Balanza no inicializada. Llama a inicializar_balanza() primero.")
+        return None
+    return lector.enviar_comando(nombre)
 
 def cerrar_balanza():
-    """Cierra la conexión con la balanza"""
-    global _reader_instance
-    if _reader_instance:
-        _reader_instance.desconectar()
+    """Cierra la conexión con todas las balanzas"""
+    if _gestor:
+        _gestor.desconectar_todas()
 
 # Para pruebas directas
 if __name__ == "__main__":
-    print("=== Test de Balanza con Selección JSON ===")
+    from funciones.registro import configurar_registro
+    configurar_registro()
+    logger.info("=== Test de Balanza con Selección JSON ===")
     
     # Mostrar balanzas disponibles
     balanzas = get_balanzas_disponibles()
-    print(f"📋 Balanzas disponibles: {balanzas}")
+    logger.info("Balanzas disponibles: %s", balanzas)
     
     # Mostrar balanza seleccionada
     selected = get_balanza_selected()
-    print(f"🎯 Balanza seleccionada en JSON: {selected}")
+    logger.info("Balanza seleccionada en JSON: %s", selected)
     
     # Inicializar usando la balanza seleccionada
     if inicializar_balanza_selected():
-        print("✓ Balanza inicializada correctamente")
+        logger.info("Balanza inicializada correctamente")
         
         try:
             # Loop principal
@@ -435,19 +1236,19 @@ if __name__ == "__main__":
                 
                 # Mostrar peso solo si cambió
                 if peso != peso_anterior and peso is not None:
-                    print(f"📊 Peso: {peso} kg")
+                    logger.info("Peso: %s kg", peso)
                     peso_anterior = peso
                 
                 # Mostrar status cada 10 iteraciones
                 contador += 1
                 if contador % 20 == 0:
-                    print(f"📈 Status: {status}")
+                    logger.info("Status: %s", status)
                 
                 time.sleep(0.5)
                 
         except KeyboardInterrupt:
-            print("\n🛑 Finalizando...")
+            logger.info("Finalizando...")
         finally:
             cerrar_balanza()
     else:
-        print("✗ No se pudo inicializar la balanza")
\ No newline at end of file
+        logger.error("No se pudo inicializar la balanza")
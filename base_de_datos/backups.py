@@ -0,0 +1,281 @@
+"""
+Backups automáticos de la base de datos en segundo plano.
+
+Se copian con la API de backup de SQLite, de a ``backup_paginas_por_paso``
+páginas, así que el resultado es siempre una base consistente aunque otra
+conexión esté guardando un ticket, y quien escribe sólo espera lo que tarda
+un paso. Corren en un hilo propio al iniciar, cada ``backup_intervalo_min``
+minutos y cada ``backup_cada_tickets`` tickets guardados.
+
+Un backup se omite si nada cambió: primero se compara ``PRAGMA
+data_version`` de la conexión del gestor con la del backup anterior y, si
+cambió o es el primero del proceso, el resumen SHA-256 de la copia con el del
+último archivo (va en el nombre: ``<base>_backup_<fecha>_<resumen>.db``).
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LARGO_RESUMEN = 12
+_BLOQUE_LECTURA = 1024 * 1024
+
+# Un temporal se borra al iniciar si es de este equipo y no se modificó en
+# TEMPORAL_PROPIO_S, o de otro equipo y no se modificó en TEMPORAL_AJENO_S.
+# Mientras se copia o se comprime, el archivo se modifica sin pausas largas.
+TEMPORAL_PROPIO_S = 10 * 60
+TEMPORAL_AJENO_S = 24 * 3600
+
+# Nombre del equipo apto para un nombre de archivo; va en los temporales
+# porque la carpeta de backups puede ser compartida por varias PCs
+EQUIPO = re.sub(r"[^A-Za-z0-9-]", "-", socket.gethostname()) or "equipo"
+
+
+class GestorBackups:
+    """Hace backups de una base de datos SQLite desde un hilo propio"""
+
+    def __init__(self, ruta_db: str, carpeta: str = "backups", intervalo_min: float = 30,
+                 cada_tickets: int = 10, conservar: int = 5, conservar_dias: int = 0,
+                 comprimir: bool = False, paginas_por_paso: int = 256, pausa_entre_pasos: float = 0.005):
+        self.ruta_db = ruta_db
+        if not os.path.isabs(carpeta):
+            carpeta = os.path.join(os.path.dirname(os.path.abspath(ruta_db)), carpeta)
+        self.carpeta = carpeta
+        self.intervalo = intervalo_min * 60
+        self.cada_tickets = cada_tickets
+        self.conservar = max(conservar, 1)
+        self.conservar_dias = conservar_dias
+        self.comprimir = comprimir
+        self.paginas_por_paso = paginas_por_paso
+        self.pausa_entre_pasos = pausa_entre_pasos
+        self.nombre_base = os.path.splitext(os.path.basename(ruta_db))[0]
+        self._patron = re.compile(re.escape(self.nombre_base) +
+                                  r"_backup_(\d{8}_\d{6})(?:_([0-9a-f]+))?\.db(?:\.gz)?$")
+
+        self.ultimo: Optional[str] = None   # Ruta del último backup hecho u omitido por igual
+        self.realizados = 0
+        self.omitidos = 0
+        self._version: Optional[int] = None
+        self._fuente: Optional[sqlite3.Connection] = None
+        self._guardados = 0
+        self._lock = threading.Lock()
+        self._lock_respaldo = threading.Lock()  # respaldar() también se puede llamar desde otro hilo
+        self._pedido = threading.Event()
+        self._detenido = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    @classmethod
+    def desde_config(cls, ruta_db: str, config_bd: Dict[str, Any]) -> "GestorBackups":
+        return cls(ruta_db,
+                   carpeta=config_bd.get('carpeta_backup', 'backups'),
+                   intervalo_min=config_bd.get('backup_intervalo_min', 30),
+                   cada_tickets=config_bd.get('backup_cada_tickets', 10),
+                   conservar=config_bd.get('backup_conservar', 5),
+                   conservar_dias=config_bd.get('backup_conservar_dias', 0),
+                   comprimir=config_bd.get('backup_comprimir', False),
+                   paginas_por_paso=config_bd.get('backup_paginas_por_paso', 256))
+
+    def iniciar(self):
+        """Arranca el hilo; el primer backup se hace enseguida"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detenido.clear()
+        self._pedido.set()
+        self._hilo = threading.Thread(target=self._ciclo, name=f"backups-{self.nombre_base}", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 30.0):
+        self._detenido.set()
+        self._pedido.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    def solicitar(self):
+        """Pide un backup fuera de horario (sigue omitiéndose si nada cambió)"""
+        self._pedido.set()
+
+    def ticket_guardado(self):
+        """Cuenta un ticket guardado y pide un backup cada ``cada_tickets``"""
+        if self.cada_tickets <= 0:
+            return
+        with self._lock:
+            self._guardados += 1
+            if self._guardados < self.cada_tickets:
+                return
+            self._guardados = 0
+        self._pedido.set()
+
+    def _ciclo(self):
+        self._limpiar_temporales()
+        try:
+            while True:
+                self._pedido.wait(self.intervalo)
+                self._pedido.clear()
+                if self._detenido.is_set():
+                    return
+                try:
+                    self.respaldar()
+                except Exception as e:
+                    logger.warning("Error creando backup: %s", e)
+                    self._cerrar_fuente()
+        finally:
+            self._cerrar_fuente()
+
+    def _conexion_fuente(self) -> sqlite3.Connection:
+        # Conexión propia del gestor: data_version sólo cambia por escrituras de otras conexiones
+        if self._fuente is None:
+            self._fuente = sqlite3.connect(self.ruta_db, timeout=30, check_same_thread=False)
+        return self._fuente
+
+    def _cerrar_fuente(self):
+        with self._lock_respaldo:
+            if self._fuente is None:
+                return
+            self._fuente.close()
+            self._fuente = None
+            self._version = None
+
+    def respaldar(self, forzar: bool = False) -> Optional[str]:
+        """Hace un backup ahora; devuelve su ruta o None si se omitió"""
+        if not os.path.exists(self.ruta_db):
+            return None
+        with self._lock_respaldo:
+            return self._respaldar(forzar)
+
+    def _respaldar(self, forzar: bool) -> Optional[str]:
+        fuente = self._conexion_fuente()
+        version = fuente.execute("PRAGMA data_version").fetchone()[0]
+        if not forzar and version == self._version:
+            self.omitidos += 1
+            logger.debug("Backup omitido: la base no cambió desde %s", self.ultimo)
+            return None
+
+        os.makedirs(self.carpeta, exist_ok=True)
+        inicio = time.perf_counter()
+        # Nombre único: otra PC o proceso puede estar haciendo su backup en la misma carpeta
+        temporal_base = os.path.join(self.carpeta, f"{self.nombre_base}_backup_{EQUIPO}_{os.getpid()}_"
+                                                   f"{uuid.uuid4().hex[:8]}")
+        temporal = temporal_base + ".tmp"
+        destino = sqlite3.connect(temporal)
+        try:
+            fuente.backup(destino, pages=self.paginas_por_paso, progress=self._pausar)
+        finally:
+            destino.close()
+
+        resumen = self._resumen(temporal)[:LARGO_RESUMEN]
+        anterior = self._listar()
+        if not forzar and anterior and anterior[0][2] == resumen:
+            os.remove(temporal)
+            self._version = version
+            self.ultimo = anterior[0][0]
+            self.omitidos += 1
+            logger.info("Backup omitido: igual a %s", os.path.basename(self.ultimo))
+            return None
+
+        nombre = f"{self.nombre_base}_backup_{datetime.now():%Y%m%d_%H%M%S}_{resumen}.db"
+        ruta = os.path.join(self.carpeta, nombre)
+        if self.comprimir:
+            ruta += ".gz"
+            comprimido_tmp = temporal_base + ".gz.tmp"
+            with open(temporal, 'rb') as origen, gzip.open(comprimido_tmp, 'wb', compresslevel=6) as comprimido:
+                shutil.copyfileobj(origen, comprimido, _BLOQUE_LECTURA)
+            os.replace(comprimido_tmp, ruta)
+            os.remove(temporal)
+        else:
+            os.replace(temporal, ruta)
+
+        self._version = version
+        self.ultimo = ruta
+        self.realizados += 1
+        logger.info("Backup creado: %s (%.2f MB en %.1f s)", ruta, os.path.getsize(ruta) / (1024 * 1024),
+                    time.perf_counter() - inicio)
+        self._limpiar()
+        return ruta
+
+    def _pausar(self, estado, restantes, total):
+        # Entre pasos se sueltan los locks de lectura; la pausa deja pasar a quien quiera escribir
+        if restantes:
+            time.sleep(self.pausa_entre_pasos)
+
+    @staticmethod
+    def _resumen(ruta: str) -> str:
+        resumen = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(_BLOQUE_LECTURA), b""):
+                resumen.update(bloque)
+        return resumen.hexdigest()
+
+    def _listar(self) -> List[Tuple[str, datetime, Optional[str]]]:
+        """Backups de esta base (ruta, fecha, resumen), del más nuevo al más viejo"""
+        backups = []
+        if not os.path.isdir(self.carpeta):
+            return backups
+        for archivo in os.listdir(self.carpeta):
+            coincidencia = self._patron.match(archivo)
+            if coincidencia:
+                fecha = datetime.strptime(coincidencia.group(1), "%Y%m%d_%H%M%S")
+                backups.append((os.path.join(self.carpeta, archivo), fecha, coincidencia.group(2)))
+        backups.sort(key=lambda b: b[1], reverse=True)
+        return backups
+
+    def _limpiar(self):
+        """Conserva los últimos ``conservar`` y el más nuevo de cada uno de los últimos ``conservar_dias`` días"""
+        backups = self._listar()
+        desde = (datetime.now() - timedelta(days=self.conservar_dias)).date()
+        dias = set()
+        for posicion, (ruta, fecha, _) in enumerate(backups):
+            dia = fecha.date()
+            if posicion < self.conservar or (dia > desde and dia not in dias):
+                dias.add(dia)
+                continue
+            try:
+                os.remove(ruta)
+                logger.info("Backup antiguo eliminado: %s", os.path.basename(ruta))
+            except OSError as e:
+                logger.warning("Error eliminando backup %s: %s", ruta, e)
+
+    def _limpiar_temporales(self):
+        """Borra restos de backups interrumpidos; nunca uno que otro equipo esté escribiendo"""
+        if not os.path.isdir(self.carpeta):
+            return
+        propios = f"{self.nombre_base}_backup_{EQUIPO}_"
+        ahora = time.time()
+        for archivo in os.listdir(self.carpeta):
+            if not (archivo.startswith(f"{self.nombre_base}_backup") and archivo.endswith(".tmp")):
+                continue
+            ruta = os.path.join(self.carpeta, archivo)
+            limite = TEMPORAL_PROPIO_S if archivo.startswith(propios) else TEMPORAL_AJENO_S
+            try:
+                if ahora - os.path.getmtime(ruta) > limite:
+                    os.remove(ruta)
+                    logger.info("Temporal de backup abandonado eliminado: %s", archivo)
+            except OSError:
+                pass
+
+
+# Un gestor por archivo de base de datos en el proceso
+_gestores: Dict[str, GestorBackups] = {}
+_lock_gestores = threading.Lock()
+
+def iniciar_backups(ruta_db: str, config_bd: Dict[str, Any]) -> GestorBackups:
+    """Devuelve el gestor de backups de la base, creándolo e iniciándolo la primera vez"""
+    clave = os.path.abspath(ruta_db)
+    with _lock_gestores:
+        gestor = _gestores.get(clave)
+        if gestor is None:
+            gestor = _gestores[clave] = GestorBackups.desde_config(ruta_db, config_bd)
+            gestor.iniciar()
+    return gestor
@@ -1,15 +1,131 @@
+import logging
 import sqlite3
 import os
-import shutil
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional, Tuple
-from base_de_datos.modelos_bd import Ticket, Fardo
-from base_de_datos.configuracion import ConfiguracionManager
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+from base_de_datos.modelos_bd import RINDE_SQL, TARA_POR_FARDO_ANTERIOR, Ticket, Fardo
+from base_de_datos.backups import GestorBackups, iniciar_backups
+from base_de_datos.configuracion import ConfiguracionManager, config_manager
+
+logger = logging.getLogger(__name__)
+
+# Sentencias preparadas que cada conexión guarda para reutilizar
+SENTENCIAS_EN_CACHE = 64
+
+# Modos de concurrencia: 'wal' para disco local, 'cola' (journal clásico y un
+# solo hilo escritor por proceso) para bases en un recurso de red
+MODOS_CONCURRENCIA = ('auto', 'wal', 'cola')
+
+# Resumen de los fardos guardado en cada ticket; lo mantienen los triggers de
+# _triggers_resumen, así el historial no recorre la tabla de fardos
+COLUMNAS_RESUMEN = {
+    'cantidad_fardos': 'INTEGER NOT NULL DEFAULT 0',
+    'peso_total': 'REAL NOT NULL DEFAULT 0',
+    'peso_minimo': 'REAL',
+    'peso_maximo': 'REAL',
+    'rinde': 'REAL',  # NULL sin kg brutos de romaneo
+}
+
+# Recalcula el resumen de un ticket desde sus fardos (por idx_fardos_ticket)
+_RECALCULAR_RESUMEN = """
+        UPDATE tickets SET (cantidad_fardos, peso_total, peso_minimo, peso_maximo) =
+            (SELECT COUNT(*), COALESCE(SUM(peso), 0), MIN(peso), MAX(peso) FROM fardos WHERE ticket_id = {id})
+        WHERE id = {id};"""
+
+
+def _triggers_resumen() -> dict:
+    """Triggers {nombre: sql} que mantienen COLUMNAS_RESUMEN al cambiar los fardos"""
+    # La tara es la guardada en cada ticket, no la de la configuración de quien escribe
+    rinde = RINDE_SQL
+    return {
+        # Al agregar un fardo alcanza con sumarlo; al borrar o cambiar, se recalcula el ticket
+        'trg_fardos_insertar': """CREATE TRIGGER trg_fardos_insertar AFTER INSERT ON fardos BEGIN
+        UPDATE tickets SET cantidad_fardos = cantidad_fardos + 1,
+            peso_total = peso_total + NEW.peso,
+            peso_minimo = CASE WHEN peso_minimo IS NULL OR NEW.peso < peso_minimo THEN NEW.peso ELSE peso_minimo END,
+            peso_maximo = CASE WHEN peso_maximo IS NULL OR NEW.peso > peso_maximo THEN NEW.peso ELSE peso_maximo END
+        WHERE id = NEW.ticket_id;
+    END""",
+        'trg_fardos_eliminar': "CREATE TRIGGER trg_fardos_eliminar AFTER DELETE ON fardos BEGIN"
+                               + _RECALCULAR_RESUMEN.format(id='OLD.ticket_id') + "\n    END",
+        'trg_fardos_modificar': "CREATE TRIGGER trg_fardos_modificar AFTER UPDATE OF peso, ticket_id ON fardos BEGIN"
+                                + _RECALCULAR_RESUMEN.format(id='OLD.ticket_id')
+                                + _RECALCULAR_RESUMEN.format(id='NEW.ticket_id') + "\n    END",
+        'trg_tickets_rinde_insertar': f"""CREATE TRIGGER trg_tickets_rinde_insertar AFTER INSERT ON tickets BEGIN
+        UPDATE tickets SET rinde = {rinde} WHERE id = NEW.id;
+    END""",
+        'trg_tickets_rinde': f"""CREATE TRIGGER trg_tickets_rinde
+    AFTER UPDATE OF cantidad_fardos, peso_total, kg_bruto_romaneo, agregado, resto, tara_por_fardo ON tickets BEGIN
+        UPDATE tickets SET rinde = {rinde} WHERE id = NEW.id;
+    END""",
+    }
+
+# Sistemas de archivos de red en /proc/mounts (Linux)
+_SISTEMAS_DE_RED = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ncpfs', 'afs', '9p', 'fuse.sshfs'}
+_UNIDAD_DE_RED = 4  # DRIVE_REMOTE de GetDriveTypeW
+
+
+def es_ruta_de_red(ruta: str) -> bool:
+    """True si el archivo está en un recurso de red (UNC, unidad mapeada, NFS/CIFS)"""
+    ruta = os.path.abspath(ruta)
+    if ruta.startswith('\\\\') or ruta.startswith('//'):
+        return True
+    if os.name == 'nt':
+        unidad = os.path.splitdrive(ruta)[0]
+        if not unidad:
+            return False
+        import ctypes
+        return ctypes.windll.kernel32.GetDriveTypeW(unidad + '\\') == _UNIDAD_DE_RED
+    try:
+        with open('/proc/mounts', encoding='utf-8') as f:
+            montajes = [campos[1:3] for campos in map(str.split, f) if len(campos) > 2]
+    except OSError:
+        return False
+    # El punto de montaje más largo que contiene la ruta
+    tipo, largo = None, -1
+    for punto, sistema in montajes:
+        punto = punto.replace('\\040', ' ')
+        if (ruta == punto or ruta.startswith(punto.rstrip('/') + '/')) and len(punto) > largo:
+            tipo, largo = sistema, len(punto)
+    return tipo in _SISTEMAS_DE_RED
+
+
+def _esta_bloqueada(error: sqlite3.OperationalError) -> bool:
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+def _valor_bd(valor):
+    """Valor como lo devuelve SQLite, para comparar con lo guardado (fechas como texto ISO)"""
+    return valor.isoformat(' ') if isinstance(valor, datetime) else valor
+
+
+class CambiosFardos(NamedTuple):
+    """Filas de fardos que escribió un guardado"""
+    insertados: int
+    actualizados: int
+    eliminados: int
+
+    @property
+    def total(self) -> int:
+        return self.insertados + self.actualizados + self.eliminados
+
 
 class BaseDatos:
     """Clase para manejar la base de datos SQLite con configuración flexible"""
     
     def __init__(self, config_manager: ConfiguracionManager = None):
+        inicio = time.perf_counter()
+        # Una conexión por hilo: sqlite3 no permite compartirlas entre hilos
+        self._local = threading.local()
+        self._cola: Optional[ThreadPoolExecutor] = None
+        self.modo_concurrencia = 'cola'
+        self.reintentos_escritura = 0
+        self.ultimos_cambios: Optional[CambiosFardos] = None  # Filas de fardos del último guardado
         self.config_manager = config_manager or ConfiguracionManager()
         # Obtener toda la configuración y luego extraer la sección base_datos
         config_completa = self.config_manager.obtener_configuracion()
@@ -18,13 +134,138 @@ class BaseDatos:
         # Determinar la ruta de la base de datos
         self.ruta_db = self._determinar_ruta_bd()
         
-        print(f"📁 Base de datos configurada en: {self.ruta_db}")
+        logger.info("Base de datos configurada en: %s", self.ruta_db)
+        
+        self.inicializar_db()
         
-        # Crear backup si está habilitado
+        # Backups en segundo plano, uno por archivo en todo el proceso
+        self._backups: Optional[GestorBackups] = None
         if self.config_bd.get('backup_automatico', True):
-            self._crear_backup_si_necesario()
+            self._backups = iniciar_backups(self.ruta_db, self.config_bd)
+        logger.info("Base de datos lista en %.0f ms", (time.perf_counter() - inicio) * 1000)
+    
+    def _conexion(self) -> sqlite3.Connection:
+        """Conexión del hilo actual; se abre la primera vez o si cambió la ruta"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None or self._local.ruta != self.ruta_db:
+            if conexion is not None:
+                conexion.close()
+            # Sin transacciones implícitas: las escrituras abren BEGIN IMMEDIATE en _escribir
+            conexion = sqlite3.connect(self.ruta_db, timeout=self.config_bd.get('timeout_conexion', 30),
+                                       cached_statements=SENTENCIAS_EN_CACHE, isolation_level=None)
+            if self.modo_concurrencia == 'wal':
+                conexion.execute(f"PRAGMA synchronous = {self.config_bd.get('sincronizacion_wal', 'NORMAL')}")
+                conexion.execute(f"PRAGMA wal_autocheckpoint = {int(self.config_bd.get('wal_autocheckpoint', 1000))}")
+                conexion.execute(f"PRAGMA journal_size_limit = {64 * 1024 * 1024}")
+            self._local.conexion = conexion
+            self._local.ruta = self.ruta_db
+        return conexion
+    
+    @contextmanager
+    def _lectura(self):
+        """Conexión del hilo para consultas; si falla se reabre en la llamada siguiente"""
+        try:
+            yield self._conexion()
+        except sqlite3.OperationalError:
+            # Disco o recurso compartido caído: la próxima llamada reabre
+            self.cerrar()
+            raise
+    
+    def _determinar_modo(self) -> str:
+        """Modo de concurrencia según la configuración y dónde está el archivo"""
+        modo = self.config_bd.get('modo_concurrencia', 'auto')
+        if modo not in MODOS_CONCURRENCIA:
+            logger.warning("modo_concurrencia desconocido: %s; se usa 'auto'", modo)
+            modo = 'auto'
+        compartida = (self.config_bd.get('usar_ruta_compartida', False) and
+                      self.ruta_db == self.config_bd.get('ruta_compartida', '').strip())
+        if modo == 'auto':
+            # Otra PC puede abrir el mismo archivo por la red, donde WAL no es seguro
+            return 'cola' if compartida or es_ruta_de_red(self.ruta_db) else 'wal'
+        if modo == 'wal' and es_ruta_de_red(self.ruta_db):
+            logger.warning("WAL no es seguro en una ruta de red (%s); se usa la cola de escritura", self.ruta_db)
+            return 'cola'
+        return modo
+    
+    def _configurar_concurrencia(self):
+        """Elige el modo, fija el journal del archivo y crea la cola de escritura si hace falta"""
+        self.cerrar()
+        self.modo_concurrencia = self._determinar_modo()
+        conexion = self._conexion()
+        journal = conexion.execute("PRAGMA journal_mode").fetchone()[0].lower()
+        if self.modo_concurrencia == 'wal' and journal != 'wal':
+            journal = conexion.execute("PRAGMA journal_mode = WAL").fetchone()[0].lower()
+            if journal != 'wal':
+                logger.warning("No se pudo activar WAL (journal %s); se usa la cola de escritura", journal)
+                self.modo_concurrencia = 'cola'
+                self.cerrar()
+        elif self.modo_concurrencia == 'cola' and journal == 'wal':
+            # Necesita que ninguna otra conexión tenga el archivo abierto
+            try:
+                journal = conexion.execute("PRAGMA journal_mode = DELETE").fetchone()[0].lower()
+            except sqlite3.OperationalError as e:
+                logger.warning("No se pudo desactivar WAL en %s: %s", self.ruta_db, e)
+        if self.modo_concurrencia == 'cola' and self._cola is None:
+            self._cola = ThreadPoolExecutor(max_workers=1, thread_name_prefix="escritor-bd")
+        logger.info("Concurrencia de la base de datos: %s (journal %s)", self.modo_concurrencia, journal)
+    
+    def _escribir(self, funcion: Callable[..., Any], *args) -> Any:
+        """Ejecuta funcion(conn, *args) en una transacción de escritura y devuelve su resultado.
         
-        self.inicializar_db()
+        En modo 'cola' la transacción corre en el hilo escritor del proceso.
+        """
+        if self.modo_concurrencia == 'cola' and self._cola is not None:
+            return self._cola.submit(self._transaccion_escritura, funcion, *args).result()
+        return self._transaccion_escritura(funcion, *args)
+    
+    def _transaccion_escritura(self, funcion: Callable[..., Any], *args) -> Any:
+        conexion = self._conexion()
+        try:
+            self._comenzar_escritura(conexion)
+            try:
+                resultado = funcion(conexion, *args)
+                conexion.execute("COMMIT")
+            except BaseException:
+                if conexion.in_transaction:
+                    conexion.execute("ROLLBACK")
+                raise
+        except sqlite3.OperationalError as e:
+            if not _esta_bloqueada(e):
+                self.cerrar()
+            raise
+        return resultado
+    
+    def _comenzar_escritura(self, conexion: sqlite3.Connection):
+        """BEGIN IMMEDIATE con reintentos: toma el lock de escritura antes de leer nada"""
+        timeout = self.config_bd.get('timeout_conexion', 30)
+        espera_ms = int(self.config_bd.get('espera_bloqueo_ms', 100))
+        limite = time.monotonic() + timeout
+        pausa = 0.01
+        # Espera corta dentro de SQLite y reintentos con pausa al azar: los escritores no se sincronizan
+        conexion.execute(f"PRAGMA busy_timeout = {espera_ms}")
+        try:
+            while True:
+                try:
+                    conexion.execute("BEGIN IMMEDIATE")
+                    return
+                except sqlite3.OperationalError as e:
+                    if not _esta_bloqueada(e) or time.monotonic() + pausa > limite:
+                        raise
+                self.reintentos_escritura += 1
+                time.sleep(pausa * random.uniform(0.5, 1.5))
+                pausa = min(pausa * 2, 0.5)
+        finally:
+            conexion.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+    
+    def cerrar(self):
+        """Cierra la conexión del hilo actual"""
+        conexion = getattr(self._local, 'conexion', None)
+        self._local.conexion = None
+        if conexion is not None:
+            try:
+                conexion.close()
+            except sqlite3.Error:
+                pass
     
     def _determinar_ruta_bd(self) -> str:
         """Determina la ruta de la base de datos según la configuración"""
@@ -33,10 +274,10 @@ class BaseDatos:
         if self.config_bd.get('usar_ruta_compartida', False):
             ruta_compartida = self.config_bd.get('ruta_compartida', '').strip()
             if ruta_compartida and os.path.exists(os.path.dirname(ruta_compartida)):
-                print(f"🌐 Usando base de datos compartida: {ruta_compartida}")
+                logger.info("Usando base de datos compartida: %s", ruta_compartida)
                 return ruta_compartida
             else:
-                print(f"⚠️ Ruta compartida no válida: {ruta_compartida}")
+                logger.warning("Ruta compartida no válida: %s", ruta_compartida)
         
         # Si se especifica ruta completa
         ruta_completa = self.config_bd.get('ruta_completa', '').strip()
@@ -46,134 +287,151 @@ class BaseDatos:
             if directorio and not os.path.exists(directorio):
                 try:
                     os.makedirs(directorio)
-                    print(f"📁 Directorio creado: {directorio}")
+                    logger.info("Directorio creado: %s", directorio)
                 except Exception as e:
-                    print(f"❌ Error creando directorio {directorio}: {e}")
+                    logger.error("Error creando directorio %s: %s", directorio, e)
             
             if os.path.exists(directorio) or not directorio:
-                print(f"📄 Usando ruta personalizada: {ruta_completa}")
+                logger.info("Usando ruta personalizada: %s", ruta_completa)
                 return ruta_completa
         
         # Ruta por defecto (en el directorio del proyecto)
         nombre_archivo = self.config_bd.get('nombre_archivo', 'pesaje_fardos.db')
         ruta_defecto = os.path.join(os.path.dirname(os.path.dirname(__file__)), nombre_archivo)
-        print(f"📄 Usando ruta por defecto: {ruta_defecto}")
+        logger.info("Usando ruta por defecto: %s", ruta_defecto)
         return ruta_defecto
     
-    def _crear_backup_si_necesario(self):
-        """Crea un backup de la base de datos si existe"""
-        if os.path.exists(self.ruta_db):
-            try:
-                carpeta_backup = self.config_bd.get('carpeta_backup', 'backups')
-                
-                # Crear carpeta de backup si no existe
-                if not os.path.isabs(carpeta_backup):
-                    carpeta_backup = os.path.join(os.path.dirname(self.ruta_db), carpeta_backup)
-                
-                if not os.path.exists(carpeta_backup):
-                    os.makedirs(carpeta_backup)
-                
-                # Crear nombre del backup con timestamp
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                nombre_base = os.path.splitext(os.path.basename(self.ruta_db))[0]
-                nombre_backup = f"{nombre_base}_backup_{timestamp}.db"
-                ruta_backup = os.path.join(carpeta_backup, nombre_backup)
-                
-                # Copiar archivo
-                shutil.copy2(self.ruta_db, ruta_backup)
-                print(f"💾 Backup creado: {ruta_backup}")
-                
-                # Limpiar backups antiguos (mantener solo los últimos 5)
-                self._limpiar_backups_antiguos(carpeta_backup, nombre_base)
-                
-            except Exception as e:
-                print(f"⚠️ Error creando backup: {e}")
-    
-    def _limpiar_backups_antiguos(self, carpeta_backup: str, nombre_base: str):
-        """Mantiene solo los últimos 5 backups"""
-        try:
-            archivos_backup = []
-            for archivo in os.listdir(carpeta_backup):
-                if archivo.startswith(f"{nombre_base}_backup_") and archivo.endswith('.db'):
-                    ruta_completa = os.path.join(carpeta_backup, archivo)
-                    archivos_backup.append((ruta_completa, os.path.getmtime(ruta_completa)))
-            
-            # Ordenar por fecha (más reciente primero)
-            archivos_backup.sort(key=lambda x: x[1], reverse=True)
-            
-            # Eliminar los que sobran (mantener solo 5)
-            for ruta_archivo, _ in archivos_backup[5:]:
-                os.remove(ruta_archivo)
-                print(f"🗑️ Backup antiguo eliminado: {os.path.basename(ruta_archivo)}")
-                
-        except Exception as e:
-            print(f"⚠️ Error limpiando backups: {e}")
-    
     def inicializar_db(self):
         """Inicializa la base de datos y crea las tablas si no existen"""
         try:
-            timeout = self.config_bd.get('timeout_conexion', 30)
-            
-            with sqlite3.connect(self.ruta_db, timeout=timeout) as conn:
-                cursor = conn.cursor()
-                
-                # Tabla de tickets
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS tickets (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        numero TEXT UNIQUE NOT NULL,
-                        fecha_creacion TIMESTAMP NOT NULL,
-                        kg_bruto_romaneo REAL,
-                        agregado REAL DEFAULT 0,
-                        resto REAL DEFAULT 0,
-                        observaciones TEXT,
-                        estado TEXT DEFAULT 'ACTIVO',
-                        fecha_guardado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # Tabla de fardos
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS fardos (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        ticket_id INTEGER NOT NULL,
-                        numero INTEGER NOT NULL,
-                        peso REAL NOT NULL,
-                        hora_pesaje TIMESTAMP NOT NULL,
-                        FOREIGN KEY (ticket_id) REFERENCES tickets (id),
-                        UNIQUE(ticket_id, numero)
-                    )
-                ''')
-                
-                # Verificar si necesitamos agregar las nuevas columnas
-                cursor.execute("PRAGMA table_info(tickets)")
-                columnas_existentes = [columna[1] for columna in cursor.fetchall()]
-                
-                # Agregar nuevas columnas si no existen
-                if 'kg_bruto_romaneo' not in columnas_existentes:
-                    cursor.execute('ALTER TABLE tickets ADD COLUMN kg_bruto_romaneo REAL')
-                    print("✅ Columna kg_bruto_romaneo agregada")
-                
-                if 'agregado' not in columnas_existentes:
-                    cursor.execute('ALTER TABLE tickets ADD COLUMN agregado REAL DEFAULT 0')
-                    print("✅ Columna agregado agregada")
-                
-                if 'resto' not in columnas_existentes:
-                    cursor.execute('ALTER TABLE tickets ADD COLUMN resto REAL DEFAULT 0')
-                    print("✅ Columna resto agregada")
-                
-                # Índices para mejor rendimiento
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_numero ON tickets(numero)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_fecha ON tickets(fecha_creacion)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_fardos_ticket ON fardos(ticket_id)')
-                
-                conn.commit()
-                print("✅ Base de datos inicializada correctamente")
+            self._configurar_concurrencia()
+            self._escribir(self._crear_esquema)
+            logger.info("Base de datos inicializada correctamente (modo %s)", self.modo_concurrencia)
                 
         except Exception as e:
-            print(f"❌ Error al inicializar base de datos: {str(e)}")
+            logger.error("Error al inicializar base de datos: %s", e)
             raise
     
+    def _crear_esquema(self, conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        
+        # Tabla de tickets
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS tickets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                numero TEXT UNIQUE NOT NULL,
+                fecha_creacion TIMESTAMP NOT NULL,
+                kg_bruto_romaneo REAL,
+                agregado REAL DEFAULT 0,
+                resto REAL DEFAULT 0,
+                observaciones TEXT,
+                estado TEXT DEFAULT 'ACTIVO',
+                fecha_guardado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                tara_por_fardo REAL NOT NULL DEFAULT {TARA_POR_FARDO_ANTERIOR!r},
+                cantidad_fardos INTEGER NOT NULL DEFAULT 0,
+                peso_total REAL NOT NULL DEFAULT 0,
+                peso_minimo REAL,
+                peso_maximo REAL,
+                rinde REAL
+            )
+        ''')
+        
+        # Tabla de fardos
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fardos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticket_id INTEGER NOT NULL,
+                numero INTEGER NOT NULL,
+                peso REAL NOT NULL,
+                hora_pesaje TIMESTAMP NOT NULL,
+                hora_captura TIMESTAMP,
+                tiempo_asentamiento REAL,
+                secuencia INTEGER,
+                FOREIGN KEY (ticket_id) REFERENCES tickets (id),
+                UNIQUE(ticket_id, numero)
+            )
+        ''')
+        
+        # Verificar si necesitamos agregar las nuevas columnas
+        cursor.execute("PRAGMA table_info(tickets)")
+        columnas_existentes = [columna[1] for columna in cursor.fetchall()]
+        
+        # Agregar nuevas columnas si no existen
+        if 'kg_bruto_romaneo' not in columnas_existentes:
+            cursor.execute('ALTER TABLE tickets ADD COLUMN kg_bruto_romaneo REAL')
+            logger.info("Columna kg_bruto_romaneo agregada")
+        
+        if 'agregado' not in columnas_existentes:
+            cursor.execute('ALTER TABLE tickets ADD COLUMN agregado REAL DEFAULT 0')
+            logger.info("Columna agregado agregada")
+        
+        if 'resto' not in columnas_existentes:
+            cursor.execute('ALTER TABLE tickets ADD COLUMN resto REAL DEFAULT 0')
+            logger.info("Columna resto agregada")
+        
+        if 'tara_por_fardo' not in columnas_existentes:
+            # Los tickets ya guardados quedan con la tara con la que se calculó su rinde
+            cursor.execute(f'ALTER TABLE tickets ADD COLUMN tara_por_fardo REAL NOT NULL '
+                           f'DEFAULT {TARA_POR_FARDO_ANTERIOR!r}')
+            logger.info("Columna tara_por_fardo agregada")
+        
+        cursor.execute("PRAGMA table_info(fardos)")
+        columnas_fardos = [columna[1] for columna in cursor.fetchall()]
+        
+        if 'hora_captura' not in columnas_fardos:
+            cursor.execute('ALTER TABLE fardos ADD COLUMN hora_captura TIMESTAMP')
+            logger.info("Columna hora_captura agregada")
+        
+        if 'tiempo_asentamiento' not in columnas_fardos:
+            cursor.execute('ALTER TABLE fardos ADD COLUMN tiempo_asentamiento REAL')
+            logger.info("Columna tiempo_asentamiento agregada")
+        
+        if 'secuencia' not in columnas_fardos:
+            cursor.execute('ALTER TABLE fardos ADD COLUMN secuencia INTEGER')
+            logger.info("Columna secuencia agregada")
+        
+        # Índices para mejor rendimiento
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_numero ON tickets(numero)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_fecha ON tickets(fecha_creacion)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_fardos_ticket ON fardos(ticket_id)')
+        
+        self._crear_resumen(cursor, columnas_existentes)
+    
+    def _crear_resumen(self, cursor: sqlite3.Cursor, columnas_existentes: List[str]):
+        """Columnas de resumen en tickets, sus triggers y el índice del historial"""
+        faltantes = [nombre for nombre in COLUMNAS_RESUMEN if nombre not in columnas_existentes]
+        for nombre in faltantes:
+            cursor.execute(f'ALTER TABLE tickets ADD COLUMN {nombre} {COLUMNAS_RESUMEN[nombre]}')
+            logger.info("Columna %s agregada", nombre)
+        
+        # Se recrean si el texto cambió en una versión nueva; el rinde guardado no se recalcula
+        for nombre, sql in _triggers_resumen().items():
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (nombre,))
+            existente = cursor.fetchone()
+            if existente and existente[0] == sql:
+                continue
+            if existente:
+                cursor.execute(f'DROP TRIGGER {nombre}')
+            cursor.execute(sql)
+            logger.info("Trigger %s creado", nombre)
+        
+        if faltantes:
+            # Carga inicial desde los fardos ya guardados (trg_tickets_rinde calcula el rinde)
+            inicio = time.perf_counter()
+            cursor.execute('''
+                UPDATE tickets SET (cantidad_fardos, peso_total, peso_minimo, peso_maximo) =
+                    (SELECT COUNT(*), COALESCE(SUM(peso), 0), MIN(peso), MAX(peso)
+                     FROM fardos WHERE fardos.ticket_id = tickets.id)
+            ''')
+            logger.info("Resumen de fardos cargado en %d tickets en %.0f ms", cursor.rowcount,
+                        (time.perf_counter() - inicio) * 1000)
+        
+        # Cubre el historial y la búsqueda: se responden sin leer la tabla
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tickets_historial
+            ON tickets(estado, fecha_guardado, numero, fecha_creacion, cantidad_fardos, peso_total)
+        ''')
+    
     def cambiar_ubicacion_bd(self, nueva_ruta: str, copiar_datos: bool = True) -> bool:
         """Cambia la ubicación de la base de datos"""
         try:
@@ -184,22 +442,29 @@ class BaseDatos:
             if directorio_nuevo and not os.path.exists(directorio_nuevo):
                 os.makedirs(directorio_nuevo)
             
-            # Copiar datos si se solicita y existe la BD anterior
+            # Copiar datos si se solicita y existe la BD anterior (con la API de
+            # backup: en modo WAL parte de los datos puede estar en el archivo -wal)
             if copiar_datos and os.path.exists(ruta_anterior):
-                shutil.copy2(ruta_anterior, nueva_ruta)
-                print(f"📋 Datos copiados de {ruta_anterior} a {nueva_ruta}")
+                destino = sqlite3.connect(nueva_ruta)
+                try:
+                    self._conexion().backup(destino)
+                finally:
+                    destino.close()
+                logger.info("Datos copiados de %s a %s", ruta_anterior, nueva_ruta)
             
             # Actualizar configuración
             self.ruta_db = nueva_ruta
             
             # Inicializar la nueva BD
             self.inicializar_db()
+            if self._backups is not None:
+                self._backups = iniciar_backups(self.ruta_db, self.config_bd)
             
-            print(f"✅ Base de datos reubicada exitosamente")
+            logger.info("Base de datos reubicada exitosamente")
             return True
             
         except Exception as e:
-            print(f"❌ Error reubicando base de datos: {e}")
+            logger.error("Error reubicando base de datos: %s", e)
             return False
     
     def obtener_info_bd(self) -> dict:
@@ -210,11 +475,17 @@ class BaseDatos:
                 'existe': os.path.exists(self.ruta_db),
                 'tamaño_mb': 0,
                 'accesible': False,
-                'compartida': self.config_bd.get('usar_ruta_compartida', False)
+                'compartida': self.config_bd.get('usar_ruta_compartida', False),
+                'ultimo_backup': self._backups.ultimo if self._backups else None,
+                'modo_concurrencia': self.modo_concurrencia,
+                'reintentos_escritura': self.reintentos_escritura
             }
             
             if info['existe']:
-                info['tamaño_mb'] = round(os.path.getsize(self.ruta_db) / (1024 * 1024), 2)
+                # En modo WAL lo último guardado puede estar todavía en el archivo -wal
+                tamaño = sum(os.path.getsize(ruta) for ruta in (self.ruta_db, self.ruta_db + '-wal')
+                             if os.path.exists(ruta))
+                info['tamaño_mb'] = round(tamaño / (1024 * 1024), 2)
                 
                 # Probar acceso
                 try:
@@ -229,144 +500,162 @@ class BaseDatos:
             return info
             
         except Exception as e:
-            print(f"❌ Error obteniendo info de BD: {e}")
+            logger.error("Error obteniendo info de BD: %s", e)
             return {'error': str(e)}
     
     def guardar_ticket(self, ticket: Ticket, datos_adicionales: dict = None) -> bool:
         """Guarda un ticket completo en la base de datos"""
         try:
-            timeout = self.config_bd.get('timeout_conexion', 30)
-            
-            with sqlite3.connect(self.ruta_db, timeout=timeout) as conn:
-                cursor = conn.cursor()
-                
-                # Preparar datos adicionales
-                kg_bruto_romaneo = None
-                agregado = 0.0
-                resto = 0.0
-                observaciones = ""
-                
-                if datos_adicionales:
-                    # Kg Bruto Romaneo
-                    kg_bruto_str = datos_adicionales.get('kg_bruto_romaneo', '').strip()
-                    if kg_bruto_str:
-                        try:
-                            kg_bruto_romaneo = float(kg_bruto_str.replace(',', '.'))
-                        except ValueError:
-                            kg_bruto_romaneo = None
-                    
-                    # Agregado
-                    agregado_str = datos_adicionales.get('agregado', '0').strip()
-                    try:
-                        agregado = float(agregado_str.replace(',', '.'))
-                    except ValueError:
-                        agregado = 0.0
-                    
-                    # Resto
-                    resto_str = datos_adicionales.get('resto', '0').strip()
-                    try:
-                        resto = float(resto_str.replace(',', '.'))
-                    except ValueError:
-                        resto = 0.0
-                    
-                    # Observaciones
-                    observaciones = datos_adicionales.get('observaciones', '').strip()
-                
-                # Verificar si el ticket ya existe
-                cursor.execute('SELECT id FROM tickets WHERE numero = ?', (ticket.numero,))
-                ticket_existente = cursor.fetchone()
-                
-                if ticket_existente:
-                    # Actualizar ticket existente
-                    ticket_id = ticket_existente[0]
-                    cursor.execute('''
-                        UPDATE tickets 
-                        SET kg_bruto_romaneo = ?, agregado = ?, resto = ?, 
-                            observaciones = ?, fecha_guardado = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    ''', (kg_bruto_romaneo, agregado, resto, observaciones, ticket_id))
-                    
-                    # Eliminar fardos existentes para reemplazarlos
-                    cursor.execute('DELETE FROM fardos WHERE ticket_id = ?', (ticket_id,))
-                else:
-                    # Insertar nuevo ticket
-                    cursor.execute('''
-                        INSERT INTO tickets (numero, fecha_creacion, kg_bruto_romaneo, 
-                                           agregado, resto, observaciones)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (ticket.numero, ticket.fecha_creacion, kg_bruto_romaneo, 
-                          agregado, resto, observaciones))
-                    ticket_id = cursor.lastrowid
-                
-                # Insertar fardos
-                for fardo in ticket.fardos:
-                    cursor.execute('''
-                        INSERT INTO fardos (ticket_id, numero, peso, hora_pesaje)
-                        VALUES (?, ?, ?, ?)
-                    ''', (ticket_id, fardo.numero, fardo.peso, fardo.hora_pesaje))
-                
-                conn.commit()
-                print(f"✅ Ticket {ticket.numero} guardado correctamente")
-                return True
+            cambios = self._escribir(self._guardar_ticket, ticket, datos_adicionales)
+            self.ultimos_cambios = cambios
+            if self._backups is not None:
+                self._backups.ticket_guardado()
+            logger.info("Ticket %s guardado correctamente (fardos: %d nuevos, %d modificados, %d eliminados)",
+                        ticket.numero, cambios.insertados, cambios.actualizados, cambios.eliminados,
+                        extra={"ticket": ticket.numero, "fardos_tocados": cambios.total})
+            return True
                 
         except Exception as e:
-            print(f"❌ Error al guardar ticket: {str(e)}")
+            logger.error("Error al guardar ticket: %s", e)
             return False
     
+    def _guardar_ticket(self, conn: sqlite3.Connection, ticket: Ticket,
+                        datos_adicionales: Optional[dict]) -> "CambiosFardos":
+        cursor = conn.cursor()
+        
+        # Preparar datos adicionales
+        kg_bruto_romaneo = None
+        agregado = 0.0
+        resto = 0.0
+        observaciones = ""
+        
+        if datos_adicionales:
+            # Kg Bruto Romaneo
+            kg_bruto_str = datos_adicionales.get('kg_bruto_romaneo', '').strip()
+            if kg_bruto_str:
+                try:
+                    kg_bruto_romaneo = float(kg_bruto_str.replace(',', '.'))
+                except ValueError:
+                    kg_bruto_romaneo = None
+            
+            # Agregado
+            agregado_str = datos_adicionales.get('agregado', '0').strip()
+            try:
+                agregado = float(agregado_str.replace(',', '.'))
+            except ValueError:
+                agregado = 0.0
+            
+            # Resto
+            resto_str = datos_adicionales.get('resto', '0').strip()
+            try:
+                resto = float(resto_str.replace(',', '.'))
+            except ValueError:
+                resto = 0.0
+            
+            # Observaciones
+            observaciones = datos_adicionales.get('observaciones', '').strip()
+        
+        # Verificar si el ticket ya existe
+        cursor.execute('SELECT id FROM tickets WHERE numero = ?', (ticket.numero,))
+        ticket_existente = cursor.fetchone()
+        
+        if ticket_existente:
+            # Actualizar ticket existente
+            ticket_id = ticket_existente[0]
+            cursor.execute('''
+                UPDATE tickets 
+                SET kg_bruto_romaneo = ?, agregado = ?, resto = ?, 
+                    observaciones = ?, fecha_guardado = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (kg_bruto_romaneo, agregado, resto, observaciones, ticket_id))
+            
+            # Fardos guardados {numero: valores} para comparar con los del ticket
+            cursor.execute('''
+                SELECT numero, peso, hora_pesaje, hora_captura, tiempo_asentamiento, secuencia
+                FROM fardos WHERE ticket_id = ?
+            ''', (ticket_id,))
+            guardados = {fila[0]: fila[1:] for fila in cursor.fetchall()}
+        else:
+            # Insertar nuevo ticket
+            cursor.execute('''
+                INSERT INTO tickets (numero, fecha_creacion, kg_bruto_romaneo, 
+                                   agregado, resto, observaciones, tara_por_fardo)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (ticket.numero, ticket.fecha_creacion, kg_bruto_romaneo, 
+                  agregado, resto, observaciones, ticket.tara_por_fardo))
+            ticket_id = cursor.lastrowid
+            guardados = {}
+        
+        # Sólo los fardos nuevos o modificados; los que no cambiaron no se tocan
+        cambios = []
+        insertados = 0
+        for fardo in ticket.fardos:
+            valores = (fardo.peso, _valor_bd(fardo.hora_pesaje), _valor_bd(fardo.hora_captura),
+                       fardo.tiempo_asentamiento, fardo.secuencia)
+            anterior = guardados.pop(fardo.numero, None)
+            if anterior is None:
+                insertados += 1
+            elif anterior == valores:
+                continue
+            cambios.append((ticket_id, fardo.numero) + valores)
+        
+        cursor.executemany('''
+            INSERT INTO fardos (ticket_id, numero, peso, hora_pesaje,
+                                hora_captura, tiempo_asentamiento, secuencia)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(ticket_id, numero) DO UPDATE SET
+                peso = excluded.peso, hora_pesaje = excluded.hora_pesaje,
+                hora_captura = excluded.hora_captura,
+                tiempo_asentamiento = excluded.tiempo_asentamiento, secuencia = excluded.secuencia
+        ''', cambios)
+        # Los que quedaron guardados ya no están en el ticket
+        cursor.executemany('DELETE FROM fardos WHERE ticket_id = ? AND numero = ?',
+                           [(ticket_id, numero) for numero in guardados])
+        return CambiosFardos(insertados, len(cambios) - insertados, len(guardados))
+    
     def obtener_historial_tickets(self) -> List[Tuple]:
         """Obtiene el historial de todos los tickets"""
         try:
-            timeout = self.config_bd.get('timeout_conexion', 30)
-            
-            with sqlite3.connect(self.ruta_db, timeout=timeout) as conn:
+            with self._lectura() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT t.numero, t.fecha_creacion, COUNT(f.id) as cantidad_fardos,
-                           COALESCE(SUM(f.peso), 0) as peso_total, t.fecha_guardado
-                    FROM tickets t
-                    LEFT JOIN fardos f ON t.id = f.ticket_id
-                    WHERE t.estado = 'ACTIVO'
-                    GROUP BY t.id, t.numero, t.fecha_creacion, t.fecha_guardado
-                    ORDER BY t.fecha_guardado DESC
+                    SELECT numero, fecha_creacion, cantidad_fardos, peso_total, fecha_guardado
+                    FROM tickets
+                    WHERE estado = 'ACTIVO'
+                    ORDER BY fecha_guardado DESC
                 ''')
                 return cursor.fetchall()
         except Exception as e:
-            print(f"❌ Error al obtener historial: {str(e)}")
+            logger.error("Error al obtener historial: %s", e)
             return []
             
     def buscar_tickets(self, termino_busqueda: str) -> List[Tuple]:
         """Busca tickets por número o fecha"""
         try:
-            timeout = self.config_bd.get('timeout_conexion', 30)
-            
-            with sqlite3.connect(self.ruta_db, timeout=timeout) as conn:
+            with self._lectura() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT t.numero, t.fecha_creacion, COUNT(f.id) as cantidad_fardos,
-                           COALESCE(SUM(f.peso), 0) as peso_total, t.fecha_guardado
-                    FROM tickets t
-                    LEFT JOIN fardos f ON t.id = f.ticket_id
-                    WHERE t.estado = 'ACTIVO' AND 
-                          (t.numero LIKE ? OR date(t.fecha_creacion) LIKE ?)
-                    GROUP BY t.id, t.numero, t.fecha_creacion, t.fecha_guardado
-                    ORDER BY t.fecha_guardado DESC
+                    SELECT numero, fecha_creacion, cantidad_fardos, peso_total, fecha_guardado
+                    FROM tickets
+                    WHERE estado = 'ACTIVO' AND 
+                          (numero LIKE ? OR date(fecha_creacion) LIKE ?)
+                    ORDER BY fecha_guardado DESC
                 ''', (f'%{termino_busqueda}%', f'%{termino_busqueda}%'))
                 return cursor.fetchall()
         except Exception as e:
-            print(f"❌ Error al buscar tickets: {str(e)}")
+            logger.error("Error al buscar tickets: %s", e)
             return []
     
     def cargar_ticket(self, numero_ticket: str) -> Optional[Ticket]:
         """Carga un ticket completo desde la base de datos"""
         try:
-            timeout = self.config_bd.get('timeout_conexion', 30)
-            
-            with sqlite3.connect(self.ruta_db, timeout=timeout) as conn:
+            with self._lectura() as conn:
                 cursor = conn.cursor()
                 
                 # Obtener datos del ticket
                 cursor.execute('''
-                    SELECT numero, fecha_creacion, kg_bruto_romaneo, agregado, resto, observaciones
+                    SELECT numero, fecha_creacion, kg_bruto_romaneo, agregado, resto, observaciones, rinde,
+                           tara_por_fardo
                     FROM tickets 
                     WHERE numero = ? AND estado = 'ACTIVO'
                 ''', (numero_ticket,))
@@ -384,6 +673,8 @@ class BaseDatos:
                 ticket.agregado = ticket_data[3] if ticket_data[3] is not None else 0.0
                 ticket.resto = ticket_data[4] if ticket_data[4] is not None else 0.0
                 ticket.observaciones = ticket_data[5] or ""
+                ticket.rinde = ticket_data[6]
+                ticket.tara_por_fardo = ticket_data[7]
                 
                 # Obtener fardos del ticket
                 cursor.execute('''
@@ -392,7 +683,7 @@ class BaseDatos:
                 ticket_id = cursor.fetchone()[0]
                 
                 cursor.execute('''
-                    SELECT numero, peso, hora_pesaje
+                    SELECT numero, peso, hora_pesaje, hora_captura, tiempo_asentamiento, secuencia
                     FROM fardos 
                     WHERE ticket_id = ?
                     ORDER BY numero
@@ -402,60 +693,48 @@ class BaseDatos:
                 for fardo_data in fardos_data:
                     fardo = Fardo(fardo_data[0], fardo_data[1])
                     fardo.hora_pesaje = datetime.fromisoformat(fardo_data[2])
+                    if fardo_data[3]:
+                        fardo.hora_captura = datetime.fromisoformat(fardo_data[3])
+                    fardo.tiempo_asentamiento = fardo_data[4]
+                    fardo.secuencia = fardo_data[5]
                     ticket.fardos.append(fardo)
                 
-                print(f"✅ Ticket {numero_ticket} cargado correctamente con {len(ticket.fardos)} fardos")
+                logger.info("Ticket %s cargado correctamente con %d fardos", numero_ticket, len(ticket.fardos))
                 return ticket
                 
         except Exception as e:
-            print(f"❌ Error al cargar ticket: {str(e)}")
+            logger.error("Error al cargar ticket: %s", e)
             return None
     
     def eliminar_ticket(self, numero_ticket: str) -> bool:
         """Marca un ticket como eliminado (soft delete)"""
         try:
-            timeout = self.config_bd.get('timeout_conexion', 30)
-            
-            with sqlite3.connect(self.ruta_db, timeout=timeout) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE tickets 
-                    SET estado = 'ELIMINADO', fecha_guardado = CURRENT_TIMESTAMP
-                    WHERE numero = ?
-                ''', (numero_ticket,))
-                conn.commit()
-                return cursor.rowcount > 0
+            return self._escribir(self._eliminar_ticket, numero_ticket)
         except Exception as e:
-            print(f"❌ Error al eliminar ticket: {str(e)}")
+            logger.error("Error al eliminar ticket: %s", e)
             return False
     
+    def _eliminar_ticket(self, conn: sqlite3.Connection, numero_ticket: str) -> bool:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE tickets 
+            SET estado = 'ELIMINADO', fecha_guardado = CURRENT_TIMESTAMP
+            WHERE numero = ?
+        ''', (numero_ticket,))
+        return cursor.rowcount > 0
+    
     def obtener_estadisticas_generales(self) -> dict:
         """Obtiene estadísticas generales de la base de datos"""
         try:
-            timeout = self.config_bd.get('timeout_conexion', 30)
-            
-            with sqlite3.connect(self.ruta_db, timeout=timeout) as conn:
+            with self._lectura() as conn:
                 cursor = conn.cursor()
                 
-                # Total de tickets
-                cursor.execute('SELECT COUNT(*) FROM tickets WHERE estado = "ACTIVO"')
-                total_tickets = cursor.fetchone()[0]
-                
-                # Total de fardos
-                cursor.execute('''
-                    SELECT COUNT(*) FROM fardos f
-                    JOIN tickets t ON f.ticket_id = t.id
-                    WHERE t.estado = "ACTIVO"
-                ''')
-                total_fardos = cursor.fetchone()[0]
-                
-                # Peso total
+                # Totales desde el resumen de cada ticket (idx_tickets_historial)
                 cursor.execute('''
-                    SELECT COALESCE(SUM(f.peso), 0) FROM fardos f
-                    JOIN tickets t ON f.ticket_id = t.id
-                    WHERE t.estado = "ACTIVO"
+                    SELECT COUNT(*), COALESCE(SUM(cantidad_fardos), 0), COALESCE(SUM(peso_total), 0)
+                    FROM tickets WHERE estado = 'ACTIVO'
                 ''')
-                peso_total = cursor.fetchone()[0]
+                total_tickets, total_fardos, peso_total = cursor.fetchone()
                 
                 return {
                     'total_tickets': total_tickets,
@@ -463,5 +742,19 @@ class BaseDatos:
                     'peso_total': peso_total
                 }
         except Exception as e:
-            print(f"❌ Error al obtener estadísticas: {str(e)}")
+            logger.error("Error al obtener estadísticas: %s", e)
             return {'total_tickets': 0, 'total_fardos': 0, 'peso_total': 0}
+
+
+# Servicio de datos compartido por todo el proceso
+_base_datos: Optional[BaseDatos] = None
+_lock_base_datos = threading.Lock()
+
+def obtener_base_datos() -> BaseDatos:
+    """Devuelve la base de datos del proceso, configurándola e inicializándola la primera vez"""
+    global _base_datos
+    if _base_datos is None:
+        with _lock_base_datos:
+            if _base_datos is None:
+                _base_datos = BaseDatos(config_manager)
+    return _base_datos
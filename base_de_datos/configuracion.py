@@ -10,6 +10,12 @@ CAMPOS_CONFIG = {
     'tara_por_fardo': 2.0,  # kg de tara por cada fardo
     'precision_decimal': 2,  # decimales para mostrar pesos
     'numero_fardo_inicial': 1,  # número inicial de fardos
+    'refresco_display_ms': 50,  # cada cuántos ms se actualiza el display de peso
+    'peso_minimo_fardo': 1.0,  # kg; por debajo no se registra el fardo
+    'autocaptura_umbral_vacio': 0.5,  # kg; por debajo la balanza se considera descargada
+    'autocaptura_intervalo_min': 2.0,  # segundos mínimos entre dos capturas automáticas
+    'espera_peso_estable_s': 3.0,  # segundos que PESAR espera una muestra estable nueva
+    'sondeo_peso_estable_ms': 20,  # cada cuántos ms se revisa si llegó
 }
 
 # === CONFIGURACIÓN DE BALANZA GAMA ===
@@ -85,6 +91,18 @@ EXPORTACION_CONFIG = {
     'encoding': 'utf-8-sig',  # Para compatibilidad con Excel
 }
 
+# === CONFIGURACIÓN DEL REGISTRO (LOGS) ===
+REGISTRO_CONFIG = {
+    'carpeta': 'registros',          # Carpeta de los archivos de registro
+    'archivo': 'pesaje.log',         # Una línea JSON por mensaje
+    'nivel': 'INFO',                 # Nivel mínimo en el archivo
+    'nivel_consola': 'INFO',         # Nivel mínimo en la consola
+    'max_bytes': 1024 * 1024,        # Tamaño al que rota el archivo
+    'copias': 5,                     # Archivos rotados que se conservan
+    'mensajes_por_segundo': 2,       # Límite por tipo de mensaje (info y debug)
+    'rafaga': 10,                    # Mensajes seguidos permitidos antes del límite
+}
+
 # === MENSAJES DEL SISTEMA ===
 MENSAJES = {
     'ticket_creado': 'Ticket creado exitosamente',
@@ -1,6 +1,25 @@
 from datetime import datetime
 from typing import List, Optional
 
+from base_de_datos.configuracion import CAMPOS_CONFIG
+
+# Tara por fardo con la que calculaban el rinde las versiones anteriores; la
+# toman los tickets guardados antes de que cada ticket tuviera la suya
+TARA_POR_FARDO_ANTERIOR = 2.0
+
+# Rinde de calcular_rinde sobre las columnas de tickets (lo usan los triggers del resumen)
+RINDE_SQL = ("CASE WHEN kg_bruto_romaneo > 0 THEN (peso_total + COALESCE(resto, 0) - COALESCE(agregado, 0)"
+             " - cantidad_fardos * tara_por_fardo) / kg_bruto_romaneo * 100 END")
+
+
+def calcular_rinde(peso_total: float, cantidad_fardos: int, kg_bruto_romaneo: Optional[float],
+                   agregado: Optional[float], resto: Optional[float], tara_por_fardo: float) -> Optional[float]:
+    """Rinde en %: (kg total fardos + resto - agregado - tara)/Kgbrutos romaneo * 100; None sin kg brutos"""
+    if not kg_bruto_romaneo or kg_bruto_romaneo <= 0:
+        return None
+    tara = cantidad_fardos * tara_por_fardo
+    return ((peso_total + (resto or 0) - (agregado or 0) - tara) / kg_bruto_romaneo) * 100
+
 class Fardo:
     """Modelo para representar un fardo"""
     
@@ -8,6 +27,13 @@ class Fardo:
         self.numero = numero
         self.peso = peso
         self.hora_pesaje = datetime.now()
+        # Muestra de la balanza que se registró: hora en que llegó y número de
+        # secuencia de la publicación (hora_pesaje - hora_captura = latencia)
+        self.hora_captura: Optional[datetime] = None
+        self.secuencia: Optional[int] = None
+        # Sólo en la captura automática: segundos desde que se apoyó el fardo
+        # hasta que se estabilizó
+        self.tiempo_asentamiento: Optional[float] = None
     
     def __str__(self):
         return f"Fardo #{self.numero}: {self.peso:.2f} kg"
@@ -24,6 +50,8 @@ class Ticket:
         self.agregado: float = 0.0
         self.resto: float = 0.0
         self.rinde: Optional[float] = None
+        # La de la configuración al crearlo; guardado, conserva la suya aunque la configuración cambie
+        self.tara_por_fardo: float = CAMPOS_CONFIG['tara_por_fardo']
     
     def agregar_fardo(self, fardo: Fardo) -> None:
         """Agrega un fardo al ticket"""
@@ -47,15 +75,10 @@ class Ticket:
         """Calcula el peso total de todos los fardos"""
         return sum(fardo.peso for fardo in self.fardos)
         
-    def calcular_rinde(self, kg_bruto_romaneo: float, agregado: float, resto: float) -> float:
-        """Calcula el rinde según la fórmula: (kg total fardos + resto - agregado - tara)/Kgbrutos romaneo * 100"""
-        if not kg_bruto_romaneo or kg_bruto_romaneo <= 0:
-            return 0.0
-            
-        peso_total = self.obtener_peso_total()
-        tara = len(self.fardos) * 2  # 2kg por fardo
-        
-        return ((peso_total + resto - agregado - tara) / kg_bruto_romaneo) * 100
+    def calcular_rinde(self, kg_bruto_romaneo: Optional[float], agregado: float, resto: float) -> Optional[float]:
+        """Rinde del ticket con su tara por fardo (ver calcular_rinde); None sin kg brutos de romaneo"""
+        return calcular_rinde(self.obtener_peso_total(), len(self.fardos), kg_bruto_romaneo,
+                              agregado, resto, self.tara_por_fardo)
     
     def obtener_cantidad_fardos(self) -> int:
         """Obtiene la cantidad de fardos en el ticket"""
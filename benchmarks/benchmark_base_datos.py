@@ -0,0 +1,117 @@
+"""
+Costo por acción de crear BaseDatos en cada llamada frente al servicio compartido.
+
+Arma en una carpeta temporal una base con TICKETS tickets de FARDOS fardos
+cada uno y mide las acciones de la interfaz (guardar, cargar, historial y
+búsqueda) de dos formas:
+
+- por llamada: BaseDatos() nuevo en cada acción, como hacía la interfaz
+  (lee la configuración y vuelve a correr inicializar_db; el backup ya no
+  se hace acá, lo hace el hilo de base_de_datos/backups.py);
+- compartida: una sola instancia con la conexión del hilo y sus sentencias
+  preparadas, como devuelve obtener_base_datos().
+
+Informa la mediana y el p95 en milisegundos y el ahorro por acción.
+
+Uso: python benchmarks/benchmark_base_datos.py [TICKETS] [FARDOS]
+"""
+
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base_de_datos.base_datos import BaseDatos
+from base_de_datos.configuracion import ConfiguracionManager
+from base_de_datos.modelos_bd import Fardo, Ticket
+
+TICKETS = 2000
+FARDOS = 100
+REPETICIONES = 15
+
+
+class ConfiguracionPrueba(ConfiguracionManager):
+    """Lee la configuración de un archivo de la carpeta temporal"""
+
+    def __init__(self, config_file: str):
+        self.config_file = config_file
+        self.config_data = {}
+        self.cargar_configuracion()
+
+
+def poblar(ruta_db: str, tickets: int, fardos: int):
+    """Crea el esquema con una instancia descartable y carga datos al azar"""
+    inicio = datetime(2024, 1, 1)
+    with sqlite3.connect(ruta_db) as conn:
+        for i in range(tickets):
+            fecha = inicio + timedelta(hours=i)
+            cursor = conn.execute(
+                "INSERT INTO tickets (numero, fecha_creacion, kg_bruto_romaneo, agregado, resto, "
+                "observaciones) VALUES (?, ?, ?, 0, 0, '')", (f"T{i:06d}", fecha, fardos * 200.0))
+            ticket_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO fardos (ticket_id, numero, peso, hora_pesaje) VALUES (?, ?, ?, ?)",
+                [(ticket_id, n, random.uniform(180, 240), fecha + timedelta(seconds=30 * n))
+                 for n in range(1, fardos + 1)])
+
+
+def ticket_de_prueba(numero: str, fardos: int) -> Ticket:
+    ticket = Ticket(numero)
+    for n in range(1, fardos + 1):
+        ticket.agregar_fardo(Fardo(n, random.uniform(180, 240)))
+    return ticket
+
+
+def medir(accion, repeticiones: int = REPETICIONES):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        accion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return statistics.median(tiempos) * 1000, tiempos[int(len(tiempos) * 0.95)] * 1000
+
+
+def main():
+    tickets = int(sys.argv[1]) if len(sys.argv) > 1 else TICKETS
+    fardos = int(sys.argv[2]) if len(sys.argv) > 2 else FARDOS
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        config_file = os.path.join(carpeta, "configuracion.json")
+        with open(config_file, "w", encoding="utf-8") as f:
+            json.dump({"base_datos": {"ruta_completa": os.path.join(carpeta, "pesaje.db"),
+                                      "backup_automatico": True,
+                                      "carpeta_backup": os.path.join(carpeta, "backups")}}, f)
+
+        compartida = BaseDatos(ConfiguracionPrueba(config_file))
+        poblar(compartida.ruta_db, tickets, fardos)
+        tamaño = compartida.obtener_info_bd()['tamaño_mb']
+        print(f"Base de {tickets} tickets x {fardos} fardos ({tamaño:.1f} MB), {REPETICIONES} repeticiones")
+
+        nueva = ticket_de_prueba("NUEVO", fardos)
+        acciones = {
+            "guardar_ticket": lambda bd: bd.guardar_ticket(nueva, {}),
+            "cargar_ticket": lambda bd: bd.cargar_ticket(f"T{tickets // 2:06d}"),
+            "historial": lambda bd: bd.obtener_historial_tickets(),
+            "buscar_tickets": lambda bd: bd.buscar_tickets(f"T{tickets - 1:06d}"),
+        }
+
+        print(f"{'acción':<16} {'por llamada p50':>16} {'p95':>8} {'compartida p50':>15} {'p95':>8} "
+              f"{'ahorro/acción':>14}")
+        for nombre, accion in acciones.items():
+            por_llamada = medir(lambda: accion(BaseDatos(ConfiguracionPrueba(config_file))))
+            servicio = medir(lambda: accion(compartida))
+            print(f"{nombre:<16} {por_llamada[0]:13.2f} ms {por_llamada[1]:8.2f} {servicio[0]:12.2f} ms "
+                  f"{servicio[1]:8.2f} {por_llamada[0] - servicio[0]:11.2f} ms")
+        compartida.cerrar()
+
+
+if __name__ == "__main__":
+    main()
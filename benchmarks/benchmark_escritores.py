@@ -0,0 +1,132 @@
+"""
+Tickets guardados por segundo con varios procesos escribiendo la misma base.
+
+Simula varias PCs de pesaje guardando a la vez: cada proceso guarda tickets
+de FARDOS fardos sin pausa durante SEGUNDOS, con tres variantes:
+
+- anterior: como guardaba BaseDatos antes de los modos de concurrencia
+  (conexión nueva por guardado, transacción diferida, journal clásico);
+- cola: modo_concurrencia 'cola' (journal clásico, BEGIN IMMEDIATE con
+  reintentos y un hilo escritor por proceso), el de las bases en red;
+- wal: modo_concurrencia 'wal', el de las bases en disco local.
+
+Para 2, 4 y 8 procesos informa guardados/s, guardados fallidos, la demora
+p50/p95 de un guardado y los reintentos de BEGIN IMMEDIATE.
+
+Uso: python benchmarks/benchmark_escritores.py [SEGUNDOS] [FARDOS]
+"""
+
+import json
+import multiprocessing
+import os
+import statistics
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from base_de_datos.base_datos import BaseDatos
+from benchmark_base_datos import ConfiguracionPrueba, ticket_de_prueba
+
+SEGUNDOS = 3.0
+FARDOS = 40
+ESCRITORES = (2, 4, 8)
+VARIANTES = ("anterior", "cola", "wal")
+
+
+def guardar_como_antes(ruta_db: str, ticket) -> bool:
+    """Guardado de un ticket nuevo tal como lo hacía BaseDatos.guardar_ticket"""
+    try:
+        with sqlite3.connect(ruta_db, timeout=30) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM tickets WHERE numero = ?', (ticket.numero,))
+            cursor.fetchone()
+            cursor.execute('''
+                INSERT INTO tickets (numero, fecha_creacion, kg_bruto_romaneo, agregado, resto, observaciones)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (ticket.numero, ticket.fecha_creacion, None, 0.0, 0.0, ""))
+            ticket_id = cursor.lastrowid
+            for fardo in ticket.fardos:
+                cursor.execute('''
+                    INSERT INTO fardos (ticket_id, numero, peso, hora_pesaje,
+                                        hora_captura, tiempo_asentamiento, secuencia)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (ticket_id, fardo.numero, fardo.peso, fardo.hora_pesaje,
+                      fardo.hora_captura, fardo.tiempo_asentamiento, fardo.secuencia))
+            conn.commit()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def escritor(variante: str, config_file: str, numero: int, fardos: int, segundos: float, largada, resultados):
+    bd = BaseDatos(ConfiguracionPrueba(config_file))
+    tickets = [ticket_de_prueba(f"P{numero}-{i}", fardos) for i in range(5000)]
+    largada.wait()
+    fin = time.monotonic() + segundos
+    guardados = fallidos = 0
+    demoras = []
+    for ticket in tickets:
+        inicio = time.perf_counter()
+        if variante == "anterior":
+            correcto = guardar_como_antes(bd.ruta_db, ticket)
+        else:
+            correcto = bd.guardar_ticket(ticket, {})
+        demoras.append(time.perf_counter() - inicio)
+        guardados += correcto
+        fallidos += not correcto
+        if time.monotonic() >= fin:
+            break
+    resultados.put((guardados, fallidos, demoras, bd.reintentos_escritura))
+
+
+def medir(variante: str, procesos: int, fardos: int, segundos: float):
+    contexto = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as carpeta:
+        config_file = os.path.join(carpeta, "configuracion.json")
+        with open(config_file, "w", encoding="utf-8") as f:
+            json.dump({"base_datos": {"ruta_completa": os.path.join(carpeta, "pesaje.db"),
+                                      "backup_automatico": False,
+                                      "modo_concurrencia": "cola" if variante == "anterior" else variante}}, f)
+        BaseDatos(ConfiguracionPrueba(config_file)).cerrar()
+
+        largada = contexto.Barrier(procesos + 1)
+        resultados = contexto.Queue()
+        hijos = [contexto.Process(target=escritor,
+                                  args=(variante, config_file, n, fardos, segundos, largada, resultados))
+                 for n in range(procesos)]
+        for hijo in hijos:
+            hijo.start()
+        largada.wait()
+        datos = [resultados.get() for _ in hijos]
+        for hijo in hijos:
+            hijo.join()
+
+    demoras = sorted(d for r in datos for d in r[2])
+    return {
+        "guardados_s": sum(r[0] for r in datos) / segundos,
+        "fallidos": sum(r[1] for r in datos),
+        "p50_ms": statistics.median(demoras) * 1000,
+        "p95_ms": demoras[int(len(demoras) * 0.95)] * 1000,
+        "reintentos": sum(r[3] for r in datos),
+    }
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else SEGUNDOS
+    fardos = int(sys.argv[2]) if len(sys.argv) > 2 else FARDOS
+    print(f"{segundos:g} s por medición, tickets de {fardos} fardos, {os.cpu_count()} CPU")
+    print(f"{'variante':<9} {'procesos':>8} {'guardados/s':>12} {'fallidos':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'reintentos':>11}")
+    for variante in VARIANTES:
+        for procesos in ESCRITORES:
+            r = medir(variante, procesos, fardos, segundos)
+            print(f"{variante:<9} {procesos:8d} {r['guardados_s']:12.1f} {r['fallidos']:9d} {r['p50_ms']:8.2f} "
+                  f"{r['p95_ms']:8.2f} {r['reintentos']:11d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Volver a guardar un ticket grande después de un repeso.
+
+Guarda un ticket de FARDOS fardos en una base con TICKETS tickets más y
+después lo vuelve a guardar REPETICIONES veces, cambiando el peso de un
+solo fardo cada vez, de dos formas:
+
+- anterior: borra todos los fardos del ticket y los vuelve a insertar de a
+  uno, como hacía guardar_ticket;
+- diferencia: BaseDatos.guardar_ticket, que compara con lo guardado y sólo
+  escribe los fardos que cambiaron.
+
+Informa la mediana y el p95 en milisegundos y las filas de fardos escritas
+por guardado.
+
+Uso: python benchmarks/benchmark_guardado.py [FARDOS] [TICKETS]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from base_de_datos.base_datos import BaseDatos
+from benchmark_base_datos import ConfiguracionPrueba, poblar, ticket_de_prueba
+
+FARDOS = 400
+TICKETS = 1000
+REPETICIONES = 30
+
+
+def guardar_como_antes(conn, ticket):
+    """Borra y reinserta todos los fardos del ticket, como el guardado anterior"""
+    ticket_id = conn.execute('SELECT id FROM tickets WHERE numero = ?', (ticket.numero,)).fetchone()[0]
+    conn.execute('UPDATE tickets SET fecha_guardado = CURRENT_TIMESTAMP WHERE id = ?', (ticket_id,))
+    conn.execute('DELETE FROM fardos WHERE ticket_id = ?', (ticket_id,))
+    for fardo in ticket.fardos:
+        conn.execute('''
+            INSERT INTO fardos (ticket_id, numero, peso, hora_pesaje,
+                                hora_captura, tiempo_asentamiento, secuencia)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (ticket_id, fardo.numero, fardo.peso, fardo.hora_pesaje,
+              fardo.hora_captura, fardo.tiempo_asentamiento, fardo.secuencia))
+    return len(ticket.fardos) * 2
+
+
+def main():
+    fardos = int(sys.argv[1]) if len(sys.argv) > 1 else FARDOS
+    tickets = int(sys.argv[2]) if len(sys.argv) > 2 else TICKETS
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        config_file = os.path.join(carpeta, "configuracion.json")
+        with open(config_file, "w", encoding="utf-8") as f:
+            json.dump({"base_datos": {"ruta_completa": os.path.join(carpeta, "pesaje.db"),
+                                      "backup_automatico": False}}, f)
+        bd = BaseDatos(ConfiguracionPrueba(config_file))
+        poblar(bd.ruta_db, tickets, 100)
+        ticket = ticket_de_prueba("REPESO", fardos)
+        bd.guardar_ticket(ticket, {})
+        print(f"Ticket de {fardos} fardos en una base de {tickets} tickets, {REPETICIONES} guardados, "
+              f"modo {bd.modo_concurrencia}")
+
+        resultados = {}
+        for variante in ("anterior", "diferencia"):
+            tiempos = []
+            filas = []
+            for i in range(REPETICIONES):
+                ticket.fardos[i % fardos].peso += 0.5
+                inicio = time.perf_counter()
+                if variante == "anterior":
+                    filas.append(bd._escribir(guardar_como_antes, ticket))
+                else:
+                    bd.guardar_ticket(ticket, {})
+                    filas.append(bd.ultimos_cambios.total)
+                tiempos.append(time.perf_counter() - inicio)
+            tiempos.sort()
+            resultados[variante] = (statistics.median(tiempos) * 1000, tiempos[int(len(tiempos) * 0.95)] * 1000,
+                                    statistics.mean(filas))
+        bd.cerrar()
+
+    print(f"{'variante':<11} {'p50 ms':>8} {'p95 ms':>8} {'filas/guardado':>15}")
+    for variante, (p50, p95, filas) in resultados.items():
+        print(f"{variante:<11} {p50:8.2f} {p95:8.2f} {filas:15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Costo del historial de tickets según la cantidad de fardos por ticket.
+
+Arma bases con TICKETS tickets y 10, 100 y 400 fardos por ticket y mide el
+historial y la búsqueda de dos formas:
+
+- join: la consulta anterior, LEFT JOIN fardos con COUNT/SUM y GROUP BY;
+- resumen: BaseDatos.obtener_historial_tickets / buscar_tickets, que leen
+  cantidad_fardos y peso_total de tickets (los mantienen los triggers) por
+  el índice idx_tickets_historial, sin leer la tabla.
+
+También informa la carga inicial del resumen sobre una base sin esas
+columnas, el tiempo de guardar un ticket nuevo de 100 fardos con los
+triggers activos y el EXPLAIN QUERY PLAN de las consultas del historial,
+la búsqueda y el visor de tickets: ninguna debería ordenar con un B-tree
+temporal.
+
+Uso: python benchmarks/benchmark_historial.py [TICKETS]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from base_de_datos.base_datos import COLUMNAS_RESUMEN, BaseDatos
+from benchmark_base_datos import ConfiguracionPrueba, medir, poblar, ticket_de_prueba
+
+TICKETS = 2000
+FARDOS_POR_TICKET = (10, 100, 400)
+
+HISTORIAL_JOIN = '''
+    SELECT t.numero, t.fecha_creacion, COUNT(f.id) as cantidad_fardos,
+           COALESCE(SUM(f.peso), 0) as peso_total, t.fecha_guardado
+    FROM tickets t
+    LEFT JOIN fardos f ON t.id = f.ticket_id
+    WHERE t.estado = 'ACTIVO'
+    GROUP BY t.id, t.numero, t.fecha_creacion, t.fecha_guardado
+    ORDER BY t.fecha_guardado DESC
+'''
+
+BUSQUEDA_JOIN = '''
+    SELECT t.numero, t.fecha_creacion, COUNT(f.id) as cantidad_fardos,
+           COALESCE(SUM(f.peso), 0) as peso_total, t.fecha_guardado
+    FROM tickets t
+    LEFT JOIN fardos f ON t.id = f.ticket_id
+    WHERE t.estado = 'ACTIVO' AND
+          (t.numero LIKE ? OR date(t.fecha_creacion) LIKE ?)
+    GROUP BY t.id, t.numero, t.fecha_creacion, t.fecha_guardado
+    ORDER BY t.fecha_guardado DESC
+'''
+
+# Las de BaseDatos.obtener_historial_tickets / buscar_tickets y VisorTickets.cargar_tickets
+CONSULTAS_RESUMEN = {
+    "historial": '''
+        SELECT numero, fecha_creacion, cantidad_fardos, peso_total, fecha_guardado
+        FROM tickets
+        WHERE estado = 'ACTIVO'
+        ORDER BY fecha_guardado DESC
+    ''',
+    "buscar": '''
+        SELECT numero, fecha_creacion, cantidad_fardos, peso_total, fecha_guardado
+        FROM tickets
+        WHERE estado = 'ACTIVO' AND
+              (numero LIKE ? OR date(fecha_creacion) LIKE ?)
+        ORDER BY fecha_guardado DESC
+    ''',
+    "visor": '''
+        SELECT id, numero, fecha_creacion, cantidad_fardos, peso_total,
+               '' as operador, observaciones, kg_bruto_romaneo, agregado, resto
+        FROM tickets
+        WHERE estado = 'ACTIVO'
+        ORDER BY fecha_guardado DESC
+    ''',
+}
+
+
+def plan(conn, consulta: str) -> str:
+    """Pasos de EXPLAIN QUERY PLAN de una consulta, en una línea"""
+    parametros = ("",) * consulta.count("?")
+    return " / ".join(fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + consulta, parametros))
+
+
+def quitar_resumen(ruta_db: str):
+    """Deja la base como antes del resumen, para medir la carga inicial"""
+    with sqlite3.connect(ruta_db) as conn:
+        for (nombre,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+            conn.execute(f"DROP TRIGGER {nombre}")
+        conn.execute("DROP INDEX IF EXISTS idx_tickets_historial")
+        for columna in COLUMNAS_RESUMEN:
+            conn.execute(f"ALTER TABLE tickets DROP COLUMN {columna}")
+
+
+def main():
+    tickets = int(sys.argv[1]) if len(sys.argv) > 1 else TICKETS
+    print(f"{tickets} tickets, tiempos p50 en ms")
+    print(f"{'fardos/ticket':>13} {'MB':>6} {'historial join':>15} {'resumen':>8} {'buscar join':>12} "
+          f"{'resumen':>8} {'carga inicial':>14} {'guardar nuevo':>14}")
+    for fardos in FARDOS_POR_TICKET:
+        with tempfile.TemporaryDirectory() as carpeta:
+            config_file = os.path.join(carpeta, "configuracion.json")
+            with open(config_file, "w", encoding="utf-8") as f:
+                json.dump({"base_datos": {"ruta_completa": os.path.join(carpeta, "pesaje.db"),
+                                          "backup_automatico": False}}, f)
+            BaseDatos(ConfiguracionPrueba(config_file)).cerrar()
+            quitar_resumen(os.path.join(carpeta, "pesaje.db"))
+            poblar(os.path.join(carpeta, "pesaje.db"), tickets, fardos)
+
+            inicio = time.perf_counter()
+            bd = BaseDatos(ConfiguracionPrueba(config_file))
+            carga = (time.perf_counter() - inicio) * 1000
+            conn = sqlite3.connect(bd.ruta_db)
+            termino = (f"%T{tickets - 1:06d}%", f"%T{tickets - 1:06d}%")
+
+            historial_join = medir(lambda: conn.execute(HISTORIAL_JOIN).fetchall(), 5)[0]
+            historial = medir(bd.obtener_historial_tickets, 5)[0]
+            buscar_join = medir(lambda: conn.execute(BUSQUEDA_JOIN, termino).fetchall(), 5)[0]
+            buscar = medir(lambda: bd.buscar_tickets(f"T{tickets - 1:06d}"), 5)[0]
+            nuevos = iter(range(1000))
+            guardar = medir(lambda: bd.guardar_ticket(ticket_de_prueba(f"N{next(nuevos)}", 100), {}), 5)[0]
+            tamaño = bd.obtener_info_bd()['tamaño_mb']
+            planes = {nombre: plan(conn, consulta) for nombre, consulta in CONSULTAS_RESUMEN.items()}
+            conn.close()
+            bd.cerrar()
+        print(f"{fardos:13d} {tamaño:6.1f} {historial_join:15.2f} {historial:8.2f} {buscar_join:12.2f} "
+              f"{buscar:8.2f} {carga:14.0f} {guardar:14.2f}")
+
+    print("EXPLAIN QUERY PLAN de la última base:")
+    for nombre, pasos in planes.items():
+        aviso = "  <- ordena aparte" if "TEMP B-TREE" in pasos else ""
+        print(f"  {nombre:<10} {pasos}{aviso}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Compara los modos de lectura de BalanzaReader sobre un pseudo-terminal (Linux).
+
+- "sondeo": el bucle anterior (in_waiting + sleep de 10 ms)
+- "bloqueante": read() bloqueante que despierta al llegar los bytes
+
+Para cada modo se mide la CPU consumida sin datos, la demora entre que se
+escribe una trama y el momento en que aparece en leer_peso(), y la CPU con un
+flujo continuo a 9600 baudios.
+
+Uso: python benchmarks/benchmark_lectura_bloqueante.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tty
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import balanza_reader
+
+SEGUNDOS_INACTIVO = 3.0
+MUESTRAS_LATENCIA = 50
+SEGUNDOS_FLUJO = 3.0
+BAUDRATE = 9600
+
+
+def crear_configuracion(carpeta: str, puerto: str, modo: str) -> str:
+    """Escribe una configuración con una única balanza sobre el pseudo-terminal"""
+    config = {
+        "balanza_selected": "simulada",
+        "balanzas": {
+            "simulada": {
+                "nombre": "Balanza simulada",
+                "puerto": puerto,
+                "baudrate": BAUDRATE,
+                "bytesize": 8,
+                "parity": "none",
+                "stopbits": 1,
+                "timeout": 1,
+                "xonxoff": False,
+                "rtscts": False,
+                "dsrdtr": False,
+                "dtr": False,
+                "rts": False,
+                "unidad": "kg",
+                "modo_lectura": modo
+            }
+        }
+    }
+    ruta = os.path.join(carpeta, f"configuracion_{modo}.json")
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    return ruta
+
+
+def medir_modo(modo: str, carpeta: str):
+    """Conecta un lector en el modo indicado y devuelve sus mediciones"""
+    maestro, esclavo = os.openpty()
+    tty.setraw(esclavo)
+    ruta_config = crear_configuracion(carpeta, os.ttyname(esclavo), modo)
+
+    lector = balanza_reader.BalanzaReader(ruta_config)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        lector.conectar("simulada")
+        time.sleep(0.2)
+
+        # CPU sin datos (el hilo principal sólo duerme)
+        cpu_inicio = time.process_time()
+        time.sleep(SEGUNDOS_INACTIVO)
+        cpu_inactivo = (time.process_time() - cpu_inicio) / SEGUNDOS_INACTIVO * 100
+
+        # Latencia byte -> leer_peso()
+        latencias = []
+        for i in range(MUESTRAS_LATENCIA):
+            peso = 1000.0 + i
+            trama = b"ST,GS,+%07.1fkg\r\n" % peso
+            # Pausa aleatoria para no quedar en fase con el sondeo de 10 ms
+            time.sleep(0.02 + random.uniform(0, 0.01))
+            inicio = time.perf_counter()
+            os.write(maestro, trama)
+            while lector.leer_peso() != peso:
+                time.sleep(0.0001)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+        # CPU con un flujo continuo a velocidad de línea
+        detener = threading.Event()
+
+        def escribir():
+            trama = b"ST,GS,+0001234.5kg\r\n"
+            pausa = len(trama) * 10 / BAUDRATE
+            while not detener.is_set():
+                os.write(maestro, trama)
+                time.sleep(pausa)
+
+        escritor = threading.Thread(target=escribir, daemon=True)
+        escritor.start()
+        cpu_inicio = time.process_time()
+        time.sleep(SEGUNDOS_FLUJO)
+        cpu_flujo = (time.process_time() - cpu_inicio) / SEGUNDOS_FLUJO * 100
+        detener.set()
+        escritor.join()
+
+        inicio = time.perf_counter()
+        lector.desconectar()
+        cierre = (time.perf_counter() - inicio) * 1000
+
+    os.close(maestro)
+    os.close(esclavo)
+    return cpu_inactivo, latencias, cpu_flujo, cierre
+
+
+def main():
+    if not hasattr(os, "openpty"):
+        print("Este benchmark necesita pseudo-terminales (Linux)")
+        return
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        for modo in ("sondeo", "bloqueante"):
+            cpu_inactivo, latencias, cpu_flujo, cierre = medir_modo(modo, carpeta)
+            latencias.sort()
+            print(f"\nModo {modo}")
+            print(f"  CPU sin datos:           {cpu_inactivo:6.3f} %")
+            print(f"  Latencia media:          {statistics.mean(latencias):6.2f} ms")
+            print(f"  Latencia p95:            {latencias[int(len(latencias) * 0.95) - 1]:6.2f} ms")
+            print(f"  CPU con flujo {BAUDRATE} bd: {cpu_flujo:6.3f} % (incluye el hilo que escribe)")
+            print(f"  Tiempo de desconexión:   {cierre:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Lecturas de la memoria compartida mientras otro proceso escribe sin pausa.
+
+Un proceso escritor publica en un bloque MemoriaPeso lo más rápido que
+puede, con peso = secuencia y tara = -secuencia, y agrega una muestra a la
+ventana en cada escritura. N procesos lectores llaman a leer_peso() y
+leer() sin pausa y verifican que cada lectura completa sea consistente: si
+el seqlock dejara pasar una lectura a mitad de una escritura, peso y tara
+no coincidirían.
+
+Para cada cantidad de lectores se informa escrituras/s, lecturas/s totales,
+la demora p50/p99 de leer_peso() y de leer() y las lecturas inconsistentes
+(debe ser 0).
+
+Uso: python benchmarks/benchmark_memoria.py
+"""
+
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from balanza.memoria import MemoriaPeso
+from balanza.protocolos import Lectura
+
+SEGUNDOS = 2.0
+LECTORES = (1, 2, 4)
+
+
+def escribir(nombre: str, detener, escrituras):
+    memoria = MemoriaPeso.abrir(nombre)
+    secuencia = 0
+    while not detener.is_set():
+        secuencia += 1
+        memoria.escribir(secuencia, time.monotonic(), time.time(), Lectura(float(secuencia), True, "kg",
+                                                                          -float(secuencia)),
+                         None, [(float(secuencia), 0.0)])
+    escrituras.value = secuencia
+    memoria.cerrar()
+
+
+def consultar(nombre: str, detener, resultados):
+    memoria = MemoriaPeso.abrir(nombre)
+    lecturas = 0
+    inconsistentes = 0
+    demoras_peso = []
+    demoras_lectura = []
+    reloj = time.perf_counter
+    while not detener.is_set():
+        inicio = reloj()
+        memoria.leer_peso()
+        medio = reloj()
+        estado = memoria.leer()
+        fin = reloj()
+        lectura = estado.lectura if estado is not None else None
+        if lectura is not None and (lectura.peso != estado.secuencia or lectura.tara != -lectura.peso):
+            inconsistentes += 1
+        if lecturas % 64 == 0:
+            demoras_peso.append(medio - inicio)
+            demoras_lectura.append(fin - medio)
+        lecturas += 1
+    memoria.cerrar()
+    resultados.put((lecturas, inconsistentes, demoras_peso, demoras_lectura))
+
+
+def percentil(valores: list, fraccion: float) -> float:
+    valores = sorted(valores)
+    return valores[int(len(valores) * fraccion)] * 1e6 if valores else 0.0
+
+
+def medir(cantidad_lectores: int):
+    contexto = multiprocessing.get_context("spawn")
+    memoria = MemoriaPeso.crear()
+    detener = contexto.Event()
+    escrituras = contexto.Value("q", 0)
+    resultados = contexto.Queue()
+    procesos = [contexto.Process(target=escribir, args=(memoria.nombre, detener, escrituras))]
+    procesos += [contexto.Process(target=consultar, args=(memoria.nombre, detener, resultados))
+                 for _ in range(cantidad_lectores)]
+    for proceso in procesos:
+        proceso.start()
+    time.sleep(SEGUNDOS)
+    detener.set()
+    consultas = [resultados.get() for _ in range(cantidad_lectores)]
+    for proceso in procesos:
+        proceso.join()
+    memoria.cerrar()
+
+    demoras_peso = [d for r in consultas for d in r[2]]
+    demoras_lectura = [d for r in consultas for d in r[3]]
+    return {
+        "escrituras_s": escrituras.value / SEGUNDOS,
+        "lecturas_s": sum(r[0] for r in consultas) / SEGUNDOS,
+        "peso_p50_us": statistics.median(demoras_peso) * 1e6,
+        "peso_p99_us": percentil(demoras_peso, 0.99),
+        "leer_p50_us": statistics.median(demoras_lectura) * 1e6,
+        "leer_p99_us": percentil(demoras_lectura, 0.99),
+        "inconsistentes": sum(r[1] for r in consultas),
+    }
+
+
+def main():
+    print(f"{'lectores':>8} {'escrituras/s':>13} {'lecturas/s':>11} {'peso p50':>9} {'peso p99':>9} "
+          f"{'leer p50':>9} {'leer p99':>9} {'inconsistentes':>15}")
+    for cantidad in LECTORES:
+        r = medir(cantidad)
+        print(f"{cantidad:8d} {r['escrituras_s']:13,.0f} {r['lecturas_s']:11,.0f} {r['peso_p50_us']:9.2f} "
+              f"{r['peso_p99_us']:9.2f} {r['leer_p50_us']:9.2f} {r['leer_p99_us']:9.2f} "
+              f"{r['inconsistentes']:15d}")
+
+
+if __name__ == "__main__":
+    main()
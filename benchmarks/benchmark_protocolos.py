@@ -0,0 +1,79 @@
+"""
+Compara la interpretación de tramas con los protocolos registrados contra la
+búsqueda genérica anterior (decodificar a str + re.search en cada línea).
+
+Para cada formato muestra tramas/s de ambos métodos y el resultado que obtiene
+cada uno sobre una trama de ejemplo.
+
+Uso: python benchmarks/benchmark_protocolos.py
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from balanza.protocolos import crear_protocolo
+
+REPETICIONES = 200000
+
+
+def extraer_peso_anterior(trama):
+    """Método anterior de BalanzaReader.extraer_peso, con la decodificación previa"""
+    texto = str(trama, 'ascii', 'ignore').strip()
+    match = re.search(r'[-+]?\d*\.?\d+', texto)
+    if match:
+        try:
+            return float(match.group())
+        except ValueError:
+            return None
+    return None
+
+
+def trama_stx(peso: int, tara: int, negativo: bool = False, movimiento: bool = False) -> bytes:
+    """Arma un registro STX con punto decimal en XXXXX.X y unidad kg"""
+    swa = 0x20 | 0x03
+    swb = 0x20 | 0x10 | (0x02 if negativo else 0) | (0x08 if movimiento else 0)
+    swc = 0x20
+    return bytes([0x02, swa, swb, swc]) + b"%06d%06d" % (peso, tara)
+
+
+EJEMPLOS = {
+    "continuo_ascii": [b"ST,GS,+0001234.5kg", b"US,GS,+0001236.0kg", b"ST,NT,-0000012.5kg"],
+    "stx_etx": [trama_stx(12345, 200), trama_stx(12360, 200, movimiento=True), trama_stx(125, 0, negativo=True)],
+    "solicitud_respuesta": [b"   1234.5 kg", b"   1236.0 kg", b"-    12.5 kg"],
+}
+
+
+def medir(funcion, tramas, rondas: int = 5) -> float:
+    """Devuelve tramas interpretadas por segundo (mejor de varias rondas)"""
+    vistas = [memoryview(t) for t in tramas]
+    cantidad = REPETICIONES // len(vistas)
+    mejor = float("inf")
+    for _ in range(rondas):
+        inicio = time.perf_counter()
+        for _ in range(cantidad):
+            for vista in vistas:
+                funcion(vista)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return cantidad * len(vistas) / mejor
+
+
+def main():
+    for nombre, tramas in EJEMPLOS.items():
+        protocolo = crear_protocolo({"protocolo": nombre})
+        anterior = medir(extraer_peso_anterior, tramas)
+        nuevo = medir(protocolo.parsear, tramas)
+        print(f"\n{nombre}")
+        print(f"  anterior   {anterior:>12,.0f} tramas/s")
+        print(f"  protocolo  {nuevo:>12,.0f} tramas/s  ({nuevo / anterior:.2f}x)")
+        for trama in tramas:
+            print(f"    {trama!r}")
+            print(f"      anterior:  {extraer_peso_anterior(memoryview(trama))}")
+            print(f"      protocolo: {protocolo.parsear(memoryview(trama))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Contención entre el hilo de lectura y los hilos que consultan el peso.
+
+El hilo escritor procesa tramas con BalanzaReader._procesar_datos lo más
+rápido que puede mientras N hilos lectores llaman a leer_peso() y
+leer_publicacion() sin pausa, como harían la interfaz, get_status y otros
+consumidores. Se compara:
+
+- "lock": la publicación anterior, con escritura y lectura bajo _data_lock
+- "sin lock": la Publicacion inmutable reemplazada con una sola asignación
+
+Para cada cantidad de lectores se informa tramas/s del escritor, lecturas/s
+totales, la demora p50/p99 de cada lectura y cuántas publicaciones nuevas
+detectó cada lector por la secuencia.
+
+Uso: python benchmarks/benchmark_publicacion.py
+"""
+
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from balanza.protocolos import crear_protocolo
+from balanza_reader import BalanzaReader
+
+SEGUNDOS = 2.0
+LECTORES = (0, 1, 2, 4, 8)
+CONFIG = {
+    "balanza_selected": "simulada",
+    "balanzas": {"simulada": {"nombre": "Balanza simulada", "puerto": "ninguno", "unidad": "kg",
+                              "protocolo": "continuo_ascii"}}
+}
+
+
+class LectorConLock(BalanzaReader):
+    """Publicación como antes: el escritor y cada consulta toman el mismo lock"""
+
+    def __init__(self, *args, **kwargs):
+        self._lock_publicacion = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    @property
+    def _publicacion(self):
+        with self._lock_publicacion:
+            return self.__dict__["_publicacion_protegida"]
+
+    @_publicacion.setter
+    def _publicacion(self, valor):
+        with self._lock_publicacion:
+            self.__dict__["_publicacion_protegida"] = valor
+
+
+def bloques() -> list:
+    """Bloques de 32 bytes con tramas de peso variable, como los entrega el puerto"""
+    datos = b"".join(b"ST,GS,+%09.1fkg\r\n" % (200 + (i % 50) / 10) for i in range(2000))
+    return [datos[i:i + 32] for i in range(0, len(datos), 32)]
+
+
+def medir(clase, cantidad_lectores: int):
+    balanza = CONFIG["balanzas"]["simulada"]
+    lector = clase(config=CONFIG)
+    lector._preparar_lectura(balanza, crear_protocolo(balanza))
+    lector._connected = True
+    datos = bloques()
+    detener = threading.Event()
+    resultados = []
+
+    def escribir():
+        while not detener.is_set():
+            for bloque in datos:
+                lector._procesar_datos(bloque)
+
+    def consultar():
+        lecturas = 0
+        nuevas = 0
+        ultima = 0
+        demoras = []
+        reloj = time.perf_counter
+        while not detener.is_set():
+            inicio = reloj()
+            lector.leer_peso()
+            publicacion = lector.leer_publicacion()
+            if lecturas % 64 == 0:
+                demoras.append(reloj() - inicio)
+            if publicacion.secuencia != ultima:
+                ultima = publicacion.secuencia
+                nuevas += 1
+            lecturas += 1
+        resultados.append((lecturas, nuevas, demoras))
+
+    hilos = [threading.Thread(target=escribir)] + [threading.Thread(target=consultar)
+                                                   for _ in range(cantidad_lectores)]
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(SEGUNDOS)
+    detener.set()
+    for hilo in hilos:
+        hilo.join()
+
+    tramas = lector._metricas.tramas
+    consultas = resultados
+    demoras = sorted(d for r in consultas for d in r[2])
+    return {
+        "tramas_s": tramas / SEGUNDOS,
+        "lecturas_s": sum(r[0] for r in consultas) / SEGUNDOS,
+        "p50_us": statistics.median(demoras) * 1e6 if demoras else 0.0,
+        "p99_us": demoras[int(len(demoras) * 0.99)] * 1e6 if demoras else 0.0,
+        "nuevas": statistics.mean(r[1] for r in consultas) / SEGUNDOS if consultas else 0.0,
+    }
+
+
+def main():
+    print(f"{'modo':>9} {'lectores':>8} {'tramas/s':>10} {'lecturas/s':>11} "
+          f"{'p50 µs':>7} {'p99 µs':>7} {'nuevas/s':>9}")
+    for cantidad in LECTORES:
+        for nombre, clase in (("lock", LectorConLock), ("sin lock", BalanzaReader)):
+            r = medir(clase, cantidad)
+            print(f"{nombre:>9} {cantidad:8d} {r['tramas_s']:10,.0f} {r['lecturas_s']:11,.0f} "
+                  f"{r['p50_us']:7.2f} {r['p99_us']:7.2f} {r['nuevas']:9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Reproduce capturas crudas del puerto a través de BalanzaReader, sin balanza.
+
+Sin argumentos genera una captura sintética (cargas, asentamiento con ruido,
+vuelta a cero) a 9600 baudios y mide:
+
+- el costo de CapturaSerial.registrar por bloque
+- tramas/s del armado + interpretación + estabilidad a velocidad máxima
+- la exactitud de los tiempos al reproducir a 1x y 10x
+
+Con una ruta reproduce esa captura a velocidad máxima y muestra el resumen.
+
+Uso: python benchmarks/benchmark_reproduccion.py [captura.bzcap]
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from balanza.captura import CapturaSerial, LectorCaptura
+from balanza_reader import BalanzaReader
+
+BAUDRATE = 9600
+FARDOS = 400
+CONFIG_BALANZA = {
+    "nombre": "Balanza simulada",
+    "puerto": "captura",
+    "unidad": "kg",
+    "protocolo": "continuo_ascii",
+    "estabilidad": {"muestras": 10, "tolerancia": 0.5, "desviacion_max": None, "tiempo_minimo": 0.0}
+}
+
+
+def tramas_fardo(peso: float):
+    """Tramas de un fardo: subida, asentamiento con ruido y vuelta a cero"""
+    for i in range(10):
+        yield b"US,GS,+%09.1fkg\r\n" % (peso * i / 10)
+    for _ in range(40):
+        yield b"ST,GS,+%09.1fkg\r\n" % (peso + random.uniform(-0.2, 0.2))
+    for _ in range(10):
+        yield b"ST,GS,+%09.1fkg\r\n" % 0.0
+
+
+def crear_captura(ruta: str, fardos: int) -> int:
+    """Escribe una captura sintética cortada en bloques como los entrega el puerto"""
+    captura = CapturaSerial(ruta, {"balanza": "simulada", "config": CONFIG_BALANZA})
+    segundos_por_byte = 10 / BAUDRATE
+    tiempo_ns = time.monotonic_ns()
+    pendiente = b""
+    for _ in range(fardos):
+        for trama in tramas_fardo(random.uniform(150, 260)):
+            pendiente += trama
+            while len(pendiente) > 32:
+                largo = random.randint(1, 32)
+                tiempo_ns += int(largo * segundos_por_byte * 1e9)
+                captura.registrar(pendiente[:largo], tiempo_ns)
+                pendiente = pendiente[largo:]
+    captura.registrar(pendiente, tiempo_ns)
+    captura.cerrar()
+    return captura.bloques
+
+
+def medir_registro(carpeta: str) -> float:
+    """Microsegundos por bloque de CapturaSerial.registrar"""
+    captura = CapturaSerial(os.path.join(carpeta, "costo.bzcap"))
+    bloque = b"ST,GS,+0001234.5kg\r\n"
+    cantidad = 200000
+    inicio = time.perf_counter()
+    for _ in range(cantidad):
+        captura.registrar(bloque)
+    captura.cerrar()
+    return (time.perf_counter() - inicio) / cantidad * 1e6
+
+
+def reproducir(ruta: str, velocidad: float):
+    """Reproduce la captura y devuelve (segundos, lecturas, pesos estables)"""
+    lector = BalanzaReader(os.path.join(os.path.dirname(ruta), "configuracion.json"))
+    estables = []
+    lecturas = [0]
+
+    def contar(lectura, estable):
+        lecturas[0] += 1
+        if estable is not None:
+            estables.append(estable.peso)
+
+    lector.suscribir(contar)
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        lector.reproducir_captura(ruta, velocidad)
+        lector.esperar_reproduccion()
+        duracion = time.perf_counter() - inicio
+        lector.desconectar()
+    return duracion, lecturas[0], len(estables)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as carpeta:
+        with open(os.path.join(carpeta, "configuracion.json"), "w", encoding="utf-8") as f:
+            json.dump({"balanza_selected": "simulada", "balanzas": {"simulada": CONFIG_BALANZA}}, f)
+
+        if len(sys.argv) > 1:
+            ruta = sys.argv[1]
+            print(f"Captura: {LectorCaptura(ruta).resumen()}")
+            duracion, lecturas, estables = reproducir(ruta, 0)
+            print(f"Reproducida en {duracion:.2f} s: {lecturas} cambios de peso, {estables} con peso estable")
+            return
+
+        print(f"Costo de captura: {medir_registro(carpeta):.2f} µs por bloque")
+
+        ruta = os.path.join(carpeta, "sintetica.bzcap")
+        bloques = crear_captura(ruta, FARDOS)
+        resumen = LectorCaptura(ruta).resumen()
+        tramas = FARDOS * 60
+        print(f"Captura sintética: {bloques} bloques, {resumen['bytes']} bytes, "
+              f"{tramas} tramas, {resumen['duracion']:.1f} s de balanza "
+              f"({os.path.getsize(ruta)} bytes en disco)")
+
+        duracion, lecturas, estables = reproducir(ruta, 0)
+        print(f"\nVelocidad máxima: {duracion:.2f} s, {tramas / duracion:,.0f} tramas/s "
+              f"({resumen['duracion'] / duracion:.0f}x tiempo real)")
+        print(f"  {lecturas} notificaciones, {estables} con peso estable")
+
+        corta = os.path.join(carpeta, "corta.bzcap")
+        crear_captura(corta, 8)
+        esperado = LectorCaptura(corta).resumen()["duracion"]
+        for velocidad in (1, 10):
+            duracion, _, _ = reproducir(corta, velocidad)
+            objetivo = esperado / velocidad
+            print(f"\nVelocidad {velocidad}x: esperado {objetivo:.3f} s, medido {duracion:.3f} s "
+                  f"(desvío {(duracion - objetivo) * 1000:+.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
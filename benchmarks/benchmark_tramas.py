@@ -0,0 +1,165 @@
+"""
+Micro-benchmark del armado de tramas del lector de balanza.
+
+Compara el método anterior (un byte por lectura y concatenación de str) con
+ArmadorTramas (bloques completos sobre un buffer fijo). Los bloques se arman
+con la cantidad de bytes que llega en cada vuelta del hilo de lectura (10 ms)
+a 9600 y 115200 baudios.
+
+La primera parte mide sólo el armado en memoria. En Linux, la segunda parte
+lee el mismo flujo desde un pseudo-terminal con pyserial, para incluir el
+costo de las llamadas al sistema (una por byte en el método anterior).
+
+Uso: python benchmarks/benchmark_tramas.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from balanza.tramas import ArmadorTramas
+
+TRAMAS = 50000
+INTERVALO_LECTURA = 0.01  # segundos entre lecturas del hilo
+
+
+def generar_flujo(cantidad: int) -> bytes:
+    """Genera un flujo de tramas ASCII con terminador CRLF"""
+    return b"".join(b"ST,GS,+%08.1fkg\r\n" % (1000 + (i % 500) * 0.5) for i in range(cantidad))
+
+
+def partir(flujo: bytes, tamanio: int):
+    """Divide el flujo en bloques del tamaño indicado"""
+    return [flujo[i:i + tamanio] for i in range(0, len(flujo), tamanio)]
+
+
+def metodo_anterior(flujo: bytes) -> int:
+    """Reproduce el bucle original: un byte por vuelta y buffer str"""
+    buffer = ""
+    tramas = 0
+    for i in range(len(flujo)):
+        byte = flujo[i:i + 1].decode('ascii', errors='ignore')
+        if byte in ['\r', '\n']:
+            if buffer.strip():
+                texto = buffer.strip()
+                tramas += 1
+            buffer = ""
+        else:
+            buffer += byte
+    return tramas
+
+
+def metodo_armador(bloques) -> int:
+    """Arma las tramas con ArmadorTramas y las decodifica como lo hace el lector"""
+    armador = ArmadorTramas()
+    tramas = 0
+    for bloque in bloques:
+        for trama in armador.alimentar(bloque):
+            texto = str(trama, 'ascii', 'ignore').strip()
+            if texto:
+                tramas += 1
+    return tramas
+
+
+def medir(nombre: str, funcion, argumento, bytes_por_trama: float, baudrate: int):
+    """Ejecuta y reporta tramas/seg y CPU por trama"""
+    inicio_cpu = time.process_time()
+    inicio = time.perf_counter()
+    tramas = funcion(argumento)
+    duracion = time.perf_counter() - inicio
+    cpu = time.process_time() - inicio_cpu
+
+    cpu_por_trama_us = cpu / tramas * 1e6
+    tramas_linea = baudrate / 10 / bytes_por_trama  # 8N1: 10 bits por byte
+    carga = cpu_por_trama_us * tramas_linea / 1e4  # % de un núcleo a velocidad de línea
+    print(f"  {nombre:<10} {tramas / duracion:>12,.0f} tramas/s  "
+          f"{cpu_por_trama_us:>7.2f} µs CPU/trama  "
+          f"{carga:>6.3f} % CPU a {tramas_linea:,.0f} tramas/s de línea")
+
+
+def leer_puerto_anterior(ser, total_tramas: int) -> int:
+    """Lectura original sobre un puerto real: in_waiting y read() de a un byte"""
+    buffer = ""
+    tramas = 0
+    while tramas < total_tramas:
+        if ser.in_waiting:
+            byte = ser.read().decode('ascii', errors='ignore')
+            if byte in ['\r', '\n']:
+                if buffer.strip():
+                    tramas += 1
+                buffer = ""
+            else:
+                buffer += byte
+        else:
+            time.sleep(INTERVALO_LECTURA)
+    return tramas
+
+
+def leer_puerto_armador(ser, total_tramas: int) -> int:
+    """Lectura por bloques: todo lo disponible en una llamada"""
+    armador = ArmadorTramas()
+    tramas = 0
+    while tramas < total_tramas:
+        pendientes = ser.in_waiting
+        if pendientes:
+            for trama in armador.alimentar(ser.read(pendientes)):
+                if str(trama, 'ascii', 'ignore').strip():
+                    tramas += 1
+        else:
+            time.sleep(INTERVALO_LECTURA)
+    return tramas
+
+
+def medir_puerto(nombre: str, lectura, flujo: bytes, total_tramas: int, baudrate: int):
+    """Escribe el flujo en un pseudo-terminal a la velocidad de línea y mide al lector"""
+    import serial
+    import tty
+
+    maestro, esclavo = os.openpty()
+    tty.setraw(esclavo)
+    ser = serial.Serial(os.ttyname(esclavo), baudrate=baudrate, timeout=1)
+    tamanio_bloque = max(1, int(baudrate / 10 * INTERVALO_LECTURA))
+
+    def escribir():
+        for i in range(0, len(flujo), tamanio_bloque):
+            os.write(maestro, flujo[i:i + tamanio_bloque])
+            time.sleep(INTERVALO_LECTURA)
+
+    escritor = threading.Thread(target=escribir, daemon=True)
+    escritor.start()
+    inicio_cpu = time.thread_time()
+    tramas = lectura(ser, total_tramas)
+    cpu = time.thread_time() - inicio_cpu
+    escritor.join()
+    ser.close()
+    os.close(maestro)
+    os.close(esclavo)
+    print(f"  {nombre:<10} {cpu / tramas * 1e6:>7.2f} µs CPU/trama del hilo lector "
+          f"({tramas} tramas)")
+
+
+def main():
+    flujo = generar_flujo(TRAMAS)
+    bytes_por_trama = len(flujo) / TRAMAS
+
+    for baudrate in (9600, 115200):
+        tamanio_bloque = max(1, int(baudrate / 10 * INTERVALO_LECTURA))
+        bloques = partir(flujo, tamanio_bloque)
+        print(f"\n{baudrate} baudios (bloques de {tamanio_bloque} bytes, {TRAMAS} tramas)")
+        medir("anterior", metodo_anterior, flujo, bytes_por_trama, baudrate)
+        medir("armador", metodo_armador, bloques, bytes_por_trama, baudrate)
+
+    if not hasattr(os, "openpty"):
+        return
+    for baudrate, cantidad in ((9600, 100), (115200, 1000)):
+        flujo = generar_flujo(cantidad)
+        print(f"\n{baudrate} baudios desde pseudo-terminal ({cantidad} tramas a velocidad de línea)")
+        medir_puerto("anterior", leer_puerto_anterior, flujo, cantidad, baudrate)
+        medir_puerto("armador", leer_puerto_armador, flujo, cantidad, baudrate)
+
+
+if __name__ == "__main__":
+    main()
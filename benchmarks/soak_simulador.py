@@ -0,0 +1,156 @@
+"""
+Prueba de larga duración de BalanzaReader contra la balanza simulada (Linux).
+
+El simulador corre en otro proceso, así que la CPU y la memoria medidas son
+sólo las del lector. Cada intervalo muestra tramas/s, CPU, memoria residente
+y resincronizaciones; al final compara las tramas enviadas con las armadas.
+Con --reconectar-cada se reinicia el simulador periódicamente y se mide
+cuánto tarda el lector en volver a recibir datos.
+
+Uso: python benchmarks/soak_simulador.py --segundos 3600 --tps 20 --perdida 0.01 --rafagas 0.01
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from balanza_reader import BalanzaReader
+
+salida = sys.__stdout__
+
+
+def memoria_residente() -> float:
+    """MB de memoria residente del proceso"""
+    with open("/proc/self/statm") as f:
+        paginas = int(f.read().split()[1])
+    return paginas * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+class ProcesoSimulador:
+    """Lanza python -m balanza.simulador y recoge sus estadísticas al terminar"""
+
+    def __init__(self, args, enlace: str):
+        self.comando = [sys.executable, "-m", "balanza.simulador", "--enlace", enlace,
+                        "--protocolo", args.protocolo, "--baudrate", str(args.baudrate),
+                        "--tps", str(args.tps), "--perdida", str(args.perdida),
+                        "--rafagas", str(args.rafagas)]
+        self.enlace = enlace
+        self.proceso = None
+        self.totales = {}
+
+    def iniciar(self):
+        self.proceso = subprocess.Popen(self.comando, cwd=RAIZ, stdout=subprocess.PIPE, text=True)
+        self.proceso.stdout.readline()  # Espera a que el pty esté listo
+
+    def detener(self):
+        self.proceso.terminate()
+        for linea in self.proceso.communicate(timeout=10)[0].splitlines():
+            if linea.startswith("ESTADISTICAS "):
+                for clave, valor in json.loads(linea.split(" ", 1)[1]).items():
+                    self.totales[clave] = self.totales.get(clave, 0) + valor
+
+
+def esperar_datos(lector: BalanzaReader, tramas_antes: int, limite: float) -> float:
+    """Segundos hasta que el lector arma una trama nueva (o -1 si no se recupera)"""
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < limite:
+        if lector._armador.tramas > tramas_antes:
+            return time.perf_counter() - inicio
+        time.sleep(0.01)
+    return -1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de larga duración con la balanza simulada")
+    parser.add_argument("--segundos", type=float, default=60.0)
+    parser.add_argument("--intervalo", type=float, default=10.0, help="Segundos entre reportes")
+    parser.add_argument("--protocolo", default="continuo_ascii")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--tps", type=float, default=20.0)
+    parser.add_argument("--perdida", type=float, default=0.0)
+    parser.add_argument("--rafagas", type=float, default=0.0)
+    parser.add_argument("--reconectar-cada", type=float, default=0.0,
+                        help="Reinicia el simulador cada N segundos (0 = nunca)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "openpty"):
+        print("Esta prueba necesita pseudo-terminales (Linux)")
+        return
+
+    with tempfile.TemporaryDirectory() as carpeta, open(os.devnull, "w") as nulo:
+        enlace = os.path.join(carpeta, "balanza_sim")
+        simulador = ProcesoSimulador(args, enlace)
+        simulador.iniciar()
+
+        ruta_config = os.path.join(carpeta, "configuracion.json")
+        balanza = {"nombre": "Balanza simulada", "puerto": enlace, "baudrate": args.baudrate,
+                   "bytesize": 8, "parity": "none", "stopbits": 1, "timeout": 1,
+                   "xonxoff": False, "rtscts": False, "dsrdtr": False, "dtr": False, "rts": False,
+                   "unidad": "kg", "protocolo": args.protocolo}
+        with open(ruta_config, "w", encoding="utf-8") as f:
+            json.dump({"balanza_selected": "simulada", "balanzas": {"simulada": balanza}}, f)
+
+        lector = BalanzaReader(ruta_config)
+        estables = [0]
+        lector.suscribir(lambda lectura, estable: estable is not None and estables.__setitem__(0, estables[0] + 1))
+
+        with contextlib.redirect_stdout(nulo):
+            lector.conectar("simulada")
+            inicio = time.perf_counter()
+            memoria_inicial = memoria_residente()
+            print(f"{'seg':>6} {'tramas/s':>9} {'CPU %':>6} {'RSS MB':>7} {'resinc':>7} {'estables':>9}", file=salida)
+
+            ultimo = inicio
+            cpu_anterior = time.process_time()
+            tramas_anteriores = 0
+            proxima_reconexion = inicio + args.reconectar_cada if args.reconectar_cada else None
+            recuperaciones = []
+
+            while time.perf_counter() - inicio < args.segundos:
+                time.sleep(args.intervalo)
+
+                if proxima_reconexion and time.perf_counter() >= proxima_reconexion:
+                    simulador.detener()
+                    time.sleep(1.0)
+                    tramas_antes = lector._armador.tramas
+                    simulador.iniciar()
+                    recuperaciones.append(esperar_datos(lector, tramas_antes, 30.0))
+                    proxima_reconexion = time.perf_counter() + args.reconectar_cada
+
+                ahora = time.perf_counter()
+                cpu = time.process_time()
+                tramas = lector._armador.tramas
+                print(f"{ahora - inicio:6.0f} {(tramas - tramas_anteriores) / (ahora - ultimo):9.1f} "
+                      f"{(cpu - cpu_anterior) / (ahora - ultimo) * 100:6.2f} {memoria_residente():7.1f} "
+                      f"{lector._armador.resincronizaciones:7d} {estables[0]:9d}", file=salida)
+                ultimo, cpu_anterior, tramas_anteriores = ahora, cpu, tramas
+
+            lector.desconectar()
+        simulador.detener()
+
+    enviadas = simulador.totales.get("tramas", 0)
+    armadas = lector._armador.tramas
+    print(f"\nTramas enviadas:   {enviadas}", file=salida)
+    print(f"Tramas armadas:    {armadas} ({enviadas - armadas} perdidas, "
+          f"{(enviadas - armadas) / max(enviadas, 1) * 100:.3f} %)", file=salida)
+    print(f"Bytes perdidos a propósito: {simulador.totales.get('bytes_perdidos', 0)}, "
+          f"ráfagas: {simulador.totales.get('rafagas', 0)}, desbordes del pty: {simulador.totales.get('desbordes', 0)}",
+          file=salida)
+    print(f"Memoria residente: {memoria_inicial:.1f} MB -> {memoria_residente():.1f} MB", file=salida)
+    if recuperaciones:
+        fallidas = sum(1 for r in recuperaciones if r < 0)
+        validas = [r for r in recuperaciones if r >= 0]
+        print(f"Reconexiones: {len(recuperaciones)}, sin recuperar: {fallidas}" +
+              (f", recuperación media {sum(validas) / len(validas):.2f} s" if validas else ""), file=salida)
+
+
+if __name__ == "__main__":
+    main()
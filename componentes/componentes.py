@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk
 
+from base_de_datos.modelos_bd import calcular_rinde
+
 class Header:
     def __init__(self, parent):
         self.parent = parent
@@ -193,13 +195,11 @@ class SeccionEntrada:
             agregado = float(self.entry_agregado.get() or 0)
             kg_bruto = float(self.entry_kg_bruto.get() or 0)
             
-            # Calcular tara (2kg por fardo)
+            # Calcular rinde con la tara por fardo del ticket, igual que al guardarlo
             cantidad_fardos = len(self.controlador.fardos_data)
-            tara = cantidad_fardos * 2  # 2kg por fardo
-            
-            # Calcular rinde
-            if kg_bruto > 0:
-                rinde = ((peso_total_fardos + resto - agregado - tara) / kg_bruto) * 100
+            rinde = calcular_rinde(peso_total_fardos, cantidad_fardos, kg_bruto, agregado, resto,
+                                   self.controlador.tara_por_fardo)
+            if rinde is not None:
                 self.label_rinde.config(text=f"{rinde:.2f} %")
             else:
                 self.label_rinde.config(text="N/A")
@@ -256,12 +256,33 @@ class SeccionPesoControles:
                                  relief=tk.FLAT, bd=0, cursor='hand2', padx=5, pady=3)
         self.btn_pesar.pack(side=tk.LEFT)
         
+        # Captura automática: registra cada fardo al estabilizarse, sin presionar PESAR
+        self.check_autocaptura = tk.Checkbutton(buttons_frame, text="Automático",
+                                                variable=self.controlador.autocaptura_activa,
+                                                command=self.controlador.cambiar_autocaptura,
+                                                font=('Arial', 9), bg='#f8f9fa', fg='#2c3e50',
+                                                activebackground='#f8f9fa', cursor='hand2')
+        self.check_autocaptura.pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Selector de balanza activa (sólo si hay más de una configurada)
+        balanzas = self.controlador.balanzas_disponibles
+        if len(balanzas) > 1:
+            tk.Label(buttons_frame, text="Balanza:", font=('Arial', 9), 
+                    bg='#f8f9fa', fg='#2c3e50').pack(side=tk.LEFT, padx=(15, 3))
+            self.combo_balanza = ttk.Combobox(buttons_frame, textvariable=self.controlador.balanza_activa,
+                                              values=list(balanzas.values()), state='readonly',
+                                              width=18, font=('Arial', 9))
+            self.combo_balanza.pack(side=tk.LEFT)
+            self.combo_balanza.bind('<<ComboboxSelected>>', 
+                                    lambda e: self.controlador.cambiar_balanza_activa())
+        
         # Información
         info_frame = tk.Frame(peso_frame, bg='#f8f9fa')
         info_frame.grid(row=3, column=0, columnspan=2, sticky='w', padx=10, pady=5)
         
-        tk.Label(info_frame, text="💡 Presione Enter para pesar rápidamente", 
-                font=('Arial', 9), bg='#f8f9fa', fg='#7f8c8d').pack()
+        self.label_info = tk.Label(info_frame, text="💡 Presione Enter para pesar rápidamente", 
+                                   font=('Arial', 9), bg='#f8f9fa', fg='#7f8c8d')
+        self.label_info.pack()
     
     def actualizar_display_fardo(self, fardo_actual, modo_repeso):
         if modo_repeso:
@@ -277,6 +298,19 @@ class SeccionPesoControles:
             self.btn_pesar.config(text="PESAR", bg='#3498db')
             self.actualizar_display_fardo(self.controlador.fardo_actual, False)
     
+    def configurar_espera(self, esperando):
+        if esperando:
+            self.btn_pesar.config(text="ESPERANDO...", bg='#7f8c8d')
+        else:
+            self.configurar_modo_repeso(self.controlador.modo_repeso, self.controlador.fardo_repeso)
+    
+    def configurar_autocaptura(self, activa):
+        if activa:
+            self.label_info.config(text="🤖 Captura automática: apoye el fardo y retírelo al registrarse",
+                                   fg='#27ae60')
+        else:
+            self.label_info.config(text="💡 Presione Enter para pesar rápidamente", fg='#7f8c8d')
+    
     def resetear(self):
         self.label_fardo_actual.config(text="")
         self.btn_pesar.config(state=tk.DISABLED, text="PESAR", bg='#3498db')
@@ -599,7 +633,7 @@ class BarraEstado:
         else:
             self.controlador.conexion_balanza.set("Desconectado")
             self.label_balanza.config(fg='#e74c3c')
-            self.controlador.nombre_balanza.set("(No detectada)")
+            self.controlador.nombre_balanza.set(f"({nombre_balanza})" if nombre_balanza else "(No detectada)")
         
         # Internet
         if internet_ok:
@@ -626,7 +660,7 @@ class BarraEstado:
         else:
             self.controlador.conexion_balanza.set("Desconectado")
             self.label_balanza.config(fg='#e74c3c')
-            self.controlador.nombre_balanza.set("(No detectada)")
+            self.controlador.nombre_balanza.set(f"({nombre_balanza})" if nombre_balanza else "(No detectada)")
         
         # Internet
         if internet_ok:
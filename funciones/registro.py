@@ -0,0 +1,164 @@
+"""
+Configuración del registro (logging) de la aplicación.
+
+Los módulos usan ``logging.getLogger(__name__)``. configurar_registro()
+conecta el logger raíz a una cola: quien registra (por ejemplo el hilo de
+lectura de la balanza) sólo encola el mensaje y un QueueListener en otro hilo
+lo escribe en consola y en un archivo JSON por línea que rota por tamaño.
+Cada tipo de mensaje tiene un límite de frecuencia para que un mensaje
+repetido en un bucle no inunde la cola ni el disco.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from base_de_datos.configuracion import REGISTRO_CONFIG
+
+# Atributos propios de LogRecord; el resto son datos agregados con extra={...}
+_ATRIBUTOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_ruta: Optional[str] = None
+_lock = threading.Lock()
+
+
+class FiltroFrecuencia(logging.Filter):
+    """Limita cuántas veces por segundo pasa cada tipo de mensaje.
+
+    El tipo es el logger más el texto sin formatear (record.msg), así que
+    'Peso recibido: %s' cuenta como un solo tipo sin importar el valor.
+    Usa un balde de fichas por tipo: ``rafaga`` mensajes seguidos y después
+    ``por_segundo``. El primer mensaje que pasa después de un corte lleva
+    en 'suprimidos' cuántos se descartaron. Los mensajes críticos nunca
+    se descartan.
+    """
+
+    def __init__(self, por_segundo: float = 2.0, rafaga: int = 10):
+        super().__init__()
+        self.por_segundo = por_segundo
+        self.rafaga = rafaga
+        self._baldes: Dict[Tuple[str, Any], list] = {}  # tipo -> [fichas, último tiempo, suprimidos]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.CRITICAL:
+            return True
+
+        clave = (record.name, record.msg)
+        ahora = time.monotonic()
+        balde = self._baldes.get(clave)
+        if balde is None:
+            balde = self._baldes[clave] = [float(self.rafaga), ahora, 0]
+
+        fichas = min(self.rafaga, balde[0] + (ahora - balde[1]) * self.por_segundo)
+        balde[1] = ahora
+        if fichas < 1.0:
+            balde[0] = fichas
+            balde[2] += 1
+            return False
+
+        balde[0] = fichas - 1.0
+        if balde[2]:
+            record.suprimidos = balde[2]
+            balde[2] = 0
+        return True
+
+
+class FormatoJson(logging.Formatter):
+    """Una línea JSON por mensaje con los datos agregados en extra={...}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "fecha": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created)) +
+                     f".{int(record.msecs):03d}",
+            "nivel": record.levelname,
+            "origen": record.name,
+            "hilo": record.threadName,
+            "mensaje": record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_ESTANDAR:
+                datos[clave] = valor
+        if record.exc_info:
+            datos["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormatoConsola(logging.Formatter):
+    """Formato legible para la consola, con los mensajes suprimidos al final"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        texto = super().format(record)
+        suprimidos = getattr(record, "suprimidos", 0)
+        if suprimidos:
+            texto += f" (+{suprimidos} similares omitidos)"
+        return texto
+
+
+def configurar_registro(config: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Configura el registro asíncrono con la sección REGISTRO_CONFIG.
+
+    Se puede llamar más de una vez; sólo la primera tiene efecto. Devuelve
+    la ruta del archivo de registro, o None si no se pudo crear.
+    """
+    global _listener, _ruta
+    config = dict(REGISTRO_CONFIG, **(config or {}))
+
+    with _lock:
+        if _listener is not None:
+            return _ruta
+
+        manejadores = []
+        consola = logging.StreamHandler()
+        consola.setLevel(config["nivel_consola"])
+        consola.setFormatter(FormatoConsola())
+        manejadores.append(consola)
+
+        ruta = None
+        try:
+            carpeta = config["carpeta"]
+            os.makedirs(carpeta, exist_ok=True)
+            ruta = os.path.join(carpeta, config["archivo"])
+            archivo = logging.handlers.RotatingFileHandler(
+                ruta, maxBytes=config["max_bytes"], backupCount=config["copias"],
+                encoding="utf-8", delay=True)
+            archivo.setLevel(config["nivel"])
+            archivo.setFormatter(FormatoJson())
+            manejadores.append(archivo)
+        except OSError as e:
+            consola.handle(logging.makeLogRecord({
+                "msg": f"No se pudo crear el archivo de registro: {e}", "levelno": logging.WARNING,
+                "levelname": "WARNING", "name": __name__}))
+            ruta = None
+
+        cola = queue.SimpleQueue()
+        encolador = logging.handlers.QueueHandler(cola)
+        encolador.addFilter(FiltroFrecuencia(config["mensajes_por_segundo"], config["rafaga"]))
+
+        raiz = logging.getLogger()
+        raiz.setLevel(min(logging.getLevelName(config["nivel"]), logging.getLevelName(config["nivel_consola"])))
+        raiz.addHandler(encolador)
+
+        _listener = logging.handlers.QueueListener(cola, *manejadores, respect_handler_level=True)
+        _listener.start()
+        atexit.register(detener_registro)
+        _ruta = ruta
+        return ruta
+
+
+def detener_registro():
+    """Escribe los mensajes pendientes y detiene el hilo del registro"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -2,12 +2,31 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 from datetime import datetime
+import logging
+import os
+import queue
+import sys
 import time
 import threading
 from componentes.componentes import (
     Header, SeccionEntrada, SeccionPesoControles,
     TablaRegistros, BotonesPrincipales, BarraEstado
 )
+from base_de_datos.configuracion import CAMPOS_CONFIG
+
+# Asegurarse de que el directorio raíz esté en el path
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+from balanza.autocaptura import AutoCaptura
+from balanza_reader import (
+    inicializar_balanzas, activar_balanza, obtener_peso, get_status_balanza,
+    get_balanzas_disponibles, get_balanza_selected, cerrar_balanza, suscribir_peso,
+    obtener_publicacion
+)
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -56,16 +75,22 @@ class SistemaPesajeFardos:
         self.fardo_actual = 0
         self.peso_actual = tk.StringVar(value="0.00")
         self.fardos_data = []
+        # Tara por fardo del ticket en pantalla: la guardada si se cargó de la base
+        self.tara_por_fardo = CAMPOS_CONFIG['tara_por_fardo']
 
         # Variables de estado
         self.modo_repeso = False
         self.fardo_repeso = None
         self.estado = "esperando_ticket"
+        self.autocaptura_activa = tk.BooleanVar(value=False)
 
         # Variables de sistema
         self.conexion_bd = tk.StringVar(value="Desconectado")
         self.conexion_balanza = tk.StringVar(value="Desconectado")
         self.nombre_balanza = tk.StringVar(value="No seleccionada")
+        self.balanzas_disponibles = get_balanzas_disponibles()
+        self.balanza_activa = tk.StringVar(
+            value=self.balanzas_disponibles.get(get_balanza_selected(), ""))
         self.estado_internet = tk.StringVar(value="Sin conexión")
 
     def crear_componentes(self):
@@ -112,77 +137,113 @@ class SistemaPesajeFardos:
 
     # Métodos de servicios en segundo plano
     def leer_peso_balanza(self):
-        """Lee el peso desde la balanza usando las funciones globales de balanza_reader"""
+        """Lee el peso actual una vez desde la balanza"""
         try:
-            import sys
-            import os
-            import tkinter as tk
-            from tkinter import messagebox
-            
-            # Asegurarse de que el directorio raíz esté en el path
-            root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            if root_dir not in sys.path:
-                sys.path.append(root_dir)
-                
-            from balanza_reader import obtener_peso, inicializar_balanza
-            
-            # Si no se ha inicializado la balanza, inicializarla
-            if not hasattr(self, '_balanza_inicializada') or not self._balanza_inicializada:
-                try:
-                    # Inicializar la balanza (esto crea una única instancia global)
-                    if inicializar_balanza("balanza1"):
-                        self._balanza_inicializada = True
-                    else:
-                        messagebox.showerror("Error de Conexión", 
-                                           "No se pudo conectar a la balanza.\n"
-                                           "Verifique que esté conectada y el puerto sea correcto.")
-                        return 0.0
-                except Exception as e:
-                    messagebox.showerror("Error de Inicialización", 
-                                       f"Error al inicializar la balanza: {str(e)}\n"
-                                       f"Verifique que el archivo configuracion.json exista y sea válido.")
-                    return 0.0
+            peso = obtener_peso()
             
-            # Leer el peso usando la función global
-            try:
-                peso = obtener_peso()
-                
-                # Si no hay peso, devolver 0
-                if peso is None:
-                    return 0.0
-                    
-                return round(peso, 2)
-            except Exception as e:
-                messagebox.showerror("Error de Lectura", 
-                                   f"Error al leer el peso: {str(e)}\n"
-                                   f"Verifique la conexión con la balanza.")
+            # Si no hay peso, devolver 0
+            if peso is None:
                 return 0.0
                 
+            return round(peso, 2)
         except Exception as e:
-            messagebox.showerror("Error General", f"Error al leer peso de la balanza: {str(e)}")
-            print(f"Error al leer peso de la balanza: {e}")
+            logger.error("Error al leer peso de la balanza: %s", e)
             return 0.0
 
-    def obtener_peso_continuo(self):
-        """Obtiene el peso cada segundo"""
-        error_mostrado = False
-        while True:
-            try:
-                peso = self.leer_peso_balanza()
-                self.peso_actual.set(f"{peso:.2f}")
-                error_mostrado = False  # Resetear el flag de error si la lectura fue exitosa
-                time.sleep(1)
-            except Exception as e:
-                if not error_mostrado:  # Solo mostrar el error una vez
-                    print(f"Error al leer peso: {e}")
-                    error_mostrado = True
-                time.sleep(1)
+    def conectar_balanza(self):
+        """Conecta las balanzas y se suscribe a los cambios de peso (corre en un hilo aparte)"""
+        try:
+            # Conecta todas las balanzas configuradas y activa la seleccionada en el JSON
+            if inicializar_balanzas():
+                self._balanza_inicializada = True
+                suscribir_peso(self._recibir_lectura)
+            else:
+                self._cola_peso.put(("error", "Error de Conexión",
+                                     "No se pudo conectar a la balanza.\n"
+                                     "Verifique que esté conectada y el puerto sea correcto."))
+        except Exception as e:
+            self._cola_peso.put(("error", "Error de Inicialización",
+                                 f"Error al inicializar la balanza: {str(e)}\n"
+                                 f"Verifique que el archivo configuracion.json exista y sea válido."))
+
+    def cambiar_balanza_activa(self):
+        """Pasa el display y el pesaje a la balanza elegida en el selector"""
+        nombre = self.balanza_activa.get()
+        claves = [k for k, n in self.balanzas_disponibles.items() if n == nombre]
+        if not claves:
+            return
+        
+        def activar():
+            if activar_balanza(claves[0]):
+                # El ciclo en curso era de la otra balanza
+                if self._autocaptura is not None:
+                    self._autocaptura = AutoCaptura.desde_config(CAMPOS_CONFIG)
+                # Mostrar enseguida el peso de la nueva balanza (0 si todavía no envió datos)
+                self._cola_peso.put(("peso", self.leer_peso_balanza()))
+            else:
+                self._cola_peso.put(("error", "Error de Conexión",
+                                     f"No se pudo conectar a {nombre}.\n"
+                                     "Verifique que esté conectada y el puerto sea correcto."))
+        
+        # Si la balanza ya está conectada el cambio es inmediato; si no, se conecta sin trabar la ventana
+        threading.Thread(target=activar, daemon=True).start()
+
+    def _recibir_lectura(self, lectura, peso_estable):
+        """Recibe los cambios de peso en el hilo de lectura; sólo los encola para Tk"""
+        # La publicación ya tiene el bloque de esta lectura (se publica antes de notificar)
+        self._cola_peso.put(("lectura", lectura.peso, peso_estable, obtener_publicacion().secuencia))
+
+    def _drenar_cola_peso(self):
+        """Aplica en el hilo de Tk el último peso recibido (descarta los intermedios)"""
+        ultimo_peso = None
+        try:
+            while True:
+                tipo, *datos = self._cola_peso.get_nowait()
+                if tipo == "lectura":
+                    ultimo_peso = datos[0]
+                    self._alimentar_autocaptura(*datos)
+                elif tipo == "peso":
+                    ultimo_peso = datos[0]
+                else:
+                    messagebox.showerror(*datos)
+        except queue.Empty:
+            pass
+
+        # Un fardo puesto antes de intervalo_minimo queda con el mismo peso estable y no genera
+        # más cambios: mientras espera captura se la vuelve a alimentar con la última publicación
+        autocaptura = self._autocaptura
+        if autocaptura is not None and autocaptura.pendiente:
+            publicacion = obtener_publicacion()
+            if publicacion.peso is not None:
+                self._alimentar_autocaptura(publicacion.peso, publicacion.peso_estable, publicacion.secuencia)
+
+        if ultimo_peso is not None and ultimo_peso != self._peso_mostrado:
+            self._peso_mostrado = ultimo_peso
+            self.peso_actual.set(f"{ultimo_peso:.2f}")
+
+        self.root.after(self.refresco_peso_ms, self._drenar_cola_peso)
+
+    def _alimentar_autocaptura(self, peso, peso_estable, secuencia):
+        """Pasa una lectura a la captura automática (en el hilo de Tk) y registra la captura si la hubo"""
+        autocaptura = self._autocaptura
+        if autocaptura is None:
+            return
+        captura = autocaptura.alimentar(peso, peso_estable)
+        if captura is not None:
+            self.registrar_captura(captura, secuencia)
 
     def iniciar_lectura_peso(self):
-        """Inicia el hilo para lectura continua del peso"""
-        hilo_peso = threading.Thread(
-            target=self.obtener_peso_continuo, daemon=True)
-        hilo_peso.start()
+        """Conecta la balanza en segundo plano y empieza a refrescar el display de peso"""
+        self._cola_peso = queue.SimpleQueue()
+        self._peso_mostrado = None
+        self._autocaptura = None  # AutoCaptura mientras el modo automático está encendido
+        self._pesaje_pendiente = None  # time.monotonic() del PESAR que espera una muestra estable
+        self.refresco_peso_ms = CAMPOS_CONFIG.get('refresco_display_ms', 50)
+        
+        hilo_balanza = threading.Thread(
+            target=self.conectar_balanza, daemon=True)
+        hilo_balanza.start()
+        self.root.after(self.refresco_peso_ms, self._drenar_cola_peso)
 
     def actualizar_estados_sistema(self):
         """Actualiza los estados del sistema cada 5 segundos"""
@@ -199,7 +260,7 @@ class SistemaPesajeFardos:
                         bd_ok, balanza_ok, nombre_balanza, internet_ok)
 
                 except Exception as e:
-                    print(f"Error actualizando estados: {e}")
+                    logger.error("Error actualizando estados: %s", e)
 
                 time.sleep(5)
 
@@ -214,33 +275,31 @@ class SistemaPesajeFardos:
     def verificar_conexion_balanza(self):
         """Verifica la conexión a la balanza usando las funciones globales"""
         try:
-            import sys
-            import os
-            
-            # Asegurarse de que el directorio raíz esté en el path
-            root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            if root_dir not in sys.path:
-                sys.path.append(root_dir)
-                
-            from balanza_reader import get_status_balanza
-            
             # Obtener el estado actual de la balanza
             status = get_status_balanza()
             
             if "error" in status:
                 # La balanza no está inicializada
-                print("Balanza no inicializada")
+                logger.debug("Balanza no inicializada")
                 return False, ""
             
+            if status["conectado"] and status.get("obsoleta"):
+                # El supervisor está reabriendo el puerto; el peso en pantalla es el último recibido
+                return False, f"{status.get('balanza_actual', 'Balanza')} - reconectando..."
+            
             if status["conectado"]:
                 # Ya está conectada, usar la información del status
-                return True, status.get("balanza_actual", "Balanza")
+                nombre = status.get("balanza_actual", "Balanza")
+                metricas = status.get("metricas")
+                if metricas:
+                    nombre = f"{nombre} - {metricas['tramas_por_segundo']:.0f} tramas/s"
+                return True, nombre
             
-            print("Balanza no conectada")
+            logger.debug("Balanza no conectada")
             return False, ""
             
         except Exception as e:
-            print(f"Error al verificar conexión con balanza: {e}")
+            logger.error("Error al verificar conexión con balanza: %s", e)
             return False, ""
 
     def verificar_conexion_internet(self):
@@ -285,58 +344,142 @@ class SistemaPesajeFardos:
             messagebox.showerror("Error", "Ingrese un número de fardo válido")
 
     def pesar_fardo(self):
-        """Pesa un fardo y guarda automáticamente en la base de datos"""
-        if self.estado != "listo_para_pesar":
+        """Pesa el fardo con la primera muestra estable que llegue después de presionar PESAR.
+
+        El display puede tener un peso de hasta un refresco atrás (o del fardo
+        anterior), así que se espera una publicación nueva de la balanza,
+        revisándola con after() sin trabar la ventana.
+        """
+        if self.estado != "listo_para_pesar" or self._pesaje_pendiente is not None:
+            return
+
+        self._pesaje_pendiente = time.monotonic()
+        self.seccion_peso.configurar_espera(True)
+        self._esperar_muestra()
+
+    def _esperar_muestra(self):
+        """Registra la muestra si ya llegó; si no, vuelve a revisar hasta el tiempo límite"""
+        pulsado = self._pesaje_pendiente
+        if pulsado is None:
+            # Se reseteó la interfaz mientras se esperaba
+            return
+
+        publicacion = obtener_publicacion()
+        if publicacion.estable and publicacion.tiempo > pulsado:
+            self._terminar_espera()
+            self._registrar_muestra(publicacion, pulsado)
             return
 
+        espera = CAMPOS_CONFIG.get('espera_peso_estable_s', 3.0)
+        if time.monotonic() - pulsado >= espera:
+            self._terminar_espera()
+            logger.warning("PESAR sin peso estable en %.1f s (última secuencia %d)", espera, publicacion.secuencia)
+            messagebox.showerror("Sin peso estable",
+                                 f"La balanza no informó un peso estable en {espera:g} s.\n\n"
+                                 "Verifique que el fardo esté quieto y la balanza conectada, "
+                                 "y vuelva a presionar PESAR.")
+            return
+
+        self.root.after(CAMPOS_CONFIG.get('sondeo_peso_estable_ms', 20), self._esperar_muestra)
+
+    def _terminar_espera(self):
+        self._pesaje_pendiente = None
+        self.seccion_peso.configurar_espera(False)
+
+    def _registrar_muestra(self, publicacion, pulsado):
+        """Registra el peso estable de una publicación con su secuencia y hora de adquisición"""
         try:
-            peso = float(self.peso_actual.get())
+            # La media de la ventana estable, igual que la captura automática, no la última lectura
+            peso = round(publicacion.peso_estable.peso, 2)
+            peso_minimo = CAMPOS_CONFIG.get('peso_minimo_fardo', 1.0)
 
-            if peso < 1.0:
+            if peso < peso_minimo:
                 messagebox.showwarning(
-                    "Advertencia", "El peso debe ser mayor a 1 kg")
+                    "Advertencia", f"El peso debe ser mayor a {peso_minimo:g} kg")
                 return
 
-            ahora = datetime.now()
-            fecha = ahora.strftime("%d/%m/%Y")
-            hora = ahora.strftime("%H:%M:%S")
-
-            if self.modo_repeso and self.fardo_repeso:
-                # Repeso
-                for i, fardo in enumerate(self.fardos_data):
-                    if fardo[0] == self.fardo_repeso:
-                        self.fardos_data[i] = (
-                            self.fardo_repeso, peso, fecha, hora)
-                        break
-
-                self.tabla_registros.actualizar_fardo(
-                    self.fardo_repeso, peso, fecha, hora)
-
-                self.modo_repeso = False
-                self.fardo_repeso = None
-                self.seccion_peso.configurar_modo_repeso(False)
-                self.seccion_entrada.configurar_estado("fardo_repesado")
-            else:
-                # Nuevo fardo
-                fardo_data = (self.fardo_actual, peso, fecha, hora)
-                self.fardos_data.append(fardo_data)
-                self.tabla_registros.agregar_fardo(
-                    self.fardo_actual, peso, fecha, hora)
-                self.fardo_actual += 1
-                self.seccion_entrada.configurar_estado("fardo_registrado")
-                
-                # Actualizar información en la tabla
-                self.tabla_registros.actualizar_info_ticket(self.ticket_actual.get(), self.fardo_actual)
-
-            # Habilitar controles y botón de guardar
-            self.botones_principales.habilitar_controles(True)
-            self.botones_principales.habilitar_boton_guardar(True)
-
-            self.seccion_peso.actualizar_display_fardo(self.fardo_actual, False)
-            self.seccion_peso.entry_pesar.focus()
+            self._registrar_peso(peso, datetime.now(), {
+                'hora_captura': datetime.fromtimestamp(publicacion.fecha),
+                'secuencia': publicacion.secuencia
+            })
+            logger.info("Fardo pesado: %.2f kg, muestra %d a %.0f ms de PESAR",
+                        peso, publicacion.secuencia, (publicacion.tiempo - pulsado) * 1000)
         except Exception as e:
             messagebox.showerror("Error", f"Error al pesar fardo: {str(e)}")
-            print(f"Error en pesar_fardo: {e}")
+            logger.exception("Error en pesar_fardo")
+
+    def cambiar_autocaptura(self):
+        """Enciende o apaga la captura automática según el checkbox"""
+        if self.autocaptura_activa.get():
+            # Una máquina nueva por cada encendido: el ciclo de carga anterior no cuenta
+            self._autocaptura = AutoCaptura.desde_config(CAMPOS_CONFIG)
+            logger.info("Captura automática encendida")
+        else:
+            self._autocaptura = None
+            logger.info("Captura automática apagada")
+        self.seccion_peso.configurar_autocaptura(self.autocaptura_activa.get())
+
+    def registrar_captura(self, captura, secuencia):
+        """Registra en el hilo de Tk un peso estable tomado por la captura automática"""
+        if self._autocaptura is None or self.estado != "listo_para_pesar":
+            logger.info("Captura de %.2f kg descartada: no hay fardo esperando peso", captura.peso)
+            return
+
+        try:
+            momento = datetime.fromtimestamp(captura.fecha)
+            self._registrar_peso(round(captura.peso, 2), momento, {
+                'hora_captura': momento,
+                'tiempo_asentamiento': round(captura.asentamiento, 3),
+                'secuencia': secuencia
+            })
+            logger.info("Fardo capturado: %.2f kg, asentamiento %.2f s", captura.peso, captura.asentamiento)
+        except Exception as e:
+            logger.exception("Error al registrar captura automática")
+
+    def _registrar_peso(self, peso, momento, captura):
+        """Agrega el fardo actual (o reemplaza el repesado) con su peso.
+
+        captura tiene los datos extra del Fardo (hora_captura, secuencia y,
+        en la captura automática, tiempo_asentamiento). momento se guarda
+        completo como hora_pesaje, con fracciones de segundo.
+        """
+        fecha = momento.strftime("%d/%m/%Y")
+        hora = momento.strftime("%H:%M:%S")
+        captura = dict(captura, hora_pesaje=momento)
+
+        if self.modo_repeso and self.fardo_repeso:
+            # Repeso
+            for i, fardo in enumerate(self.fardos_data):
+                if fardo[0] == self.fardo_repeso:
+                    self.fardos_data[i] = (
+                        self.fardo_repeso, peso, fecha, hora, captura)
+                    break
+
+            self.tabla_registros.actualizar_fardo(
+                self.fardo_repeso, peso, fecha, hora)
+
+            self.modo_repeso = False
+            self.fardo_repeso = None
+            self.seccion_peso.configurar_modo_repeso(False)
+            self.seccion_entrada.configurar_estado("fardo_repesado")
+        else:
+            # Nuevo fardo
+            fardo_data = (self.fardo_actual, peso, fecha, hora, captura)
+            self.fardos_data.append(fardo_data)
+            self.tabla_registros.agregar_fardo(
+                self.fardo_actual, peso, fecha, hora)
+            self.fardo_actual += 1
+            self.seccion_entrada.configurar_estado("fardo_registrado")
+            
+            # Actualizar información en la tabla
+            self.tabla_registros.actualizar_info_ticket(self.ticket_actual.get(), self.fardo_actual)
+
+        # Habilitar controles y botón de guardar
+        self.botones_principales.habilitar_controles(True)
+        self.botones_principales.habilitar_boton_guardar(True)
+
+        self.seccion_peso.actualizar_display_fardo(self.fardo_actual, False)
+        self.seccion_peso.entry_pesar.focus()
 
     def iniciar_repeso(self, fardo_seleccionado):
         """Inicia el proceso de repeso"""
@@ -356,7 +499,7 @@ class SistemaPesajeFardos:
             self.seccion_peso.entry_pesar.focus()
         except Exception as e:
             messagebox.showerror("Error", f"Error al iniciar repeso: {str(e)}")
-            print(f"Error en iniciar_repeso: {e}")
+            logger.exception("Error en iniciar_repeso")
 
     def nuevo_ticket(self):
         """Inicia un nuevo ticket"""
@@ -373,7 +516,7 @@ class SistemaPesajeFardos:
 
     def mostrar_historial(self):
         """Muestra el historial de tickets y permite cargar uno seleccionado"""
-        from base_de_datos.base_datos import BaseDatos
+        from base_de_datos.base_datos import obtener_base_datos
         
         # Crear ventana de historial
         historial_window = tk.Toplevel(self.root)
@@ -483,7 +626,7 @@ class SistemaPesajeFardos:
         # Función para buscar tickets
         def buscar_tickets():
             termino = busqueda_var.get().strip()
-            bd = BaseDatos()
+            bd = obtener_base_datos()
             
             if termino:
                 tickets = bd.buscar_tickets(termino)
@@ -535,7 +678,7 @@ class SistemaPesajeFardos:
         
         # Cargar datos iniciales
         try:
-            bd = BaseDatos()
+            bd = obtener_base_datos()
             tickets = bd.obtener_historial_tickets()
             cargar_tickets(tickets)
         except Exception as e:
@@ -543,14 +686,14 @@ class SistemaPesajeFardos:
             
     def _cargar_ticket_desde_bd(self, numero_ticket):
         """Carga un ticket desde la base de datos"""
-        from base_de_datos.base_datos import BaseDatos
+        from base_de_datos.base_datos import obtener_base_datos
         
         try:
             # Resetear interfaz actual
             self.resetear_interfaz()
             
             # Cargar ticket desde BD
-            bd = BaseDatos()
+            bd = obtener_base_datos()
             ticket = bd.cargar_ticket(numero_ticket)
             
             if not ticket:
@@ -559,6 +702,7 @@ class SistemaPesajeFardos:
                 
             # Establecer número de ticket
             self.ticket_actual.set(ticket.numero)
+            self.tara_por_fardo = ticket.tara_por_fardo
             
             # Procesar ticket (simular entrada de usuario)
             self.procesar_ticket()
@@ -576,7 +720,11 @@ class SistemaPesajeFardos:
                     hora = fardo.hora_pesaje.strftime("%H:%M:%S")
                     
                     # Agregar a la lista de fardos
-                    fardo_data = (fardo.numero, fardo.peso, fecha, hora)
+                    captura = {'hora_pesaje': fardo.hora_pesaje,
+                               'hora_captura': fardo.hora_captura,
+                               'tiempo_asentamiento': fardo.tiempo_asentamiento,
+                               'secuencia': fardo.secuencia}
+                    fardo_data = (fardo.numero, fardo.peso, fecha, hora, captura)
                     self.fardos_data.append(fardo_data)
                     
                     # Actualizar tabla
@@ -616,14 +764,12 @@ class SistemaPesajeFardos:
                 messagebox.showwarning("Advertencia", f"El ticket {numero_ticket} no tiene fardos")
                 
         except Exception as e:
-            print(f"Error detallado al cargar ticket: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error al cargar ticket")
             messagebox.showerror("Error", f"Error al cargar ticket: {str(e)}")
             
     def guardar_datos(self):
         """Guarda los datos en la base de datos con datos adicionales"""
-        from base_de_datos.base_datos import BaseDatos
+        from base_de_datos.base_datos import obtener_base_datos
         from base_de_datos.modelos_bd import Ticket, Fardo
         
         if not self.fardos_data:
@@ -638,14 +784,19 @@ class SistemaPesajeFardos:
             
             # Crear ticket
             ticket = Ticket(self.ticket_actual.get())
+            ticket.tara_por_fardo = self.tara_por_fardo
             
             # Agregar fardos al ticket
             for fardo_data in self.fardos_data:
-                numero_fardo, peso, fecha_str, hora_str = fardo_data
+                numero_fardo, peso, fecha_str, hora_str, captura = fardo_data
                 fardo = Fardo(numero_fardo, peso)
                 # Convertir fecha y hora a datetime
                 fecha_hora_str = f"{fecha_str} {hora_str}"
-                fardo.hora_pesaje = datetime.strptime(fecha_hora_str, "%d/%m/%Y %H:%M:%S")
+                fardo.hora_pesaje = (captura.get('hora_pesaje')
+                                     or datetime.strptime(fecha_hora_str, "%d/%m/%Y %H:%M:%S"))
+                fardo.hora_captura = captura.get('hora_captura')
+                fardo.tiempo_asentamiento = captura.get('tiempo_asentamiento')
+                fardo.secuencia = captura.get('secuencia')
                 ticket.agregar_fardo(fardo)
             
             # Preparar datos adicionales para pasar al método guardar_ticket
@@ -656,7 +807,7 @@ class SistemaPesajeFardos:
                 'observaciones': ""
             }
 
-            bd = BaseDatos() 
+            bd = obtener_base_datos()
             resultado = bd.guardar_ticket(ticket, datos_adicionales)
 
             if resultado:
@@ -670,9 +821,7 @@ class SistemaPesajeFardos:
                 messagebox.showerror("Error", "Error al guardar en base de datos")
         except Exception as e:
             messagebox.showerror("Error", f"Error al guardar: {str(e)}")
-            print(f"Error detallado al guardar: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error al guardar")
             
     def resetear_interfaz(self):
         """Resetea la interfaz para un nuevo ticket"""
@@ -682,7 +831,9 @@ class SistemaPesajeFardos:
         self.modo_repeso = False
         self.fardo_repeso = None
         self.estado = "esperando_ticket"
+        self._pesaje_pendiente = None
         self.fardos_data.clear()
+        self.tara_por_fardo = CAMPOS_CONFIG['tara_por_fardo']
 
         # Resetear componentes
         self.tabla_registros.limpiar_tabla()
@@ -696,22 +847,11 @@ class SistemaPesajeFardos:
     def cerrar_aplicacion(self):
         """Cierra la aplicación y libera recursos"""
         try:
-            # Cerrar conexión con la balanza usando la función global
-            import sys
-            import os
-            
-            # Asegurarse de que el directorio raíz esté en el path
-            root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            if root_dir not in sys.path:
-                sys.path.append(root_dir)
-                
-            from balanza_reader import cerrar_balanza
-            
             # Cerrar la conexión global con la balanza
             cerrar_balanza()
-            print("Conexión con balanza cerrada correctamente")
+            logger.info("Conexión con balanza cerrada correctamente")
         except Exception as e:
-            print(f"Error al cerrar conexión con balanza: {e}")
+            logger.error("Error al cerrar conexión con balanza: %s", e)
         
         # Cerrar ventana principal
         self.root.destroy()
\ No newline at end of file
@@ -1,7 +1,9 @@
 import tkinter as tk
+from funciones.registro import configurar_registro
 from funciones.sistema_pesaje import SistemaPesajeFardos
 
 def main():
+    configurar_registro()
     root = tk.Tk()
     app = SistemaPesajeFardos(root)
     
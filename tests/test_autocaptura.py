@@ -0,0 +1,43 @@
+from balanza.autocaptura import CAPTURADO, AutoCaptura
+from balanza.estabilidad import PesoEstable
+
+
+def estable(peso, tiempo):
+    return PesoEstable(peso, tiempo, 0.0, 0.0, (peso,), (tiempo,))
+
+
+def test_captura_un_fardo_por_ciclo():
+    auto = AutoCaptura(peso_minimo=1.0, umbral_vacio=0.5, intervalo_minimo=2.0)
+    assert auto.alimentar(150.0, None, ahora=0.0) is None
+    captura = auto.alimentar(200.0, estable(200.0, 1.0))
+    assert captura is not None and captura.peso == 200.0 and captura.asentamiento == 1.0
+    assert auto.estado == CAPTURADO
+    assert auto.alimentar(200.0, estable(200.0, 1.5)) is None
+    assert auto.capturas == 1
+
+
+def test_fardo_puesto_antes_del_intervalo_se_captura_al_volver_a_alimentar():
+    auto = AutoCaptura(peso_minimo=1.0, umbral_vacio=0.5, intervalo_minimo=2.0)
+    assert auto.alimentar(200.0, estable(200.0, 10.0)) is not None
+    assert auto.alimentar(0.0, None, ahora=10.3) is None
+
+    # El segundo fardo se estabiliza 1 s después de la captura: se rechaza por el intervalo
+    assert auto.alimentar(180.0, None, ahora=10.5) is None
+    assert auto.alimentar(180.0, estable(180.0, 11.0)) is None
+    assert auto.pendiente
+
+    # El suscriptor no vuelve a notificar (el peso no cambia); la interfaz sondea la última
+    # publicación mientras la captura está pendiente y el fardo se captura al vencer el intervalo
+    assert auto.alimentar(180.0, estable(180.0, 11.5)) is None
+    captura = auto.alimentar(180.0, estable(180.0, 12.1))
+    assert captura is not None and captura.peso == 180.0
+    assert not auto.pendiente
+    assert auto.capturas == 2
+
+
+def test_peso_menor_al_minimo_no_se_captura():
+    auto = AutoCaptura(peso_minimo=5.0, umbral_vacio=0.5)
+    assert auto.alimentar(3.0, estable(3.0, 1.0)) is None
+    assert auto.alimentar(3.0, estable(3.0, 2.0)) is None
+    assert auto.rechazadas == 1
+    assert auto.pendiente
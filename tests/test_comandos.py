@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from balanza.comandos import CanalComandos
+from balanza.protocolos import crear_protocolo
+
+
+def canal():
+    return CanalComandos.desde_config(crear_protocolo({"protocolo": "continuo_ascii"}), {})
+
+
+def test_recibir_no_espera_una_escritura_lenta():
+    comandos = canal()
+    escribiendo = threading.Event()
+    soltar = threading.Event()
+
+    def escribir_lento(datos):
+        escribiendo.set()
+        soltar.wait(2)
+
+    hilo = threading.Thread(target=comandos.enviar, args=("cero", escribir_lento))
+    hilo.start()
+    assert escribiendo.wait(1)
+    inicio = time.monotonic()
+    assert comandos.recibir(b"Z A", None, time.monotonic())
+    assert time.monotonic() - inicio < 0.5
+    soltar.set()
+    hilo.join()
+    assert comandos.instantanea()["cero"]["respondidos"] == 1
+
+
+def test_error_de_escritura_saca_el_pendiente():
+    comandos = canal()
+
+    def escribir_con_error(datos):
+        raise OSError("puerto cerrado")
+
+    with pytest.raises(OSError):
+        comandos.enviar("tara", escribir_con_error)
+    assert not comandos.hay_pendientes()
+    assert comandos.instantanea()["tara"]["enviados"] == 0
+
+
+def test_sin_esperar_no_bloquea_si_otro_hilo_escribe():
+    comandos = canal()
+    escribiendo = threading.Event()
+    soltar = threading.Event()
+
+    def escribir_lento(datos):
+        escribiendo.set()
+        soltar.wait(2)
+
+    hilo = threading.Thread(target=comandos.enviar, args=("imprimir", escribir_lento))
+    hilo.start()
+    assert escribiendo.wait(1)
+    escritos = []
+    inicio = time.monotonic()
+    assert comandos.enviar("cero", escritos.append, esperar=False) is None
+    assert time.monotonic() - inicio < 0.5
+    assert escritos == []
+    soltar.set()
+    hilo.join()
+    assert comandos.enviar("cero", escritos.append, esperar=False) is not None
+    assert escritos == [b"Z\r\n"]
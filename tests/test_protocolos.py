@@ -0,0 +1,35 @@
+from balanza.protocolos import ProtocoloContinuoAscii
+
+
+def protocolo(**config):
+    return ProtocoloContinuoAscii(dict({"unidad": "kg"}, **config))
+
+
+def test_trama_con_prefijo_y_unidad():
+    lectura = protocolo().parsear(b"ST,GS,+0001234.5kg")
+    assert lectura.peso == 1234.5
+    assert lectura.estable is True
+    assert lectura.unidad == "kg"
+
+
+def test_unidades_pegadas_o_separadas():
+    assert protocolo().parsear(b"  1234.5 lb").unidad == "lb"
+    assert protocolo().parsear(b"US,-12.0G").unidad == "g"
+    assert protocolo().parsear(b"2.5 t").unidad == "t"
+
+
+def test_palabras_despues_del_peso_no_son_unidad():
+    for trama, peso in ((b"1234.5 GROSS", 1234.5), (b"  210.0 Tare", 210.0),
+                        (b"88.5 gross weight", 88.5), (b"ST, 12.0 kgs", 12.0)):
+        lectura = protocolo(unidad="lb").parsear(trama)
+        assert lectura.peso == peso
+        assert lectura.unidad == "lb"
+
+
+def test_unidad_seguida_de_palabra_separada():
+    lectura = protocolo(unidad="lb").parsear(b"1234.5 kg GROSS")
+    assert lectura.unidad == "kg"
+
+
+def test_trama_sin_numero():
+    assert protocolo().parsear(b"ST,GS,") is None
@@ -0,0 +1,74 @@
+import json
+import sqlite3
+
+import pytest
+
+from base_de_datos.base_datos import BaseDatos
+from base_de_datos.configuracion import CAMPOS_CONFIG, ConfiguracionManager
+from base_de_datos.modelos_bd import Fardo, Ticket, calcular_rinde
+
+
+class ConfiguracionPrueba(ConfiguracionManager):
+    def __init__(self, config_file):
+        self.config_file = config_file
+        self.config_data = {}
+        self.cargar_configuracion()
+
+
+@pytest.fixture
+def abrir_base(tmp_path, monkeypatch):
+    config_file = tmp_path / "configuracion.json"
+    config_file.write_text(json.dumps({"base_datos": {"ruta_completa": str(tmp_path / "pesaje.db"),
+                                                      "backup_automatico": False}}))
+    abiertas = []
+
+    def abrir(tara_por_fardo):
+        monkeypatch.setitem(CAMPOS_CONFIG, "tara_por_fardo", tara_por_fardo)
+        bd = BaseDatos(ConfiguracionPrueba(str(config_file)))
+        abiertas.append(bd)
+        return bd
+
+    yield abrir
+    for bd in abiertas:
+        bd.cerrar()
+
+
+def ticket(numero, pesos):
+    nuevo = Ticket(numero)
+    for n, peso in enumerate(pesos, 1):
+        nuevo.agregar_fardo(Fardo(n, peso))
+    return nuevo
+
+
+def test_sin_kg_brutos_no_hay_rinde():
+    assert calcular_rinde(1000.0, 5, None, 0, 0, 2.0) is None
+    assert calcular_rinde(1000.0, 5, 0, 0, 0, 2.0) is None
+    assert ticket("T", [200.0]).calcular_rinde(None, 0.0, 0.0) is None
+
+
+def test_rinde_guardado_igual_al_del_modelo(abrir_base):
+    bd = abrir_base(3.5)
+    nuevo = ticket("T1", [201.0, 198.5, 240.25])
+    assert bd.guardar_ticket(nuevo, {"kg_bruto_romaneo": "700", "agregado": "4", "resto": "2.5"})
+
+    cargado = bd.cargar_ticket("T1")
+    assert cargado.tara_por_fardo == 3.5
+    assert cargado.rinde == pytest.approx(nuevo.calcular_rinde(700.0, 4.0, 2.5))
+    assert cargado.rinde == pytest.approx(cargado.calcular_rinde(cargado.kg_bruto_romaneo,
+                                                                 cargado.agregado, cargado.resto))
+
+
+def test_otra_tara_en_la_configuracion_no_recalcula_tickets_guardados(abrir_base):
+    bd = abrir_base(2.0)
+    assert bd.guardar_ticket(ticket("T1", [200.0, 210.0]), {"kg_bruto_romaneo": "400"})
+    rinde = bd.cargar_ticket("T1").rinde
+
+    # Otra PC con otra tara abre la misma base y guarda un ticket nuevo
+    otra = abrir_base(5.0)
+    assert otra.guardar_ticket(ticket("T2", [200.0, 210.0]), {"kg_bruto_romaneo": "400"})
+
+    with sqlite3.connect(otra.ruta_db) as conn:
+        filas = dict(conn.execute("SELECT numero, tara_por_fardo FROM tickets").fetchall())
+    assert filas == {"T1": 2.0, "T2": 5.0}
+    assert otra.cargar_ticket("T1").rinde == rinde
+    assert otra.cargar_ticket("T2").rinde == pytest.approx((410.0 - 10.0) / 400 * 100)
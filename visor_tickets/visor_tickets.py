@@ -242,22 +242,37 @@ class VisorTickets:
                 conn.close()
                 return
             
-            # Consulta para obtener tickets con sus fardos
-            cursor.execute("""
-                SELECT t.id, t.numero, t.fecha_creacion, 
-                       COUNT(f.id) as cantidad_fardos,
-                       COALESCE(SUM(f.peso), 0) as peso_total,
-                       '' as operador,
-                       t.observaciones,
-                       t.kg_bruto_romaneo,
-                       t.agregado,
-                       t.resto
-                FROM tickets t
-                LEFT JOIN fardos f ON t.id = f.ticket_id
-                WHERE t.estado = 'ACTIVO'
-                GROUP BY t.id, t.numero, t.fecha_creacion
-                ORDER BY t.fecha_creacion DESC
-            """)
+            cursor.execute("PRAGMA table_info(tickets)")
+            columnas = [columna[1] for columna in cursor.fetchall()]
+            
+            if 'peso_total' in columnas:
+                # Cantidad y peso ya resumidos en cada ticket por el sistema de pesaje; el orden
+                # es el del historial, que sigue idx_tickets_historial sin ordenar aparte
+                cursor.execute("""
+                    SELECT id, numero, fecha_creacion, cantidad_fardos, peso_total,
+                           '' as operador, observaciones, kg_bruto_romaneo, agregado, resto, rinde
+                    FROM tickets
+                    WHERE estado = 'ACTIVO'
+                    ORDER BY fecha_guardado DESC
+                """)
+            else:
+                # Consulta para obtener tickets con sus fardos (bases anteriores al resumen)
+                cursor.execute("""
+                    SELECT t.id, t.numero, t.fecha_creacion, 
+                           COUNT(f.id) as cantidad_fardos,
+                           COALESCE(SUM(f.peso), 0) as peso_total,
+                           '' as operador,
+                           t.observaciones,
+                           t.kg_bruto_romaneo,
+                           t.agregado,
+                           t.resto,
+                           NULL as rinde
+                    FROM tickets t
+                    LEFT JOIN fardos f ON t.id = f.ticket_id
+                    WHERE t.estado = 'ACTIVO'
+                    GROUP BY t.id, t.numero, t.fecha_creacion
+                    ORDER BY t.fecha_guardado DESC
+                """)
             
             rows = cursor.fetchall()
             
@@ -278,16 +293,18 @@ class VisorTickets:
                     'observaciones': row[6],
                     'kg_bruto_romaneo': row[7] if row[7] is not None else 0,
                     'agregado': row[8] if row[8] is not None else 0,
-                    'resto': row[9] if row[9] is not None else 0
+                    'resto': row[9] if row[9] is not None else 0,
+                    'rinde': row[10]
                 }
-                self.tickets.append(ticket)
                 
-                # Calcular rinde si es posible
-                rinde = 0
-                if ticket['kg_bruto_romaneo'] > 0:
+                # El rinde guardado usa la tara por fardo de cada ticket; las bases anteriores
+                # al resumen no lo tienen y se calcula con los 2 kg de entonces
+                if 'peso_total' not in columnas and ticket['kg_bruto_romaneo'] > 0:
                     tara = ticket['cantidad_fardos'] * 2  # 2kg por fardo
-                    rinde = ((ticket['peso'] + ticket['resto'] - ticket['agregado'] - tara) / ticket['kg_bruto_romaneo']) * 100
-                    rinde = round(rinde, 2)
+                    ticket['rinde'] = ((ticket['peso'] + ticket['resto'] - ticket['agregado'] - tara) / ticket['kg_bruto_romaneo']) * 100
+                ticket['rinde'] = round(ticket['rinde'] or 0, 2)
+                self.tickets.append(ticket)
+                rinde = ticket['rinde']
                 
                 self.tree.insert('', 'end', values=(
                     ticket['numero'],
@@ -360,14 +377,7 @@ class VisorTickets:
         self.detalle_text.config(state=tk.NORMAL)
         self.detalle_text.delete(1.0, tk.END)
         
-        # Calcular rinde
-        rinde = 0
-        if self.ticket_seleccionado['kg_bruto_romaneo'] > 0:
-            tara = self.ticket_seleccionado['cantidad_fardos'] * 2  # 2kg por fardo
-            rinde = ((self.ticket_seleccionado['peso'] + self.ticket_seleccionado['resto'] - 
-                     self.ticket_seleccionado['agregado'] - tara) / 
-                     self.ticket_seleccionado['kg_bruto_romaneo']) * 100
-            rinde = round(rinde, 2)
+        rinde = self.ticket_seleccionado['rinde']
         
         # Formatear detalles con mejor estilo
         self.detalle_text.tag_configure("titulo", font=("Segoe UI", 14, "bold"), foreground="#0078d7")
@@ -510,14 +520,7 @@ class VisorTickets:
         elements.append(Paragraph(f"TICKET DE PESAJE #{self.ticket_seleccionado['numero']}", title_style))
         elements.append(Spacer(1, 0.5*cm))
         
-        # Calcular rinde
-        rinde = 0
-        if self.ticket_seleccionado['kg_bruto_romaneo'] > 0:
-            tara = self.ticket_seleccionado['cantidad_fardos'] * 2  # 2kg por fardo
-            rinde = ((self.ticket_seleccionado['peso'] + self.ticket_seleccionado['resto'] - 
-                     self.ticket_seleccionado['agregado'] - tara) / 
-                     self.ticket_seleccionado['kg_bruto_romaneo']) * 100
-            rinde = round(rinde, 2)
+        rinde = self.ticket_seleccionado['rinde']
         
         # Información del ticket con mejor formato
         data = [